@@ -0,0 +1,172 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+from constants import AGING_SCALE_METHOD_1, AGING_SCALE_METHOD_2, NO_DATE_DAYS
+from dtypes import narrow_int_dtype
+
+
+class AgingScale:
+    """
+    Скомпилированная шкала старения для векторной классификации.
+
+    Шкала из constants.py разбивается на элементарные интервалы по всем
+    границам категорий. Для каждого интервала один раз вычисляется категория
+    по тем же правилам, что и в determine_aging_category (первое совпадение
+    в порядке шкалы, иначе последняя категория). Поэтому перекрывающиеся
+    интервалы ("Без даты" внутри "> 3 лет") сохраняют свой приоритет.
+    """
+
+    def __init__(self, scale):
+        """
+        Args:
+            scale (list): Шкала старения в формате AGING_SCALE_METHOD_*.
+        """
+        self.scale = scale
+        self.names = [category["name"] for category in scale]
+        self.statuses = list(dict.fromkeys(category["status"] for category in scale))
+
+        points = sorted(
+            {category["min_days"] for category in scale}
+            | {category["max_days"] + 1 for category in scale}
+        )
+        self.boundaries = np.array(points, dtype=np.int64)
+
+        # Представитель интервала: (-inf, b0) -> b0 - 1, [b_i, b_i+1) -> b_i
+        representatives = [points[0] - 1] + points
+        self.interval_entries = np.array(
+            [self._lookup(days) for days in representatives], dtype=np.int16
+        )
+
+        status_codes = {status: code for code, status in enumerate(self.statuses)}
+        self.entry_status_codes = np.array(
+            [status_codes[category["status"]] for category in scale], dtype=np.int8
+        )
+        self.interval_status_codes = self.entry_status_codes[self.interval_entries]
+
+    def _lookup(self, days):
+        """Категория для одного значения дней (эталонная логика)."""
+        for index, category in enumerate(self.scale):
+            if category["min_days"] <= days <= category["max_days"]:
+                return index
+        return len(self.scale) - 1
+
+    def interval_index(self, days):
+        """
+        Номера элементарных интервалов для массива дней хранения.
+
+        Args:
+            days: Массив целых чисел дней хранения.
+
+        Returns:
+            numpy.ndarray: Номера интервалов (0 - левее первой границы).
+        """
+        return np.searchsorted(self.boundaries, np.asarray(days), side="right")
+
+    def classify_entries(self, days):
+        """Индексы строк шкалы (как у determine_aging_category) для массива дней."""
+        return self.interval_entries[self.interval_index(days)]
+
+    def classify_codes(self, days):
+        """Коды статусов (позиции в self.statuses) для массива дней."""
+        return self.interval_status_codes[self.interval_index(days)]
+
+    def classify(self, days):
+        """
+        Классификация массива дней хранения за один вызов.
+
+        Args:
+            days: Массив целых чисел дней хранения.
+
+        Returns:
+            pandas.Categorical: Статусы категорий старения.
+        """
+        return pd.Categorical.from_codes(
+            self.classify_codes(days), categories=self.statuses
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def get_aging_scale(method=1):
+    """
+    Возвращает скомпилированную шкалу старения для метода.
+
+    Args:
+        method: Метод прогнозирования (1 или 2)
+
+    Returns:
+        AgingScale: Шкала, построенная один раз на процесс.
+    """
+    return AgingScale(AGING_SCALE_METHOD_1 if method == 1 else AGING_SCALE_METHOD_2)
+
+
+def shift_aging_scale(scale, days):
+    """
+    Шкала старения с границами категорий, сдвинутыми на days дней.
+
+    Для сценариев "что если": при days=30 каждая категория наступает на
+    30 дней позже. Начало первой категории (0 дней), открытая верхняя
+    граница последней и категория "Без даты" (NO_DATE_DAYS) не сдвигаются.
+
+    Args:
+        scale (list): Шкала старения в формате AGING_SCALE_METHOD_*.
+        days (int): Сдвиг в днях (отрицательный - категории наступают раньше).
+
+    Returns:
+        list: Новая шкала; исходная не изменяется.
+
+    Raises:
+        ValueError: Если после сдвига категория становится пустой.
+    """
+    shifted = []
+    for category in scale:
+        category = dict(category)
+        if category["min_days"] != NO_DATE_DAYS:
+            if category["min_days"] > 0:
+                category["min_days"] += days
+            if category["max_days"] < NO_DATE_DAYS - 1:
+                category["max_days"] += days
+        if category["min_days"] > category["max_days"]:
+            raise ValueError(
+                f"Сдвиг шкалы на {days} дн. делает категорию "
+                f"\"{category['name']}\" пустой"
+            )
+        shifted.append(category)
+    return shifted
+
+
+def calculate_aging_days_array(dates, forecast_date):
+    """
+    Векторный расчет количества дней хранения.
+
+    Args:
+        dates: Даты поступления (Series или массив datetime64).
+        forecast_date: Дата прогноза.
+
+    Returns:
+        numpy.ndarray: Дни хранения (int64), NO_DATE_DAYS для пустых дат.
+    """
+    dates = pd.Series(pd.to_datetime(np.asarray(dates)))
+    days = (pd.Timestamp(forecast_date) - dates) // pd.Timedelta(days=1)
+    return days.fillna(NO_DATE_DAYS).to_numpy(dtype=np.int64)
+
+
+def aging_days_dtype(base_days, dates):
+    """
+    Компактный тип колонки "Дни хранения", общий для всех дат прогноза.
+
+    Args:
+        base_days: Дни хранения на первую дату прогноза.
+        dates: Даты прогноза (DatetimeIndex).
+
+    Returns:
+        numpy.dtype: int16, если значения на всех датах помещаются, иначе
+            int32 или int64.
+    """
+    if len(base_days) == 0 or len(dates) == 0:
+        return np.dtype(np.int16)
+    span = (dates[-1] - dates[0]).days
+    return narrow_int_dtype(
+        min(base_days.min(), NO_DATE_DAYS), max(base_days.max() + span, NO_DATE_DAYS)
+    )
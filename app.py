@@ -1,24 +1,44 @@
 import streamlit as st
-import pandas as pd
 import datetime
 import os
-
+import uuid
+
+from cache import (
+    DEFAULT_DISK_DIR,
+    DEFAULT_DISK_FORMAT,
+    ResultCache,
+    content_hash,
+    make_key,
+)
+from constants import BYTES_IN_MB
 from constants import METHOD1_REQUIRED_COLUMNS, METHOD2_REQUIRED_COLUMNS
 from utils import (
     validate_columns,
     generate_sample_data_method1,
     generate_sample_data_method2,
 )
+from data_io import SUPPORTED_INPUT_FORMATS
+from details import DEFAULT_DETAILS_DIR, prune_details
+from dtypes import memory_report, memory_summary, normalize_dtypes
+from ingest import read_input
 from data_processors import (
     forecast_with_demand,
     forecast_without_demand,
-    handle_materials_without_date,
-    handle_mixed_batches,
+    preprocess_input,
 )
+from jobs import DONE, FAILED, JobManager
+from profiling import Profiler
+from scenario_editor import scenarios_from_table, show_scenario_editor
+from scenarios import forecast_scenarios
 from visualization import display_results
 from help import show_help_page
 
 EXCEL_MIME_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# How often the progress panel polls a running forecast job, seconds
+JOB_POLL_SECONDS = 0.5
+# Detail storage: "lazy" builds rows per date on demand, "mmap" writes all
+# rows once to a memory-mapped Arrow file in STOK_DETAILS_DIR
+DETAILS_MODE = os.environ.get("STOK_DETAILS", "lazy")
 
 
 def initialize_session_state():
@@ -44,7 +64,7 @@ def initialize_session_state():
         st.session_state.forecast_step = 30
 
     if "data_source" not in st.session_state:
-        st.session_state.data_source = "Загрузить Excel файл"
+        st.session_state.data_source = "Загрузить файл"
 
     if "selected_forecast_date" not in st.session_state:
         st.session_state.selected_forecast_date = None
@@ -55,21 +75,60 @@ def initialize_session_state():
     if "last_uploaded_file" not in st.session_state:
         st.session_state.last_uploaded_file = None
 
+    if "memory_report" not in st.session_state:
+        st.session_state.memory_report = None
+
     if "show_help" not in st.session_state:
         st.session_state.show_help = False
 
+    if "profiler" not in st.session_state:
+        st.session_state.profiler = Profiler()
+
+    if "forecast_job" not in st.session_state:
+        st.session_state.forecast_job = None
+
+    # Identifies this session among the subscribers of a shared job
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+
+    if "scenario_summary" not in st.session_state:
+        st.session_state.scenario_summary = None
+
+
+@st.cache_resource
+def get_result_store():
+    """
+    Parsed files and forecast results shared by all sessions of the process.
+
+    Sessions that load the same file with the same parameters get the same
+    frames instead of parsing and forecasting again; stored values are never
+    modified in place.
+    """
+    return ResultCache(disk_dir=DEFAULT_DISK_DIR, disk_format=DEFAULT_DISK_FORMAT)
+
 
 def toggle_help():
     """Toggle the help screen display state."""
     st.session_state.show_help = not st.session_state.show_help
 
 
-def on_method_change():
-    """Reset uploaded data when method changes"""
+def clear_uploaded_data():
+    """Drop the loaded dataset with its forecast results and pending job."""
     st.session_state.uploaded_data = None
+    st.session_state.last_uploaded_file = None
+    st.session_state.memory_report = None
     st.session_state.forecast_summary = None
     st.session_state.forecast_details = None
     st.session_state.selected_forecast_date = None
+    cancel_forecast_job()
+    st.session_state.forecast_job = None
+    st.session_state.scenario_summary = None
+
+
+def on_method_change():
+    """Reset uploaded data when method changes"""
+    clear_uploaded_data()
+    st.session_state.profiler = Profiler()
 
 
 def on_file_upload():
@@ -77,6 +136,251 @@ def on_file_upload():
     return
 
 
+def load_uploaded_file(uploaded_file, method):
+    """Parse the uploaded file once per content hash and method."""
+    method_number = 1 if "Метод 1" in method else 2
+    file_hash = content_hash(uploaded_file.getvalue())
+    if (
+        file_hash == st.session_state.last_uploaded_file
+        and st.session_state.uploaded_data is not None
+    ):
+        return
+    (
+        st.session_state.uploaded_data,
+        st.session_state.memory_report,
+    ) = get_result_store().get_or_compute(
+        make_key("parsed", file_hash, method_number, "all_columns"),
+        lambda: load_table(read_input(uploaded_file, method_number, all_columns=True)),
+    )
+    st.session_state.last_uploaded_file = file_hash
+
+
+def load_table(raw_df):
+    """Normalize dtypes at ingest and report memory before and after."""
+    df = normalize_dtypes(raw_df)
+    return df, memory_report(raw_df, df)
+
+
+def show_memory_report(report):
+    """Show the ingest memory report."""
+    with st.expander(f"Память данных: {memory_summary(report)}", expanded=False):
+        st.dataframe(report, use_container_width=True, hide_index=True)
+
+
+def profiling():
+    """Stage timings for this run, with cProfile if enabled in the sidebar."""
+    return st.session_state.profiler.activate(
+        cprofile=st.session_state.get("cprofile_enabled", False)
+    )
+
+
+def result_store_summary(stats):
+    """One-line usage and hit/miss summary of the shared result store."""
+    used_mb = stats["bytes"] / BYTES_IN_MB
+    budget_mb = stats["max_bytes"] / BYTES_IN_MB
+    return (
+        f"Общий кэш результатов: записей {stats['entries']}, "
+        f"{used_mb:.1f} из {budget_mb:.0f} МБ, "
+        f"попаданий {stats['hits']}, промахов {stats['misses']} "
+        f"({stats['hit_rate']:.0%}), вытеснено {stats['evictions']}"
+    )
+
+
+def show_performance_panel(profiler):
+    """Collapsible per-stage timings and the optional cProfile capture."""
+    if not profiler.records:
+        return
+    report = profiler.to_frame()
+    with st.expander("Производительность", expanded=False):
+        st.caption(result_store_summary(get_result_store().stats()))
+        st.dataframe(
+            report,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Время, с": st.column_config.NumberColumn(format="%.3f"),
+                "Память, МБ": st.column_config.NumberColumn(format="%.1f"),
+            },
+        )
+        if profiler.profile is not None:
+            st.download_button(
+                "Скачать профиль cProfile (.prof)",
+                data=profiler.cprofile_dump(),
+                file_name="stok_profile.prof",
+                mime="application/octet-stream",
+                on_click="ignore",
+            )
+            st.code(profiler.cprofile_stats(), language=None)
+
+
+@st.cache_resource
+def get_job_manager():
+    """Background executor shared by all sessions of the server process."""
+    return JobManager()
+
+
+def forecast_start():
+    """
+    Start of today's forecast: midnight, so a result cached under today's
+    date is the same whenever during the day it was computed.
+    """
+    return datetime.datetime.combine(datetime.date.today(), datetime.time())
+
+
+def run_forecast_job(job, df, method, end_date, step_days, current_date):
+    """Forecast body of a background job; progress is reported per partition."""
+    df = df.copy(deep=False)
+    forecast = forecast_with_demand
+    if "Метод 2" in method:
+        forecast = forecast_without_demand
+        df = preprocess_input(df, 2)
+    # The detail file is named by the job key, so results restored from the
+    # disk cache keep pointing at it
+    detail_path = os.path.join(DEFAULT_DETAILS_DIR, f"{job.key}.arrow")
+    result = forecast(
+        df,
+        end_date,
+        step_days,
+        current_date,
+        details=DETAILS_MODE,
+        progress=job.report,
+        detail_path=detail_path if DETAILS_MODE == "mmap" else None,
+    )
+    if DETAILS_MODE == "mmap":
+        # Detail files outlive sessions; keep the directory within its limit
+        prune_details(keep=[detail_path])
+    return result
+
+
+def set_forecast_results(summary, details):
+    st.session_state.forecast_summary = summary
+    st.session_state.forecast_details = details
+    if st.session_state.selected_forecast_date is None and not details.empty:
+        st.session_state.selected_forecast_date = details.dates[0].strftime("%Y-%m-%d")
+
+
+def submit_forecast(df, method, end_date, step_days, source_key):
+    """
+    Use a cached result for the same inputs or start a background job.
+
+    The session detaches from a job for other inputs; a running job for the
+    same inputs is kept, so reruns and repeated clicks never restart the
+    calculation.
+    """
+    current_date = forecast_start()
+    key = make_key("forecast", source_key, method, end_date, step_days, current_date)
+    cached = get_result_store().get(key)
+    if cached is not None and not getattr(cached[1], "available", True):
+        # The detail file of a stored result was pruned: compute it again
+        get_result_store().discard(key)
+        cached = None
+    if cached is not None:
+        cancel_forecast_job()
+        st.session_state.forecast_job = None
+        set_forecast_results(*cached)
+        return
+    job = st.session_state.forecast_job
+    if job is not None and job.key != key:
+        cancel_forecast_job()
+    st.session_state.forecast_job = get_job_manager().submit(
+        key,
+        run_forecast_job,
+        df,
+        method,
+        end_date,
+        step_days,
+        current_date,
+        subscriber=st.session_state.session_id,
+    )
+
+
+def cancel_forecast_job():
+    """
+    Detach this session from its job.
+
+    A job shared with other sessions keeps running for them and is only
+    cancelled when its last session detaches.
+    """
+    job = st.session_state.get("forecast_job")
+    if job is not None and not job.unsubscribe(st.session_state.session_id):
+        st.session_state.forecast_job = None
+
+
+def collect_forecast_job():
+    """Move a finished job's result into the session and the result cache."""
+    job = st.session_state.forecast_job
+    if job is None or not job.finished:
+        return
+    st.session_state.forecast_job = None
+    if job.status == DONE:
+        # Sessions waiting for the same shared job store its result once
+        set_forecast_results(
+            *get_result_store().get_or_compute(job.key, lambda: job.result)
+        )
+    elif job.status == FAILED:
+        st.error(f"Ошибка при расчете прогноза: {job.error}")
+    else:
+        st.warning("Расчет прогноза отменен")
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def show_forecast_progress():
+    """Poll the running job: progress, cancel button and partial summary."""
+    job = st.session_state.forecast_job
+    if job is None:
+        return
+    if job.finished:
+        st.rerun()
+    if job.cancel_requested:
+        text = "Отмена расчета..."
+    elif job.total:
+        text = (
+            f"Выполняется прогнозирование: {job.done} из {job.total}, "
+            f"{job.elapsed:.0f} с"
+        )
+    else:
+        text = "Выполняется прогнозирование..."
+    st.progress(job.progress, text=text)
+    st.button(
+        "Отменить расчет",
+        on_click=cancel_forecast_job,
+        disabled=job.cancel_requested,
+        key="cancel_forecast",
+    )
+    if job.partial is not None and not job.partial.empty:
+        st.caption("Сводка по рассчитанным частям (обновляется по ходу расчета)")
+        st.dataframe(job.partial, use_container_width=True, hide_index=True)
+
+
+def run_scenarios(df, method, table, end_date, step_days, source_key):
+    """Forecast all scenarios of the editor table in one pass, cached like forecasts."""
+    method_number = 1 if "Метод 1" in method else 2
+    scenarios = scenarios_from_table(table, method_number)
+    if not scenarios:
+        raise ValueError("Не задано ни одного сценария")
+    current_date = forecast_start()
+    key = make_key(
+        "scenarios",
+        source_key,
+        method,
+        end_date,
+        step_days,
+        table.to_csv(index=False),
+        current_date,
+    )
+
+    def compute():
+        data = df.copy(deep=False)
+        if method_number == 2:
+            data = preprocess_input(data, 2)
+        return forecast_scenarios(
+            data, scenarios, end_date, step_days, current_date, method=method_number
+        )
+
+    with profiling():
+        return get_result_store().get_or_compute(key, compute)
+
+
 def main():
     st.set_page_config(
         page_title="Система прогнозирования СНЗ и КСНЗ",
@@ -154,20 +458,25 @@ def main():
 
             data_source = st.radio(
                 "Источник данных:",
-                ["Загрузить Excel файл", "Использовать тестовые данные"],
+                ["Загрузить файл", "Использовать тестовые данные"],
                 key="data_source",
             )
 
-            if data_source == "Загрузить Excel файл":
+            if data_source == "Загрузить файл":
                 uploaded_file = st.file_uploader(
-                    "Загрузите Excel файл", type=["xlsx", "xls"], key="file_uploader"
+                    "Загрузите файл (Excel, CSV, Parquet, Feather)",
+                    type=SUPPORTED_INPUT_FORMATS,
+                    key="file_uploader",
                 )
 
                 if uploaded_file is not None:
                     try:
-                        df = pd.read_excel(uploaded_file)
-                        st.session_state.uploaded_data = df
+                        with profiling():
+                            load_uploaded_file(uploaded_file, method)
                     except Exception as e:
+                        # The previous file must not stay active under the
+                        # name of the file that failed to load
+                        clear_uploaded_data()
                         st.error(f"Ошибка при загрузке файла: {str(e)}")
 
             today = datetime.datetime.now().date()
@@ -187,6 +496,12 @@ def main():
                 key="forecast_step",
             )
 
+            st.checkbox(
+                "Профилирование cProfile",
+                key="cprofile_enabled",
+                help="Записывать профиль вызовов для скачивания (замедляет расчет)",
+            )
+
             st.markdown("---")
             run_forecast = st.button(
                 "Рассчитать прогноз", type="primary", use_container_width=True
@@ -232,6 +547,7 @@ def main():
                 df = generate_sample_data_method1()
             else:
                 df = generate_sample_data_method2()
+            df, st.session_state.memory_report = load_table(df)
             st.session_state.uploaded_data = df
             st.info(f"Используются тестовые данные для {method}")
         elif st.session_state.uploaded_data is not None:
@@ -244,6 +560,8 @@ def main():
             )
             with st.expander("Просмотр исходных данных", expanded=False):
                 st.dataframe(df, use_container_width=True)
+            if st.session_state.memory_report is not None:
+                show_memory_report(st.session_state.memory_report)
 
             required_cols = (
                 METHOD1_REQUIRED_COLUMNS
@@ -255,45 +573,47 @@ def main():
                 st.error(f"Неверный формат. Нет колонок: {', '.join(missing)}")
                 df = None
 
+            source_key = (
+                st.session_state.last_uploaded_file
+                if data_source == "Загрузить файл"
+                else "sample"
+            )
             if df is not None and run_forecast:
+                # The job runs in a copy of this context, so its stages are
+                # recorded by the session profiler
+                with profiling():
+                    submit_forecast(df, method, end_date, step_days, source_key)
+
+            collect_forecast_job()
+            if st.session_state.forecast_job is not None:
                 st.markdown(
                     '<h2 class="sub-header">Результаты</h2>', unsafe_allow_html=True
                 )
-                with st.spinner("Выполняется прогнозирование..."):
-                    if "Метод 1" in method:
-                        summary, details = forecast_with_demand(df, end_date, step_days)
-                    else:  # Method 2
-                        df = handle_materials_without_date(df)
-                        df = handle_mixed_batches(df)
-                        summary, details = forecast_without_demand(
-                            df, end_date, step_days
-                        )
-
-                    st.session_state.forecast_summary = summary
-                    st.session_state.forecast_details = details
-                    if (
-                        st.session_state.selected_forecast_date is None
-                        and not details.empty
-                    ):
-                        all_dates = details["Дата прогноза"].unique()
-                        if len(all_dates) > 0:
-                            st.session_state.selected_forecast_date = all_dates[0]
-
-                if not summary.empty:
-                    display_results(summary, details, method)
-
+                show_forecast_progress()
             elif st.session_state.forecast_summary is not None:
                 st.markdown(
                     '<h2 class="sub-header">Результаты</h2>', unsafe_allow_html=True
                 )
-                display_results(
-                    st.session_state.forecast_summary,
-                    st.session_state.forecast_details,
+                if not st.session_state.forecast_summary.empty:
+                    with profiling():
+                        display_results(
+                            st.session_state.forecast_summary,
+                            st.session_state.forecast_details,
+                            method,
+                        )
+            if df is not None and st.session_state.forecast_job is None:
+                show_scenario_editor(
                     method,
+                    end_date,
+                    step_days,
+                    lambda table: run_scenarios(
+                        df, method, table, end_date, step_days, source_key
+                    ),
                 )
+            show_performance_panel(st.session_state.profiler)
         else:
-            if data_source == "Загрузить Excel файл":
-                st.info("Пожалуйста, загрузите Excel файл для начала работы.")
+            if data_source == "Загрузить файл":
+                st.info("Пожалуйста, загрузите файл с данными для начала работы.")
 
 
 if __name__ == "__main__":
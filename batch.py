@@ -0,0 +1,214 @@
+import concurrent.futures
+import datetime
+import io
+import os
+
+import pandas as pd
+
+from cache import ResultCache, frame_fingerprint, make_key
+from constants import PARTITION_COLUMNS
+from data_io import read_table, write_table
+from data_processors import forecast_timeline, preprocess_input
+from ingest import read_input
+
+SUMMARY_KEYS = ["Дата прогноза", "Категория"]
+
+
+def _to_ipc(df):
+    return write_table(df, "feather")
+
+
+def _from_ipc(data):
+    return read_table(io.BytesIO(data), "feather")
+
+
+def split_partitions(df, method=1):
+    """
+    Разбиение выгрузки на независимые части по организационным ключам.
+
+    Партии (Метод 2) и группы FIFO не пересекают границы частей, поэтому
+    сводка по частям совпадает со сводкой по всему файлу.
+
+    Args:
+        df: Исходные данные.
+        method: Метод прогнозирования (определяет колонки PARTITION_COLUMNS).
+
+    Returns:
+        list: Пары (ключ, DataFrame) в порядке сортировки ключей.
+    """
+    grouped = df.groupby(
+        PARTITION_COLUMNS[method], sort=True, dropna=False, observed=True
+    )
+    return [(key, part.reset_index(drop=True)) for key, part in grouped]
+
+
+def _forecast_partition(
+    source, method, forecast_end_date, step_days, current_date, depletion
+):
+    """
+    Задача процесса-исполнителя: сводка по одному файлу или части.
+
+    Данные части передаются и возвращаются в формате Arrow IPC, а не как
+    pickle DataFrame.
+    """
+    if isinstance(source, bytes):
+        df = _from_ipc(source)
+    else:
+        # Как в stok forecast: проверка заголовка, коды строками с нулями
+        df = read_input(source, method)
+    if method == 2:
+        df = preprocess_input(df, 2, current_date)
+    summary_df = forecast_timeline(
+        df, forecast_end_date, step_days, current_date, method, depletion
+    )
+    return _to_ipc(summary_df)
+
+
+def merge_summaries(summaries):
+    """
+    Сложение сводных таблиц по частям в одну.
+
+    Args:
+        summaries: Сводные DataFrame частей.
+
+    Returns:
+        pd.DataFrame: Сводка, упорядоченная по дате прогноза и категории.
+    """
+    summaries = [summary for summary in summaries if not summary.empty]
+    if not summaries:
+        return pd.DataFrame()
+    combined = pd.concat(summaries, ignore_index=True)
+    return combined.groupby(SUMMARY_KEYS, sort=True, as_index=False).sum()
+
+
+def forecast_batch(
+    sources,
+    forecast_end_date,
+    step_days=30,
+    current_date=None,
+    method=1,
+    depletion=None,
+    workers=None,
+    on_error=None,
+):
+    """
+    Параллельный расчет сводок по файлам или частям выгрузки.
+
+    Каждый источник обрабатывается в отдельном процессе ProcessPoolExecutor.
+    DataFrame передаются исполнителям в формате Arrow IPC, пути к файлам -
+    как есть (файл читается ingest.read_input в процессе-исполнителе).
+
+    Args:
+        sources: Пути к файлам и/или DataFrame (например, из split_partitions).
+        forecast_end_date: Конечная дата прогноза.
+        step_days: Шаг прогноза в днях.
+        current_date: Дата, от которой начинается прогноз (для тестирования).
+        method: Метод прогнозирования (1 или 2).
+        depletion: Модель расхода запаса: None, "linear" или "fifo".
+        workers: Количество процессов (None - по числу ядер, 1 - без пула).
+        on_error: Функция on_error(номер источника, исключение): ошибка
+            источника не прерывает расчет остальных, его сводка - None.
+            Без нее исключение передается вызывающему.
+
+    Returns:
+        list: Сводные DataFrame в порядке sources.
+    """
+    # Дата фиксируется до запуска, чтобы все процессы считали от одной даты
+    if current_date is None:
+        current_date = datetime.datetime.now()
+    payloads = [
+        _to_ipc(source) if isinstance(source, pd.DataFrame) else str(source)
+        for source in sources
+    ]
+    args = (method, forecast_end_date, step_days, current_date, depletion)
+
+    def collect(position, get_result):
+        try:
+            return _from_ipc(get_result())
+        except Exception as error:
+            if on_error is None:
+                raise
+            on_error(position, error)
+            return None
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(payloads) <= 1:
+        return [
+            collect(position, lambda: _forecast_partition(payload, *args))
+            for position, payload in enumerate(payloads)
+        ]
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=min(workers, len(payloads))
+    ) as executor:
+        futures = [
+            executor.submit(_forecast_partition, payload, *args) for payload in payloads
+        ]
+        return [
+            collect(position, future.result) for position, future in enumerate(futures)
+        ]
+
+
+def forecast_incremental(
+    df,
+    forecast_end_date,
+    step_days=30,
+    current_date=None,
+    method=1,
+    depletion=None,
+    store=None,
+    workers=None,
+):
+    """
+    Сводка с пересчетом только измененных частей выгрузки.
+
+    Сводка каждой части сохраняется в store под ключом из отпечатка ее строк
+    и параметров прогноза. При повторной загрузке пересчитываются только
+    части, строки которых изменились, остальные берутся из store. Чтобы
+    результаты переиспользовались между запусками, передавайте одну и ту же
+    current_date.
+
+    Args:
+        df: Исходные данные (для Метода 2 - до preprocess_input).
+        forecast_end_date: Конечная дата прогноза.
+        step_days: Шаг прогноза в днях.
+        current_date: Дата, от которой начинается прогноз.
+        method: Метод прогнозирования (1 или 2).
+        depletion: Модель расхода запаса: None, "linear" или "fifo".
+        store: Хранилище сводок частей (ResultCache, в том числе дисковый).
+        workers: Количество процессов для пересчета измененных частей.
+
+    Returns:
+        tuple: (summary_df, ключи пересчитанных частей).
+    """
+    if current_date is None:
+        current_date = datetime.datetime.now()
+    if store is None:
+        store = ResultCache()
+    params = (
+        method,
+        pd.Timestamp(forecast_end_date),
+        step_days,
+        pd.Timestamp(current_date),
+        depletion,
+    )
+
+    results = {}
+    changed = []
+    for partition_key, part in split_partitions(df, method):
+        key = make_key("partition", frame_fingerprint(part), *params)
+        results[key] = store.get(key)
+        if results[key] is None:
+            changed.append((partition_key, key, part))
+
+    summaries = forecast_batch(
+        [part for _, _, part in changed],
+        forecast_end_date,
+        step_days,
+        current_date,
+        method,
+        depletion,
+        workers,
+    )
+    for (_, key, _), summary in zip(changed, summaries):
+        results[key] = store.put(key, summary)
+    return merge_summaries(results.values()), [key for key, _, _ in changed]
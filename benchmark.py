@@ -0,0 +1,168 @@
+"""
+Замеры производительности прогноза и экспорта на синтетических данных:
+запуск этапов benchmark_cases из командной строки, сохранение и сравнение
+результатов.
+
+Пример:
+    python -m benchmark run --rows 10000 100000 --horizon 365 1095 --step 30
+    python -m benchmark compare benchmark_results/a1b2c3d.json \\
+        benchmark_results/e4f5a6b.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from benchmark_cases import (
+    CASES,
+    DEFAULT_HORIZONS,
+    DEFAULT_ROWS,
+    DEFAULT_STEPS,
+    run_benchmarks,
+)
+
+RESULTS_DIR = "benchmark_results"
+# Замедление, начиная с которого compare сообщает о регрессии; разница
+# меньше REGRESSION_MIN_SECONDS считается шумом замера
+REGRESSION_THRESHOLD = 1.2
+REGRESSION_MIN_SECONDS = 0.05
+
+
+def current_commit():
+    """Короткий хэш текущего коммита или "unknown" вне репозитория git."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_results(results, path):
+    """Запись результатов с описанием окружения в JSON."""
+    payload = {
+        "commit": current_commit(),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(payload, file, ensure_ascii=False, indent=2)
+    return payload
+
+
+def _result_key(result):
+    return (
+        result["case"],
+        result["method"],
+        result["rows"],
+        result["horizon_days"],
+        result["step_days"],
+    )
+
+
+def compare_results(baseline, candidate, threshold=REGRESSION_THRESHOLD):
+    """
+    Сравнение двух наборов замеров (содержимое JSON save_results).
+
+    Returns:
+        pd.DataFrame: Общие замеры с отношением времени и памяти к базовому
+            и признаком регрессии (время выросло больше чем в threshold раз
+            и больше чем на REGRESSION_MIN_SECONDS).
+    """
+    base = {_result_key(result): result for result in baseline["results"]}
+    rows = []
+    for result in candidate["results"]:
+        before = base.get(_result_key(result))
+        if before is None:
+            continue
+        time_ratio = result["seconds"] / before["seconds"] if before["seconds"] else 1
+        slower = result["seconds"] - before["seconds"] > REGRESSION_MIN_SECONDS
+        rows.append(
+            {
+                "Этап": result["case"],
+                "Метод": result["method"],
+                "Строк": result["rows"],
+                "Горизонт": result["horizon_days"],
+                "Шаг": result["step_days"],
+                "Было, с": before["seconds"],
+                "Стало, с": result["seconds"],
+                "Время, раз": time_ratio,
+                "Было, МБ": before["peak_mb"],
+                "Стало, МБ": result["peak_mb"],
+                "Регрессия": slower and time_ratio > threshold,
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmark", description="Замеры производительности прогноза"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Выполнить замеры и сохранить JSON")
+    run.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    run.add_argument("--horizon", type=int, nargs="+", default=DEFAULT_HORIZONS)
+    run.add_argument("--step", type=int, nargs="+", default=DEFAULT_STEPS)
+    run.add_argument("--cases", nargs="+", choices=list(CASES))
+    run.add_argument("--repeat", type=int, default=1)
+    run.add_argument("--current-date", help="Дата начала прогноза (ГГГГ-ММ-ДД)")
+    run.add_argument(
+        "--out", help=f"Файл результатов (по умолчанию {RESULTS_DIR}/<коммит>.json)"
+    )
+
+    compare = commands.add_parser("compare", help="Сравнить два файла результатов")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+    compare.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "run":
+        results = run_benchmarks(
+            args.rows,
+            args.horizon,
+            args.step,
+            args.cases,
+            args.repeat,
+            pd.Timestamp(args.current_date) if args.current_date else None,
+            log=print,
+        )
+        path = args.out or os.path.join(RESULTS_DIR, f"{current_commit()}.json")
+        save_results(results, path)
+        print(f"Результаты: {path}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    with open(args.candidate, encoding="utf-8") as file:
+        candidate = json.load(file)
+    report = compare_results(baseline, candidate, args.threshold)
+    if report.empty:
+        print("Нет общих замеров")
+        return 0
+    print(report.to_string(index=False, float_format="{:.3f}".format))
+    return 1 if report["Регрессия"].any() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Этапы замеров производительности: предобработка, прогноз и экспорт на
+синтетических данных (synthetic.generate_dataset). Командная строка и
+сравнение результатов - в модуле benchmark.
+"""
+
+import time
+import tracemalloc
+
+import pandas as pd
+
+from data_processors import (
+    forecast_timeline,
+    forecast_with_demand,
+    forecast_without_demand,
+    handle_materials_without_date,
+    handle_mixed_batches,
+    preprocess_input,
+)
+from constants import BYTES_IN_MB
+from dtypes import normalize_dtypes
+from synthetic import generate_dataset
+from visualization import get_value_column, prepare_export_files, summary_pivot
+
+DEFAULT_ROWS = [10_000]
+DEFAULT_HORIZONS = [365, 1095]
+DEFAULT_STEPS = [30]
+# Экспорт замеряется на одном горизонте и шаге: объем детальных данных
+# растет с числом дат, а xlsx на длинных горизонтах пишется минутами
+EXPORT_GRID = [(365, 30)]
+# Этапы предобработки не зависят от горизонта и шага
+NO_GRID = [(0, 0)]
+
+
+def _forecast_method1(data, end_date, step_days, current_date):
+    return forecast_with_demand(data[1], end_date, step_days, current_date)
+
+
+def _forecast_method2(data, end_date, step_days, current_date):
+    return forecast_without_demand(
+        data["2_prepared"], end_date, step_days, current_date
+    )
+
+
+def _export(export_type):
+    """
+    Подготовка этапа экспорта через точку входа приложения.
+
+    Результаты прогноза берутся в том представлении, в каком их получает
+    экспорт приложения (ленивые детальные данные), лист сводной таблицы -
+    как у графика на вкладке "Динамика".
+    """
+
+    def setup(data, end_date, step_days, current_date):
+        summary, details = forecast_with_demand(
+            data[1], end_date, step_days, current_date, details="lazy"
+        )
+        pivot_df = summary_pivot(summary, get_value_column(summary))
+        return lambda: prepare_export_files(export_type, summary, details, pivot_df)
+
+    return setup
+
+
+# Этап: (метод данных, фиксированная сетка горизонтов и шагов или None,
+# подготовка). Подготовка получает (data, end_date, step_days, current_date)
+# и возвращает замеряемую функцию без аргументов, поэтому расчет прогноза
+# для этапов экспорта в замер не входит.
+CASES = {
+    "handle_materials_without_date": (
+        2,
+        NO_GRID,
+        lambda data, *_: lambda: handle_materials_without_date(data[2]),
+    ),
+    "handle_mixed_batches": (
+        2,
+        NO_GRID,
+        lambda data, end, step, today: lambda: handle_mixed_batches(data[2], today),
+    ),
+    "forecast_with_demand": (
+        1,
+        None,
+        lambda *args: lambda: _forecast_method1(*args),
+    ),
+    "forecast_without_demand": (
+        2,
+        None,
+        lambda *args: lambda: _forecast_method2(*args),
+    ),
+    "forecast_timeline": (
+        2,
+        None,
+        lambda data, end, step, today: lambda: forecast_timeline(
+            data["2_prepared"], end, step, today, method=2
+        ),
+    ),
+    "export_excel": (1, EXPORT_GRID, _export("Excel (все данные)")),
+    "export_zip": (1, EXPORT_GRID, _export("ZIP: Parquet по датам")),
+    "export_parquet": (1, EXPORT_GRID, _export("Parquet")),
+}
+
+
+def measure(func, repeat=1):
+    """
+    Время (лучшее из repeat запусков) и пиковая память одного запуска.
+
+    Память измеряется tracemalloc в отдельном запуске, чтобы накладные
+    расходы трассировки не попадали во время. Учитываются выделения Python
+    и NumPy, но не буферы Arrow.
+
+    Returns:
+        dict: seconds, peak_mb.
+    """
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(seconds), "peak_mb": peak / BYTES_IN_MB}
+
+
+def prepare_data(rows, current_date, seed=0):
+    """Входные данные обоих методов в том виде, в каком их получает прогноз."""
+    data = {
+        method: normalize_dtypes(
+            generate_dataset(method, rows, seed=seed, current_date=current_date)
+        )
+        for method in (1, 2)
+    }
+    data["2_prepared"] = preprocess_input(data[2].copy(), 2, current_date)
+    return data
+
+
+def run_benchmarks(
+    rows=DEFAULT_ROWS,
+    horizons=DEFAULT_HORIZONS,
+    steps=DEFAULT_STEPS,
+    cases=None,
+    repeat=1,
+    current_date=None,
+    log=None,
+):
+    """
+    Замеры выбранных этапов на сетке размеров, горизонтов и шагов.
+
+    Args:
+        rows: Размеры данных, строк.
+        horizons: Горизонты прогноза, дней от current_date.
+        steps: Шаги прогноза, дней.
+        cases: Имена этапов из CASES (None - все).
+        repeat: Количество запусков для замера времени.
+        current_date: Дата начала прогноза (по умолчанию начало сегодняшнего дня).
+        log: Функция вывода строки о каждом замере.
+
+    Returns:
+        list: Словари с параметрами и результатами замеров.
+    """
+    if current_date is None:
+        current_date = pd.Timestamp.today().normalize()
+    results = []
+    for size in rows:
+        data = prepare_data(size, current_date)
+        for name in cases or CASES:
+            method, grid, setup = CASES[name]
+            for horizon, step in grid or [(h, s) for h in horizons for s in steps]:
+                end_date = current_date + pd.Timedelta(days=horizon)
+                func = setup(data, end_date, step, current_date)
+                result = {
+                    "case": name,
+                    "method": method,
+                    "rows": size,
+                    "horizon_days": horizon,
+                    "step_days": step,
+                    **measure(func, repeat),
+                }
+                results.append(result)
+                if log:
+                    log(format_result(result))
+    return results
+
+
+def format_result(result):
+    """Строка отчета об одном замере."""
+    grid = ""
+    if result["horizon_days"]:
+        grid = f", горизонт {result['horizon_days']} дн., шаг {result['step_days']} дн."
+    return (
+        f"{result['case']} (метод {result['method']}, {result['rows']} строк{grid}): "
+        f"{result['seconds']:.3f} с, пик {result['peak_mb']:.1f} МБ"
+    )
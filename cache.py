@@ -0,0 +1,300 @@
+import collections
+import hashlib
+import os
+import pickle
+import shutil
+import sys
+import threading
+
+import pandas as pd
+
+# Лимит памяти кэша по умолчанию (МБ), каталог и формат дискового кэша
+# из окружения
+DEFAULT_MAX_MB = int(os.environ.get("STOK_CACHE_MAX_MB", "512"))
+DEFAULT_DISK_DIR = os.environ.get("STOK_CACHE_DIR") or None
+DEFAULT_DISK_FORMAT = os.environ.get("STOK_CACHE_FORMAT", "arrow")
+DISK_FORMATS = ("pickle", "arrow")
+
+
+def content_hash(data):
+    """SHA-256 содержимого файла (bytes)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_key(*parts):
+    """Ключ кэша из частей (хэш файла, метод, дата окончания, шаг...)."""
+    return hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def frame_fingerprint(df):
+    """Отпечаток содержимого DataFrame: SHA-256 построчных хэшей и имен колонок."""
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return make_key(content_hash(row_hashes.tobytes()), *df.columns)
+
+
+def estimate_size(value):
+    """
+    Оценка объема памяти значения в байтах.
+
+    DataFrame оцениваются через memory_usage(deep=True), кортежи и списки -
+    по сумме элементов, объекты с base_df (ленивые детальные результаты) -
+    по исходным строкам.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_size(item) for item in value)
+    if hasattr(value, "base_df"):
+        return estimate_size(value.base_df)
+    return sys.getsizeof(value)
+
+
+def _frames(value):
+    """Список DataFrame значения или None, если значение не из DataFrame."""
+    if isinstance(value, pd.DataFrame):
+        return [value]
+    if isinstance(value, (tuple, list)) and all(
+        isinstance(item, pd.DataFrame) for item in value
+    ):
+        return list(value)
+    return None
+
+
+def _write_arrow(frame, path):
+    from pyarrow import feather
+
+    # Без сжатия: сжатый файл нельзя отобразить в память без распаковки
+    feather.write_feather(
+        frame.reset_index(drop=True), path, compression="uncompressed"
+    )
+
+
+def _map_arrow(path):
+    """
+    DataFrame из файла Arrow IPC, отображенного в память.
+
+    Числовые колонки без пропусков ссылаются на страницы файла (только для
+    чтения), поэтому процессы, открывшие один файл, делят одну копию данных
+    в страничном кэше ОС.
+    """
+    import pyarrow as pa
+
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+class ResultCache:
+    """
+    LRU-кэш разобранных файлов и результатов прогноза.
+
+    Размер ограничен суммарным объемом значений в памяти: при превышении
+    вытесняются давно не использованные записи. Если задан каталог, записи
+    дополнительно сохраняются на диск и переживают перезапуск приложения.
+
+    Каталог дискового кэша - граница доверия: значения не из DataFrame
+    читаются через pickle, а pickle.load может выполнить произвольный код.
+    Каталог создается с доступом только для владельца и не должен быть
+    доступен на запись другим пользователям.
+
+    Один экземпляр может обслуживать всех пользователей процесса: значения
+    отдаются без копирования и не должны изменяться получателем,
+    get_or_compute вычисляет значение ключа один раз, даже если его
+    одновременно запрашивают несколько потоков. Счетчики hits, misses и
+    evictions показывают эффективность кэша (см. stats()).
+    """
+
+    def __init__(
+        self,
+        max_bytes=DEFAULT_MAX_MB * 1024 * 1024,
+        disk_dir=None,
+        disk_format=DEFAULT_DISK_FORMAT,
+    ):
+        """
+        Args:
+            max_bytes: Лимит объема значений в памяти.
+            disk_dir: Каталог дискового кэша (None - только память).
+            disk_format: "arrow" или "pickle" - DataFrame и кортежи из
+                DataFrame записываются в Arrow IPC без сжатия и читаются
+                отображением файла в память, остальные значения - pickle.
+        """
+        if disk_format not in DISK_FORMATS:
+            raise ValueError(f"Неизвестный формат дискового кэша: {disk_format}")
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_format = disk_format
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._computing = {}
+        if disk_dir:
+            os.makedirs(disk_dir, mode=0o700, exist_ok=True)
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries or self._disk_path(key) is not None
+
+    def _disk_path(self, key):
+        """Путь существующей дисковой записи (файл .pkl или каталог .arrow)."""
+        if not self.disk_dir:
+            return None
+        for extension in ("pkl", "arrow"):
+            path = os.path.join(self.disk_dir, f"{key}.{extension}")
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _read_disk(self, path):
+        if path.endswith(".pkl"):
+            with open(path, "rb") as file:
+                return pickle.load(file)
+        names = os.listdir(path)
+        if names == ["frame.arrow"]:
+            return _map_arrow(os.path.join(path, "frame.arrow"))
+        return tuple(
+            _map_arrow(os.path.join(path, f"{position}.arrow"))
+            for position in range(len(names))
+        )
+
+    def _write_disk(self, key, value):
+        frames = _frames(value) if self.disk_format == "arrow" else None
+        if frames is None:
+            path = os.path.join(self.disk_dir, f"{key}.pkl")
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "wb") as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+            return
+        path = os.path.join(self.disk_dir, f"{key}.arrow")
+        temp_path = f"{path}.tmp"
+        shutil.rmtree(temp_path, ignore_errors=True)
+        os.makedirs(temp_path)
+        if isinstance(value, pd.DataFrame):
+            _write_arrow(value, os.path.join(temp_path, "frame.arrow"))
+        else:
+            for position, frame in enumerate(frames):
+                _write_arrow(frame, os.path.join(temp_path, f"{position}.arrow"))
+        # Отображенные в память файлы прежней записи остаются доступны
+        # читателям и после удаления каталога
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(temp_path, path)
+
+    def _store(self, key, value, size):
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self.evictions += 1
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+
+        path = self._disk_path(key)
+        if path is None:
+            return None
+        value = self._read_disk(path)
+        self._store(key, value, estimate_size(value))
+        return value
+
+    def _count(self, value):
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+    def get(self, key, default=None):
+        """Значение по ключу (из памяти или с диска) либо default."""
+        value = self._lookup(key)
+        self._count(value)
+        return default if value is None else value
+
+    def put(self, key, value):
+        """Сохраняет значение в памяти и, если задан каталог, на диске."""
+        self._store(key, value, estimate_size(value))
+        if self.disk_dir:
+            self._write_disk(key, value)
+        return value
+
+    def get_or_compute(self, key, compute):
+        """
+        Значение из кэша или результат compute(), сохраненный в кэш.
+
+        Пока один поток вычисляет значение ключа, остальные запросившие его
+        потоки ждут и получают тот же результат без повторного расчета.
+        """
+        value = self._lookup(key)
+        self._count(value)
+        if value is not None:
+            return value
+        with self._lock:
+            pending = self._computing.setdefault(key, {"lock": threading.Lock()})
+        try:
+            with pending["lock"]:
+                # Значение больше лимита в кэш не попадает, поэтому ожидающие
+                # потоки получают его из pending
+                value = pending.get("value")
+                if value is None:
+                    value = self._lookup(key)
+                if value is None:
+                    value = pending["value"] = self.put(key, compute())
+        finally:
+            with self._lock:
+                if self._computing.get(key) is pending:
+                    del self._computing[key]
+        return value
+
+    def discard(self, key):
+        """Удаляет запись из памяти и с диска (например, устаревшую)."""
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+        path = self._disk_path(key)
+        if path is None:
+            return
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        """Записи, объем, лимит и счетчики попаданий, промахов и вытеснений."""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / requests if requests else 0.0,
+            }
+
+    def clear(self):
+        """Очищает кэш в памяти (дисковые файлы не удаляются)."""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
@@ -39,6 +39,9 @@ AGING_SCALE_METHOD_2 = [
     {"name": "> 3 лет", "min_days": 1096, "max_days": 99999, "status": "СНЗ > 3 лет"},
 ]
 
+# Специальное значение дней хранения для материалов без даты поступления
+NO_DATE_DAYS = 10000
+
 # Константы для цветового кодирования
 COLOR_CODES = {
     "Ликвидный": "#00b050",  # Зеленый
@@ -66,3 +69,38 @@ METHOD2_REQUIRED_COLUMNS = [
     "Дата поступления на склад",
     "Фактический запас",
 ]
+
+# Колонки даты поступления и количества для каждого метода
+METHOD_DATE_COLUMNS = {1: "Дата поступления", 2: "Дата поступления на склад"}
+METHOD_VALUE_COLUMNS = {1: "Количество обеспечения", 2: "Фактический запас"}
+
+# Колонки модели расхода запаса
+CONSUMPTION_COLUMN = "Дневное потребление"
+REMAINING_COLUMN = "Оставшееся количество"
+
+# Ключи группировки партий с разными датами поступления (Метод 2)
+MIXED_BATCH_GROUP_COLUMNS = [
+    "БЕ",
+    "Завод",
+    "Склад",
+    "Материал",
+    "Партия",
+    "СПП элемент",
+]
+
+# Группы материала для списания расхода по FIFO: для Метода 2 расход
+# распределяется между партиями, поэтому "Партия" в ключ не входит
+FIFO_GROUP_COLUMNS = {
+    1: ["БЕ", "Область планирования", "Материал"],
+    2: [column for column in MIXED_BATCH_GROUP_COLUMNS if column != "Партия"],
+}
+
+# Организационные ключи разбиения выгрузки на независимые части для
+# параллельного и инкрементального расчета: партии и группы FIFO не
+# пересекают границы БЕ (Метод 1) и БЕ/Завод/Склад (Метод 2)
+PARTITION_COLUMNS = {
+    1: ["БЕ"],
+    2: ["БЕ", "Завод", "Склад"],
+}
+
+BYTES_IN_MB = 1024 * 1024
@@ -0,0 +1,236 @@
+import io
+import os
+
+import pandas as pd
+
+from profiling import profiled
+
+# Размер блока строк при потоковом чтении по умолчанию
+DEFAULT_CHUNK_ROWS = 100_000
+
+# Форматы входных файлов (расширения) для загрузки данных
+SUPPORTED_INPUT_FORMATS = ["xlsx", "xls", "csv", "parquet", "feather", "arrow"]
+
+# Колоночные форматы экспорта результатов
+COLUMNAR_FORMATS = {
+    "parquet": "application/vnd.apache.parquet",
+    "feather": "application/vnd.apache.arrow.file",
+}
+
+
+def _file_format(path):
+    """Формат файла по расширению (путь или объект загруженного файла)."""
+    name = getattr(path, "name", path)
+    return os.path.splitext(str(name))[1].lower().lstrip(".")
+
+
+@profiled()
+def read_table(source, file_format=None):
+    """
+    Чтение выгрузки целиком в DataFrame.
+
+    Parquet и Feather/Arrow IPC сохраняют типы колонок (даты как datetime64,
+    категории как Categorical), поэтому повторный разбор не требуется.
+
+    Args:
+        source: Путь к файлу или файловый объект (например, загруженный файл).
+        file_format: Формат файла; по умолчанию определяется по расширению.
+
+    Returns:
+        pd.DataFrame: Прочитанные данные.
+    """
+    file_format = file_format or _file_format(source)
+    if file_format in ("xlsx", "xls", "xlsm"):
+        return pd.read_excel(source)
+    if file_format == "csv":
+        return pd.read_csv(source)
+    if file_format == "parquet":
+        return pd.read_parquet(source)
+    if file_format in ("feather", "arrow"):
+        return pd.read_feather(source)
+    raise ValueError(f"Неподдерживаемый формат файла: {file_format}")
+
+
+def write_table(df, file_format):
+    """
+    Сериализация DataFrame в колоночный формат.
+
+    Args:
+        df: Данные для записи: DataFrame или таблица pyarrow (например,
+            детальные результаты, отображенные в память).
+        file_format: "parquet" или "feather" (Arrow IPC).
+
+    Returns:
+        bytes: Содержимое файла.
+    """
+    buffer = io.BytesIO()
+    if not isinstance(df, pd.DataFrame):
+        if file_format == "parquet":
+            import pyarrow.parquet as pq
+
+            pq.write_table(df, buffer)
+        elif file_format in ("feather", "arrow"):
+            from pyarrow import feather
+
+            feather.write_feather(df, buffer)
+        else:
+            raise ValueError(f"Неподдерживаемый формат экспорта: {file_format}")
+    elif file_format == "parquet":
+        df.to_parquet(buffer, index=False)
+    elif file_format in ("feather", "arrow"):
+        df.reset_index(drop=True).to_feather(buffer)
+    else:
+        raise ValueError(f"Неподдерживаемый формат экспорта: {file_format}")
+    return buffer.getvalue()
+
+
+def write_frames(frames, file_format):
+    """
+    Потоковая сериализация частей таблицы в колоночный формат.
+
+    Части (например, детальные строки по датам прогноза) записываются по
+    одной, поэтому в памяти не собирается вся таблица.
+
+    Args:
+        frames: Итератор DataFrame с одинаковыми колонками.
+        file_format: "parquet" или "feather" (Arrow IPC).
+
+    Returns:
+        bytes: Содержимое файла.
+    """
+    import pyarrow as pa
+
+    if file_format not in COLUMNAR_FORMATS and file_format != "arrow":
+        raise ValueError(f"Неподдерживаемый формат экспорта: {file_format}")
+    buffer = io.BytesIO()
+    writer = schema = None
+    try:
+        for frame in frames:
+            table = pa.Table.from_pandas(
+                frame.reset_index(drop=True), schema=schema, preserve_index=False
+            )
+            if writer is None:
+                schema = table.schema
+                if file_format == "parquet":
+                    import pyarrow.parquet as pq
+
+                    writer = pq.ParquetWriter(buffer, schema)
+                else:
+                    # Сжатие lz4, как у feather.write_feather по умолчанию
+                    compression = "lz4" if pa.Codec.is_available("lz4") else None
+                    writer = pa.ipc.new_file(
+                        buffer,
+                        schema,
+                        options=pa.ipc.IpcWriteOptions(compression=compression),
+                    )
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        return write_table(pd.DataFrame(), file_format)
+    return buffer.getvalue()
+
+
+def write_file(df, path, file_format=None):
+    """
+    Запись DataFrame в файл.
+
+    Args:
+        df: Данные для записи.
+        path: Путь к файлу.
+        file_format: "csv", "xlsx", "parquet" или "feather"; по умолчанию
+            определяется по расширению.
+    """
+    file_format = file_format or _file_format(path)
+    if file_format == "csv":
+        df.to_csv(path, index=False)
+    elif file_format == "xlsx":
+        df.to_excel(path, index=False)
+    else:
+        with open(path, "wb") as file:
+            file.write(write_table(df, file_format))
+
+
+def _iter_csv(path, chunk_rows, dtype):
+    yield from pd.read_csv(path, chunksize=chunk_rows, dtype=dtype)
+
+
+def _iter_parquet(path, chunk_rows):
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+        yield batch.to_pandas()
+
+
+def _iter_arrow(path, chunk_rows):
+    import pyarrow as pa
+
+    with pa.memory_map(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        for index in range(reader.num_record_batches):
+            table = pa.Table.from_batches([reader.get_batch(index)])
+            for start in range(0, table.num_rows, chunk_rows):
+                yield table.slice(start, chunk_rows).to_pandas()
+
+
+def _iter_xlsx(path, chunk_rows, dtype):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(column) for column in header]
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) == chunk_rows:
+                yield _frame_from_rows(buffer, header, dtype)
+                buffer = []
+        if buffer:
+            yield _frame_from_rows(buffer, header, dtype)
+    finally:
+        workbook.close()
+
+
+def _frame_from_rows(rows, header, dtype):
+    frame = pd.DataFrame.from_records(rows, columns=header)
+    for column, kind in (dtype or {}).items():
+        if column in frame:
+            # Пустые ячейки остаются пустыми, а не превращаются в "None"
+            values = frame[column]
+            frame[column] = values.where(values.isna(), values.astype(kind))
+    return frame
+
+
+def iter_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS, dtype=None):
+    """
+    Потоковое чтение выгрузки блоками строк.
+
+    Поддерживаются CSV, Parquet и Feather/Arrow IPC (через pyarrow) и xlsx
+    (openpyxl в режиме read-only). В памяти одновременно находится не более
+    одного блока.
+
+    Args:
+        path: Путь к файлу.
+        chunk_rows: Количество строк в блоке.
+        dtype: Необязательный словарь типов колонок (например, str для кодов).
+
+    Yields:
+        pd.DataFrame: Очередной блок строк.
+    """
+    file_format = _file_format(path)
+    if file_format == "csv":
+        yield from _iter_csv(path, chunk_rows, dtype)
+    elif file_format == "parquet":
+        yield from _iter_parquet(path, chunk_rows)
+    elif file_format in ("feather", "arrow"):
+        yield from _iter_arrow(path, chunk_rows)
+    elif file_format in ("xlsx", "xlsm"):
+        yield from _iter_xlsx(path, chunk_rows, dtype)
+    else:
+        raise ValueError(f"Неподдерживаемый формат файла: {path}")
@@ -1,106 +1,385 @@
+import numpy as np
 import pandas as pd
 import datetime
-from utils import calculate_aging_days, determine_aging_category
+from aging import aging_days_dtype, calculate_aging_days_array, get_aging_scale
+from constants import (
+    METHOD_DATE_COLUMNS,
+    METHOD_VALUE_COLUMNS,
+    MIXED_BATCH_GROUP_COLUMNS,
+    NO_DATE_DAYS,
+    PARTITION_COLUMNS,
+    REMAINING_COLUMN,
+)
+from depletion import build_depletion
+from details import (
+    DateIndex,
+    IndexedForecastDetails,
+    LazyForecastDetails,
+    MappedForecastDetails,
+)
+from profiling import profiled, stage
+from timeline import build_summary, forecast_aggregates, merge_aggregates
 
 
-def forecast_with_demand(df, forecast_end_date, step_days=30, current_date=None):
+def forecast_dates(forecast_end_date, step_days, current_date):
+    """Даты прогноза от текущей даты до конечной с заданным шагом."""
+    if current_date is None:
+        current_date = datetime.datetime.now()
+
+    return pd.date_range(
+        start=current_date,
+        end=pd.to_datetime(forecast_end_date),
+        freq=f"{step_days}D",
+    )
+
+
+def _parse_dates(df, date_column):
+    """Приведение колонки дат к datetime64, если она еще не разобрана."""
+    if not pd.api.types.is_datetime64_any_dtype(df[date_column]):
+        df[date_column] = pd.to_datetime(df[date_column])
+
+
+def _forecast_snapshots(
+    df,
+    method,
+    forecast_end_date,
+    step_days,
+    current_date,
+    depletion=None,
+    progress=None,
+):
     """
-    Прогнозирование запасов с учетом потребности.
+    Общий расчет прогноза по срезам на каждую дату прогноза.
 
     Args:
-        df: DataFrame с данными о запасах и потреблении.
+        df: DataFrame с данными о запасах.
+        method: Метод прогнозирования (1 или 2).
         forecast_end_date: Конечная дата прогноза.
         step_days: Шаг прогноза в днях.
-        current_date: Дата, от которой начинается прогноз (для тестирования).
+        current_date: Дата, от которой начинается прогноз.
+        depletion: Модель расхода запаса (см. depletion.build_depletion).
+        progress: Функция progress(готово, всего, сводка), вызываемая после
+            каждой даты (сводка - None).
 
     Returns:
         tuple: Два DataFrame (сводный и детальный).
     """
-    df["Дата поступления"] = pd.to_datetime(df["Дата поступления"])
-    forecast_end_date = pd.to_datetime(forecast_end_date)
+    date_column = METHOD_DATE_COLUMNS[method]
+    value_column = METHOD_VALUE_COLUMNS[method]
+    _parse_dates(df, date_column)
+    dates = forecast_dates(forecast_end_date, step_days, current_date)
 
-    if current_date is None:
-        current_date = datetime.datetime.now()
+    scale = get_aging_scale(method)
+    model = build_depletion(df, method, depletion)
+    summary_columns = [value_column]
+    if model is not None:
+        summary_columns.append(REMAINING_COLUMN)
 
-    dates = pd.date_range(
-        start=current_date, end=forecast_end_date, freq=f"{step_days}D"
+    days_dtype = aging_days_dtype(
+        calculate_aging_days_array(df[date_column], dates[0]) if len(dates) else [],
+        dates,
     )
-
     detailed_results = []
-    for forecast_date in dates:
-        temp_df = df.copy()
-        temp_df["Дни хранения"] = temp_df["Дата поступления"].apply(
-            lambda x: calculate_aging_days(x, forecast_date)
-        )
-        temp_df["Категория"] = temp_df["Дни хранения"].apply(
-            lambda x: determine_aging_category(x, method=1)["status"]
-        )
-        temp_df["Дата прогноза"] = forecast_date
-        detailed_results.append(temp_df)
+    with stage("срезы по датам", len(df)):
+        for position, forecast_date in enumerate(dates, 1):
+            temp_df = df.copy()
+            temp_df["Дни хранения"] = calculate_aging_days_array(
+                temp_df[date_column], forecast_date
+            ).astype(days_dtype)
+            temp_df["Категория"] = scale.classify(temp_df["Дни хранения"])
+            if model is not None:
+                temp_df[REMAINING_COLUMN] = model.remaining(
+                    (forecast_date - dates[0]).days
+                )
+            temp_df["Дата прогноза"] = forecast_date
+            detailed_results.append(temp_df)
+            if progress is not None:
+                progress(position, len(dates), None)
 
     if not detailed_results:
         return pd.DataFrame(), pd.DataFrame()
 
-    detailed_df = pd.concat(detailed_results, ignore_index=True)
-    summary_df = (
-        detailed_df.groupby(["Дата прогноза", "Категория"])["Количество обеспечения"]
-        .sum()
-        .reset_index()
+    with stage("pd.concat") as record:
+        detailed_df = pd.concat(detailed_results, ignore_index=True)
+        record["rows_out"] = len(detailed_df)
+    with stage("groupby", len(detailed_df)):
+        summary_df = (
+            detailed_df.groupby(["Дата прогноза", "Категория"], observed=True)[
+                summary_columns
+            ]
+            .sum()
+            .reset_index()
+        )
+    # Сводная таблица хранит статусы строками в алфавитном порядке, а целые
+    # суммы - в int64 независимо от узкого типа колонок входных данных
+    summary_df["Категория"] = summary_df["Категория"].astype(str)
+    for column in summary_columns:
+        if pd.api.types.is_integer_dtype(summary_df[column]):
+            summary_df[column] = summary_df[column].astype(np.int64)
+    summary_df = summary_df.sort_values(
+        ["Дата прогноза", "Категория"], ignore_index=True
     )
     return summary_df, detailed_df
 
 
-def forecast_without_demand(df, forecast_end_date, step_days=30, current_date=None):
+@profiled("сводка по датам переходов")
+def _timeline_summary(df, method, dates, step_days, model=None):
+    """Сводные результаты по датам переходов для уже рассчитанных дат."""
+    counts, columns = forecast_aggregates(df, method, dates, step_days, model)
+    return build_summary(dates, get_aging_scale(method).statuses, counts, columns)
+
+
+@profiled("сводка по частям")
+def _partitioned_summary(df, method, dates, step_days, depletion, progress):
     """
-    Прогнозирование запасов без учета потребности.
+    Сводные результаты по частям выгрузки (PARTITION_COLUMNS) с вызовом
+    progress(готово, всего, сводка по готовым частям) после каждой части.
+
+    Партии и группы FIFO не пересекают границы частей, поэтому итоговая
+    сводка совпадает с _timeline_summary по всем строкам.
+    """
+    parts = df.groupby(
+        PARTITION_COLUMNS[method], sort=True, dropna=False, observed=True
+    ).indices
+    if not parts:
+        return _timeline_summary(df, method, dates, step_days)
+    statuses = get_aging_scale(method).statuses
+    aggregates = None
+    for done, positions in enumerate(parts.values(), 1):
+        part = df.take(positions)
+        model = build_depletion(part, method, depletion)
+        aggregates = merge_aggregates(
+            aggregates, forecast_aggregates(part, method, dates, step_days, model)
+        )
+        summary_df = build_summary(dates, statuses, *aggregates)
+        progress(done, len(parts), summary_df)
+    return summary_df
+
+
+@profiled()
+def forecast_timeline(
+    df, forecast_end_date, step_days=30, current_date=None, method=1, depletion=None
+):
+    """
+    Прогнозирование сводных результатов через даты переходов между категориями.
+
+    Возраст каждой строки вычисляется один раз, после чего определяются шаги
+    пересечения границ шкалы старения. Время расчета почти не зависит от
+    количества дат прогноза, результат совпадает со сводной таблицей
+    forecast_with_demand/forecast_without_demand.
 
     Args:
         df: DataFrame с данными о запасах.
         forecast_end_date: Конечная дата прогноза.
         step_days: Шаг прогноза в днях.
         current_date: Дата, от которой начинается прогноз (для тестирования).
+        method: Метод прогнозирования (1 или 2).
+        depletion: Модель расхода запаса: None, "linear" или "fifo".
 
     Returns:
-        tuple: Два DataFrame (сводный и детальный).
+        pd.DataFrame: Сводные результаты.
     """
-    df["Дата поступления на склад"] = pd.to_datetime(df["Дата поступления на склад"])
-    forecast_end_date = pd.to_datetime(forecast_end_date)
+    date_column = METHOD_DATE_COLUMNS[method]
+    _parse_dates(df, date_column)
+    dates = forecast_dates(forecast_end_date, step_days, current_date)
+    if len(dates) == 0:
+        return pd.DataFrame()
+    model = build_depletion(df, method, depletion)
+    return _timeline_summary(df, method, dates, step_days, model)
+
 
+def _run_forecast(
+    df,
+    method,
+    forecast_end_date,
+    step_days,
+    current_date,
+    details,
+    depletion,
+    progress=None,
+    detail_path=None,
+):
+    """Выбор режима детальных результатов для forecast_with/without_demand."""
     if current_date is None:
         current_date = datetime.datetime.now()
-
-    dates = pd.date_range(
-        start=current_date, end=forecast_end_date, freq=f"{step_days}D"
-    )
-
-    detailed_results = []
-    for forecast_date in dates:
-        temp_df = df.copy()
-        temp_df["Дни хранения"] = temp_df["Дата поступления на склад"].apply(
-            lambda x: calculate_aging_days(x, forecast_date)
+    if details in ("frame", "indexed"):
+        summary_df, detailed_df = _forecast_snapshots(
+            df, method, forecast_end_date, step_days, current_date, depletion, progress
         )
-        temp_df["Категория"] = temp_df["Дни хранения"].apply(
-            lambda x: determine_aging_category(x, method=2)["status"]
+        if details == "frame":
+            return summary_df, detailed_df
+        # Срезы дат идут подряд и содержат по len(df) строк
+        dates = forecast_dates(forecast_end_date, step_days, current_date)
+        offsets = np.arange(len(dates) + 1) * len(df)
+        return summary_df, IndexedForecastDetails(
+            detailed_df, DateIndex(dates, offsets)
         )
-        temp_df["Дата прогноза"] = forecast_date
-        detailed_results.append(temp_df)
+    if details not in ("lazy", "mmap"):
+        raise ValueError(f"Неизвестный режим детальных результатов: {details}")
 
-    if not detailed_results:
+    date_column = METHOD_DATE_COLUMNS[method]
+    _parse_dates(df, date_column)
+    dates = forecast_dates(forecast_end_date, step_days, current_date)
+    if len(dates) == 0:
         return pd.DataFrame(), pd.DataFrame()
+    model = build_depletion(df, method, depletion)
+    if progress is None:
+        summary_df = _timeline_summary(df, method, dates, step_days, model)
+    else:
+        summary_df = _partitioned_summary(
+            df, method, dates, step_days, depletion, progress
+        )
+    lazy_details = LazyForecastDetails(df, dates, method, model)
+    if details == "lazy":
+        return summary_df, lazy_details
+    with stage("запись деталей на диск", len(lazy_details)):
+        mapped_details = MappedForecastDetails.write(
+            lazy_details.iter_frames(), detail_path, progress, len(dates)
+        )
+    return summary_df, mapped_details
+
 
-    detailed_df = pd.concat(detailed_results, ignore_index=True)
-    summary_df = (
-        detailed_df.groupby(["Дата прогноза", "Категория"])["Фактический запас"]
-        .sum()
-        .reset_index()
+@profiled()
+def forecast_with_demand(
+    df,
+    forecast_end_date,
+    step_days=30,
+    current_date=None,
+    details="frame",
+    depletion=None,
+    progress=None,
+    detail_path=None,
+):
+    """
+    Прогнозирование запасов с учетом потребности.
+
+    Args:
+        df: DataFrame с данными о запасах и потреблении.
+        forecast_end_date: Конечная дата прогноза.
+        step_days: Шаг прогноза в днях.
+        current_date: Дата, от которой начинается прогноз (для тестирования).
+        details: "frame" - детальный DataFrame по всем датам, "indexed" -
+            тот же DataFrame в IndexedForecastDetails со смещениями строк по
+            датам, "lazy" - LazyForecastDetails, формирующий строки на дату
+            по запросу, "mmap" - MappedForecastDetails: строки всех дат
+            записываются в файл Arrow IPC (detail_path или временный файл)
+            и читаются по датам отображением файла в память.
+        depletion: Модель расхода запаса: None (по умолчанию), "linear" или
+            "fifo" - расход группы материала списывается с самых старых партий.
+        progress: Функция progress(готово, всего, сводка) для отображения хода
+            расчета: при details="lazy" и "mmap" сводка считается по частям
+            выгрузки (БЕ, для Метода 2 - БЕ/Завод/Склад) и передается по
+            готовым частям, затем ("mmap") и в остальных режимах progress
+            вызывается после каждой даты. Исключение из progress прерывает
+            расчет.
+        detail_path: Файл детальных результатов для details="mmap".
+
+    Returns:
+        tuple: Сводный DataFrame и детальные результаты.
+    """
+    return _run_forecast(
+        df,
+        1,
+        forecast_end_date,
+        step_days,
+        current_date,
+        details,
+        depletion,
+        progress,
+        detail_path,
     )
-    return summary_df, detailed_df
 
 
+@profiled()
+def forecast_without_demand(
+    df,
+    forecast_end_date,
+    step_days=30,
+    current_date=None,
+    details="frame",
+    depletion=None,
+    progress=None,
+    detail_path=None,
+):
+    """
+    Прогнозирование запасов без учета потребности.
+
+    Args:
+        df: DataFrame с данными о запасах.
+        forecast_end_date: Конечная дата прогноза.
+        step_days: Шаг прогноза в днях.
+        current_date: Дата, от которой начинается прогноз (для тестирования).
+        details: "frame" - детальный DataFrame по всем датам, "indexed" -
+            тот же DataFrame в IndexedForecastDetails со смещениями строк по
+            датам, "lazy" - LazyForecastDetails, формирующий строки на дату
+            по запросу, "mmap" - MappedForecastDetails: строки всех дат
+            записываются в файл Arrow IPC (detail_path или временный файл)
+            и читаются по датам отображением файла в память.
+        depletion: Модель расхода запаса: None (по умолчанию), "linear" или
+            "fifo" - расход группы материала списывается с самых старых партий.
+        progress: Функция progress(готово, всего, сводка) для отображения хода
+            расчета: при details="lazy" и "mmap" сводка считается по частям
+            выгрузки (БЕ, для Метода 2 - БЕ/Завод/Склад) и передается по
+            готовым частям, затем ("mmap") и в остальных режимах progress
+            вызывается после каждой даты. Исключение из progress прерывает
+            расчет.
+        detail_path: Файл детальных результатов для details="mmap".
+
+    Returns:
+        tuple: Сводный DataFrame и детальные результаты.
+    """
+    return _run_forecast(
+        df,
+        2,
+        forecast_end_date,
+        step_days,
+        current_date,
+        details,
+        depletion,
+        progress,
+        detail_path,
+    )
+
+
+@profiled()
+def preprocess_input(df, method, current_date=None):
+    """
+    Предварительная обработка входных данных перед прогнозом.
+
+    Для Метода 2 пустой "СПП элемент" приводится к пустой строке (иначе
+    такие строки выпадают из группировки партий), помечаются материалы
+    без даты и объединяются партии с разными датами поступления.
+
+    Args:
+        df: DataFrame с данными о запасах.
+        method: Метод прогнозирования (1 или 2).
+        current_date: Текущая дата для расчета.
+
+    Returns:
+        pd.DataFrame: Данные, готовые к прогнозу.
+    """
+    if method == 2:
+        if "СПП элемент" in df.columns and df["СПП элемент"].isna().any():
+            spp = df["СПП элемент"]
+            if isinstance(spp.dtype, pd.CategoricalDtype) and "" not in (
+                spp.cat.categories
+            ):
+                spp = spp.cat.add_categories([""])
+            df = df.assign(**{"СПП элемент": spp.fillna("")})
+        df = handle_materials_without_date(df)
+        df = handle_mixed_batches(df, current_date)
+    return df
+
+
+@profiled()
 def handle_mixed_batches(df, current_date=None):
     """
     Обработка партий с разными датами поступления.
 
+    Строки одной партии (ключи MIXED_BATCH_GROUP_COLUMNS) с одинаковой
+    текущей категорией старения объединяются в первую строку с суммарным
+    фактическим запасом, строки с разными категориями остаются отдельными.
+
     Args:
         df (pd.DataFrame): DataFrame с данными о запасах.
         current_date (datetime, optional): Текущая дата для расчета.
@@ -111,36 +390,36 @@ def handle_mixed_batches(df, current_date=None):
     if current_date is None:
         current_date = datetime.datetime.now()
 
-    processed_rows = []
-    group_cols = ["БЕ", "Завод", "Склад", "Материал", "Партия", "СПП элемент"]
-    for _, group in df.groupby(group_cols):
-        if len(group) > 1:
-            group["temp_category"] = group["Дата поступления на склад"].apply(
-                lambda x: determine_aging_category(
-                    calculate_aging_days(x, current_date), method=2
-                )["status"]
-            )
-            if group["temp_category"].nunique() > 1:
-                for category, cat_group in group.groupby("temp_category"):
-                    new_row = cat_group.iloc[0].copy()
-                    new_row["Фактический запас"] = cat_group["Фактический запас"].sum()
-                    processed_rows.append(new_row)
-            else:
-                new_row = group.iloc[0].copy()
-                new_row["Фактический запас"] = group["Фактический запас"].sum()
-                processed_rows.append(new_row)
-        else:
-            processed_rows.append(group.iloc[0])
-
-    if not processed_rows:
+    group_cols = MIXED_BATCH_GROUP_COLUMNS
+    value_column = METHOD_VALUE_COLUMNS[2]
+    # Строки с пустыми ключами не входят ни в одну группу (как в groupby)
+    work = df[df[group_cols].notna().all(axis=1)]
+    if work.empty:
         return pd.DataFrame(columns=df.columns)
 
-    result_df = pd.DataFrame(processed_rows).reset_index(drop=True)
-    if "temp_category" in result_df.columns:
-        result_df = result_df.drop(columns=["temp_category"])
-    return result_df
+    scale = get_aging_scale(2)
+    codes = scale.classify_codes(
+        calculate_aging_days_array(work[METHOD_DATE_COLUMNS[2]], current_date)
+    )
+    # Порядок категорий внутри партии - по названию статуса
+    status_rank = np.argsort(np.argsort(scale.statuses)).astype(np.int8)
+    work = work.assign(temp_category=status_rank[codes])
+
+    batch_size = work.groupby(group_cols, sort=False, observed=True)[
+        value_column
+    ].transform("size")
+    grouped = work.groupby(group_cols + ["temp_category"], sort=True, observed=True)
+    category_sum = grouped[value_column].transform("sum")
+    first_row = (grouped.cumcount() == 0).to_numpy()
+
+    result_df = work.assign(
+        **{value_column: work[value_column].where(batch_size == 1, category_sum)}
+    )[first_row]
+    order = np.argsort(grouped.ngroup().to_numpy()[first_row], kind="stable")
+    return result_df.iloc[order].drop(columns=["temp_category"]).reset_index(drop=True)
 
 
+@profiled()
 def handle_materials_without_date(df):
     """
     Обработка материалов без даты поступления.
@@ -155,6 +434,6 @@ def handle_materials_without_date(df):
     if no_date_mask.any():
         result_df = df.copy()
         result_df.loc[no_date_mask, "Категория"] = "Требует проверки"
-        result_df.loc[no_date_mask, "Дни хранения"] = 10000
+        result_df.loc[no_date_mask, "Дни хранения"] = NO_DATE_DAYS
         return result_df
     return df
@@ -0,0 +1,74 @@
+import numpy as np
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Номера точек ряда после прореживания методом LTTB.
+
+    Largest-Triangle-Three-Buckets: первая и последняя точки сохраняются,
+    остальные делятся на threshold - 2 корзины, из каждой берется точка,
+    образующая наибольший треугольник с предыдущей выбранной точкой и
+    средней точкой следующей корзины. Пики и переломы ряда сохраняются.
+
+    Args:
+        x: Значения по оси X (числа или datetime64).
+        y: Значения ряда.
+        threshold: Число точек после прореживания.
+
+    Returns:
+        numpy.ndarray: Возрастающие номера выбранных точек.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("datetime64[s]").astype(np.int64)
+    x = x.astype(np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Границы корзин для точек 1..n-2; последняя "корзина" - точка n-1
+    edges = np.append(np.linspace(1, n - 1, threshold - 1).astype(np.int64), n)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    selected = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_x = x[end : edges[bucket + 2]].mean()
+        next_y = y[end : edges[bucket + 2]].mean()
+        area = np.abs(
+            (x[selected] - next_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (next_y - y[selected])
+        )
+        selected = start + int(np.argmax(area))
+        indices[bucket + 1] = selected
+    return indices
+
+
+def decimate_frame(df, x_column, y_columns, max_points):
+    """
+    Строки DataFrame для графика из нескольких рядов с общей осью X.
+
+    Каждый ряд прореживается LTTB до max_points / число рядов точек, в
+    результат входит объединение выбранных строк, поэтому все ряды
+    остаются на одной оси X (нужно для областей с заливкой tonexty).
+
+    Args:
+        df: Данные графика.
+        x_column: Колонка оси X.
+        y_columns: Колонки рядов.
+        max_points: Целевое число строк.
+
+    Returns:
+        pd.DataFrame: df без изменений или его выбранные строки.
+    """
+    if len(df) <= max_points or not len(y_columns):
+        return df
+    threshold = max(3, max_points // len(y_columns))
+    x = df[x_column].to_numpy()
+    rows = np.unique(
+        np.concatenate(
+            [lttb_indices(x, df[column].to_numpy(), threshold) for column in y_columns]
+        )
+    )
+    return df.iloc[rows]
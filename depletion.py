@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+
+from constants import (
+    CONSUMPTION_COLUMN,
+    FIFO_GROUP_COLUMNS,
+    METHOD_DATE_COLUMNS,
+    METHOD_VALUE_COLUMNS,
+    NO_DATE_DAYS,
+)
+
+# Максимальное число ячеек матрицы строки x даты в одном блоке расчета
+CHUNK_CELLS = 4_000_000
+
+DEPLETION_MODES = ("linear", "fifo")
+
+
+def consumption_rates(df):
+    """Дневное потребление по строкам (пустые значения - без расхода)."""
+    return np.nan_to_num(df[CONSUMPTION_COLUMN].to_numpy(dtype=np.float64))
+
+
+def remaining_quantity(cumulative, quantity, rates, elapsed_days):
+    """
+    Остаток по строкам на даты прогноза.
+
+    Остаток = min(max(накопленное количество - расход x дни, 0), количество).
+    Для построчной модели накопленное количество равно количеству строки,
+    для FIFO - сумме партий группы, поступивших не позже данной.
+
+    Args:
+        cumulative: Накопленное количество по строкам.
+        quantity: Количество по строкам.
+        rates: Дневной расход, относящийся к строке.
+        elapsed_days: Дни от начала прогноза (скаляр или массив по датам).
+
+    Returns:
+        numpy.ndarray: Вектор по строкам для скаляра или матрица строки x даты.
+    """
+    cumulative = np.asarray(cumulative, dtype=np.float64)
+    quantity = np.asarray(quantity, dtype=np.float64)
+    rates = np.asarray(rates, dtype=np.float64)
+    elapsed_days = np.asarray(elapsed_days, dtype=np.float64)
+    if elapsed_days.ndim:
+        cumulative = cumulative[:, None]
+        quantity = quantity[:, None]
+        rates = rates[:, None]
+    return np.minimum(np.maximum(cumulative - rates * elapsed_days, 0.0), quantity)
+
+
+class DepletionModel:
+    """Параметры расхода запаса по строкам для remaining_quantity."""
+
+    def __init__(self, cumulative, quantity, rates):
+        self.cumulative = cumulative
+        self.quantity = quantity
+        self.rates = rates
+
+    def remaining(self, elapsed_days, rows=slice(None), rate_factor=1.0):
+        """
+        Остаток строк rows на дни elapsed_days от начала прогноза.
+
+        rate_factor - множитель дневного расхода (сценарии "что если").
+        """
+        rates = self.rates[rows]
+        if rate_factor != 1.0:
+            rates = rates * rate_factor
+        return remaining_quantity(
+            self.cumulative[rows], self.quantity[rows], rates, elapsed_days
+        )
+
+
+def _fifo_cumulative(df, method, quantity, rates):
+    """
+    Накопленное количество и расход группы для списания по FIFO.
+
+    Партии группы упорядочиваются по дате поступления (без даты - в конце),
+    накопленная сумма считается через groupby().cumsum().
+    """
+    keys = [column for column in FIFO_GROUP_COLUMNS[method] if column in df.columns]
+    if keys:
+        group_ids = (
+            df.groupby(keys, sort=False, dropna=False, observed=True)
+            .ngroup()
+            .to_numpy()
+        )
+    else:
+        group_ids = np.zeros(len(df), dtype=np.int64)
+
+    dates = df[METHOD_DATE_COLUMNS[method]]
+    date_keys = dates.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    date_keys[dates.isna().to_numpy()] = np.iinfo(np.int64).max
+    order = np.lexsort((np.arange(len(df)), date_keys, group_ids))
+
+    cumulative = np.empty(len(df))
+    cumulative[order] = (
+        pd.Series(quantity[order]).groupby(group_ids[order]).cumsum().to_numpy()
+    )
+    group_rates = pd.Series(rates).groupby(group_ids).transform("sum").to_numpy()
+    return cumulative, group_rates
+
+
+def build_depletion(df, method, mode=None):
+    """
+    Модель расхода запаса для данных прогноза.
+
+    Args:
+        df: DataFrame с данными о запасах.
+        method: Метод прогнозирования (1 или 2).
+        mode: None - построчный расход для Метода 1 при наличии колонки
+            "Дневное потребление", "linear" - построчный расход,
+            "fifo" - расход группы списывается с самых старых партий.
+
+    Returns:
+        DepletionModel или None, если расход не учитывается.
+    """
+    if mode is None:
+        if method != 1 or CONSUMPTION_COLUMN not in df.columns:
+            return None
+        mode = "linear"
+    if mode not in DEPLETION_MODES:
+        raise ValueError(f"Неизвестная модель расхода: {mode}")
+    if CONSUMPTION_COLUMN not in df.columns:
+        raise ValueError(f"Нет колонки {CONSUMPTION_COLUMN} для модели расхода")
+
+    quantity = np.nan_to_num(
+        df[METHOD_VALUE_COLUMNS[method]].to_numpy(dtype=np.float64)
+    )
+    rates = consumption_rates(df)
+    if mode == "linear":
+        return DepletionModel(quantity, quantity, rates)
+    cumulative, group_rates = _fifo_cumulative(df, method, quantity, rates)
+    return DepletionModel(cumulative, quantity, group_rates)
+
+
+def remaining_totals(days, dated_mask, model, scale, elapsed_days):
+    """
+    Суммы остатка по датам прогноза и категориям старения.
+
+    Матрица строки x даты считается блоками по CHUNK_CELLS ячеек, поэтому
+    объем памяти ограничен независимо от размера выгрузки.
+
+    Args:
+        days: Дни хранения на первую дату прогноза (int64).
+        dated_mask: Маска строк с датой поступления.
+        model: Модель расхода (DepletionModel).
+        scale: Скомпилированная шкала старения (AgingScale).
+        elapsed_days: Дни от начала прогноза для каждой даты.
+
+    Returns:
+        numpy.ndarray: Суммы остатка формы (число дат, число статусов).
+    """
+    return remaining_totals_by_rate(
+        days, dated_mask, model, scale, elapsed_days, (1.0,)
+    )[0]
+
+
+def remaining_totals_by_rate(
+    days, dated_mask, model, scale, elapsed_days, rate_factors
+):
+    """
+    Суммы остатка для нескольких множителей расхода за один проход.
+
+    Категории ячеек матрицы строки x даты (самая затратная часть расчета)
+    определяются один раз на блок и используются для всех множителей.
+
+    Args:
+        days: Дни хранения на первую дату прогноза (int64).
+        dated_mask: Маска строк с датой поступления.
+        model: Модель расхода (DepletionModel).
+        scale: Скомпилированная шкала старения (AgingScale).
+        elapsed_days: Дни от начала прогноза для каждой даты.
+        rate_factors: Множители дневного расхода.
+
+    Returns:
+        numpy.ndarray: Суммы остатка формы (число множителей, число дат,
+            число статусов).
+    """
+    elapsed_days = np.asarray(elapsed_days, dtype=np.int64)
+    n_dates = len(elapsed_days)
+    n_statuses = len(scale.statuses)
+    date_offsets = np.arange(n_dates) * n_statuses
+    totals = np.zeros((len(rate_factors), n_dates * n_statuses))
+
+    chunk_rows = max(1, CHUNK_CELLS // max(n_dates, 1))
+    for start in range(0, len(days), chunk_rows):
+        rows = slice(start, start + chunk_rows)
+        day_matrix = np.where(
+            dated_mask[rows, None],
+            days[rows, None] + elapsed_days[None, :],
+            NO_DATE_DAYS,
+        )
+        codes = (scale.classify_codes(day_matrix) + date_offsets).ravel()
+        for position, rate_factor in enumerate(rate_factors):
+            remaining = model.remaining(elapsed_days, rows, rate_factor)
+            totals[position] += np.bincount(
+                codes, weights=remaining.ravel(), minlength=totals.shape[1]
+            )
+    return totals.reshape(len(rate_factors), n_dates, n_statuses)
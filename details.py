@@ -0,0 +1,455 @@
+import os
+import tempfile
+import time
+import uuid
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from aging import aging_days_dtype, calculate_aging_days_array, get_aging_scale
+from constants import BYTES_IN_MB, METHOD_DATE_COLUMNS, NO_DATE_DAYS, REMAINING_COLUMN
+from profiling import profiled
+
+FORECAST_DATE_COLUMN = "Дата прогноза"
+
+# Рабочий каталог файлов детальных результатов на диске (details="mmap")
+DEFAULT_DETAILS_DIR = os.environ.get("STOK_DETAILS_DIR") or os.path.join(
+    tempfile.gettempdir(), "stok_details"
+)
+# Лимит объема файлов деталей в каталоге (МБ), см. prune_details
+DETAILS_MAX_MB = int(os.environ.get("STOK_DETAILS_MAX_MB", "4096"))
+# Возраст (с), после которого временный файл прерванной записи удаляется
+TEMP_MAX_AGE_SECONDS = 3600
+# Максимальное число строк в одном пакете (record batch) файла деталей
+MAX_BATCH_ROWS = 1_000_000
+
+
+def _date_position(dates, forecast_date):
+    """
+    Позиция даты прогноза в списке дат.
+
+    Допускается как точная дата прогноза, так и календарный день
+    (например, строка "YYYY-MM-DD" из выпадающего списка).
+    """
+    forecast_date = pd.Timestamp(forecast_date)
+    if forecast_date in dates:
+        return dates.get_loc(forecast_date)
+    days = dates.normalize()
+    if forecast_date.normalize() in days:
+        return days.get_loc(forecast_date.normalize())
+    raise KeyError(f"Нет даты прогноза {forecast_date:%Y-%m-%d}")
+
+
+class LazyForecastDetails:
+    """
+    Ленивое представление детальных результатов прогноза.
+
+    Хранит исходные строки один раз и список дат прогноза. Детальные строки
+    на конкретную дату формируются по запросу, поэтому память зависит от
+    количества строк, а не от произведения строк на даты.
+    """
+
+    def __init__(self, base_df, dates, method, depletion=None):
+        """
+        Args:
+            base_df: DataFrame с данными о запасах (даты уже в datetime64).
+            dates: Даты прогноза (DatetimeIndex).
+            method: Метод прогнозирования (1 или 2).
+            depletion: Модель расхода запаса (DepletionModel) или None.
+        """
+        self.base_df = base_df.copy(deep=False)
+        self.dates = pd.DatetimeIndex(dates)
+        self.method = method
+        self._scale = get_aging_scale(method)
+
+        date_column = METHOD_DATE_COLUMNS[method]
+        self._dated = self.base_df[date_column].notna().to_numpy()
+        self.depletion = depletion
+        self._base_days = (
+            calculate_aging_days_array(self.base_df[date_column], self.dates[0])
+            if len(self.dates)
+            else np.zeros(len(self.base_df), dtype=np.int64)
+        )
+        self._days_dtype = aging_days_dtype(self._base_days, self.dates)
+
+    def __len__(self):
+        return len(self.base_df) * len(self.dates)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def aging_days(self, position):
+        """Дни хранения всех строк на дату прогноза с номером position."""
+        offset = (self.dates[position] - self.dates[0]).days
+        days = np.where(self._dated, self._base_days + offset, NO_DATE_DAYS)
+        return days.astype(self._days_dtype)
+
+    @profiled("LazyForecastDetails.for_date")
+    def for_date(self, forecast_date, category=None):
+        """
+        Детальные строки на одну дату прогноза.
+
+        Args:
+            forecast_date: Дата прогноза или календарный день.
+            category: Необязательная категория: формируются только ее строки.
+
+        Returns:
+            pd.DataFrame: Строки в формате детального результата прогноза.
+        """
+        position = _date_position(self.dates, forecast_date)
+        elapsed_days = (self.dates[position] - self.dates[0]).days
+        days = self.aging_days(position)
+        categories = self._scale.classify(days)
+        remaining = (
+            self.depletion.remaining(elapsed_days)
+            if self.depletion is not None
+            else None
+        )
+
+        frame = self.base_df
+        if category is not None:
+            rows = np.flatnonzero(categories == category)
+            frame, days, categories = frame.iloc[rows], days[rows], categories[rows]
+            if remaining is not None:
+                remaining = remaining[rows]
+
+        frame = frame.copy()
+        frame["Дни хранения"] = days
+        frame["Категория"] = categories
+        if remaining is not None:
+            frame[REMAINING_COLUMN] = remaining
+        frame[FORECAST_DATE_COLUMN] = self.dates[position]
+        return frame
+
+    def count_for_date(self, forecast_date):
+        """Количество детальных строк на дату прогноза без их формирования."""
+        _date_position(self.dates, forecast_date)
+        return len(self.base_df)
+
+    def iter_frames(self):
+        """Последовательно выдает (дата прогноза, детальные строки)."""
+        for forecast_date in self.dates:
+            yield forecast_date, self.for_date(forecast_date)
+
+    def to_frame(self):
+        """Полная материализация детальных результатов (только для экспорта)."""
+        if self.empty:
+            return pd.DataFrame()
+        return pd.concat([frame for _, frame in self.iter_frames()], ignore_index=True)
+
+
+class DateIndex:
+    """
+    Индекс детального DataFrame по датам прогноза.
+
+    Строки каждой даты лежат подряд: строки i-й даты занимают позиции
+    offsets[i]:offsets[i + 1], поэтому срез даты берется без маски по всему
+    DataFrame.
+    """
+
+    def __init__(self, dates, offsets):
+        """
+        Args:
+            dates: Даты прогноза (DatetimeIndex) в порядке строк.
+            offsets: Начальные позиции строк дат и общее количество строк.
+        """
+        self.dates = pd.DatetimeIndex(dates)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    @classmethod
+    def from_column(cls, values):
+        """Индекс по колонке дат прогноза, упорядоченной по дате."""
+        values = np.asarray(values)
+        if len(values) == 0:
+            return cls(pd.DatetimeIndex([]), [0])
+        starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+        return cls(values[starts], np.append(starts, len(values)))
+
+    def bounds(self, position):
+        """Границы строк (start, stop) даты с номером position."""
+        return int(self.offsets[position]), int(self.offsets[position + 1])
+
+
+class IndexedForecastDetails:
+    """
+    Тот же интерфейс поверх материализованного детального DataFrame.
+
+    Строки упорядочиваются по дате прогноза один раз при создании, после чего
+    выборка даты - срез по DateIndex за O(строк даты) без копирования.
+    """
+
+    def __init__(self, detailed_df, index=None):
+        """
+        Args:
+            detailed_df: Детальный DataFrame со всеми датами прогноза.
+            index: Готовый DateIndex строк (None - построить по колонке дат).
+        """
+        if index is None and not detailed_df.empty:
+            values = detailed_df[FORECAST_DATE_COLUMN].to_numpy()
+            if (values[1:] < values[:-1]).any():
+                detailed_df = detailed_df.iloc[np.argsort(values, kind="stable")]
+                values = detailed_df[FORECAST_DATE_COLUMN].to_numpy()
+            index = DateIndex.from_column(values)
+        self.detailed_df = detailed_df
+        self.index = index if index is not None else DateIndex.from_column([])
+        self.dates = self.index.dates
+
+    def __len__(self):
+        return len(self.detailed_df)
+
+    @property
+    def empty(self):
+        return self.detailed_df.empty
+
+    def _slice(self, position):
+        start, stop = self.index.bounds(position)
+        return self.detailed_df.iloc[start:stop]
+
+    def for_date(self, forecast_date, category=None):
+        """Детальные строки на одну дату прогноза (и категорию)."""
+        frame = self._slice(_date_position(self.dates, forecast_date))
+        if category is not None:
+            frame = frame[(frame["Категория"] == category).to_numpy()]
+        return frame
+
+    def count_for_date(self, forecast_date):
+        """Количество детальных строк на дату прогноза без их выборки."""
+        start, stop = self.index.bounds(_date_position(self.dates, forecast_date))
+        return stop - start
+
+    def iter_frames(self):
+        """Последовательно выдает (дата прогноза, детальные строки)."""
+        for position, forecast_date in enumerate(self.dates):
+            yield forecast_date, self._slice(position)
+
+    def to_frame(self):
+        """Детальный DataFrame целиком."""
+        return self.detailed_df
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def prune_details(
+    directory=DEFAULT_DETAILS_DIR, max_bytes=DETAILS_MAX_MB * BYTES_IN_MB, keep=()
+):
+    """
+    Ограничение объема каталога файлов деталей.
+
+    Файлы .arrow удаляются, начиная с давно измененных, пока их общий объем
+    больше max_bytes; временные файлы прерванных записей удаляются через
+    TEMP_MAX_AGE_SECONDS. Записанные объекты MappedForecastDetails держат
+    файл отображенным в память и продолжают читать его после удаления
+    (POSIX), копии из кэша проверяются свойством available.
+
+    Args:
+        directory: Каталог файлов деталей.
+        max_bytes: Лимит общего объема файлов .arrow.
+        keep: Пути, которые не удаляются (например, только что записанный).
+
+    Returns:
+        list: Удаленные файлы.
+    """
+    if not os.path.isdir(directory):
+        return []
+    keep = {os.path.abspath(path) for path in keep}
+    now = time.time()
+    files, removed = [], []
+    for entry in os.scandir(directory):
+        if not entry.is_file():
+            continue
+        info = entry.stat()
+        if entry.name.endswith(".tmp"):
+            if now - info.st_mtime > TEMP_MAX_AGE_SECONDS:
+                _remove_file(entry.path)
+                removed.append(entry.path)
+        elif entry.name.endswith(".arrow"):
+            files.append((info.st_mtime, info.st_size, entry.path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if os.path.abspath(path) in keep:
+            continue
+        _remove_file(path)
+        removed.append(path)
+        total -= size
+    return removed
+
+
+class MappedForecastDetails:
+    """
+    Детальные результаты в файле Arrow IPC, отображенном в память.
+
+    Строки каждой даты прогноза записываются подряд отдельными пакетами
+    (record batch) файла без сжатия, DateIndex хранит номера пакетов дат.
+    Строки даты читаются без чтения остальных дат, числовые колонки
+    ссылаются на страницы файла, поэтому память процесса не зависит от
+    произведения строк на даты: страницы подгружает и вытесняет ОС.
+    Записанный файл сразу отображается в память, поэтому объект читает
+    его и после удаления файла из каталога (prune_details).
+    """
+
+    def __init__(self, path, index, rows, owner=False):
+        """
+        Args:
+            path: Файл Arrow IPC.
+            index: DateIndex пакетов файла по датам прогноза.
+            rows: Общее количество строк.
+            owner: Удалить файл, когда объект будет собран сборщиком мусора.
+        """
+        self.path = path
+        self.index = index
+        self.dates = index.dates
+        self.rows = rows
+        self._reader = None
+        if owner:
+            weakref.finalize(self, _remove_file, path)
+
+    @classmethod
+    def write(cls, frames, path=None, progress=None, total=None):
+        """
+        Запись детальных строк по датам прогноза в файл.
+
+        Args:
+            frames: Пары (дата прогноза, DataFrame) в порядке дат, например
+                LazyForecastDetails.iter_frames().
+            path: Файл результата; None - временный файл в DEFAULT_DETAILS_DIR,
+                удаляемый вместе с объектом.
+            progress: Функция progress(готово, всего, None) после каждой даты;
+                исключение из нее прерывает запись и удаляет файл.
+            total: Количество дат для progress.
+
+        Returns:
+            MappedForecastDetails: Представление записанного файла.
+        """
+        import pyarrow as pa
+
+        owner = path is None
+        if owner:
+            os.makedirs(DEFAULT_DETAILS_DIR, exist_ok=True)
+            path = os.path.join(DEFAULT_DETAILS_DIR, f"{uuid.uuid4().hex}.arrow")
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Запись во временный файл: открытые отображения прежнего файла с тем
+        # же именем остаются действительными после замены. Имя уникально,
+        # так как один ключ могут записывать несколько процессов
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        dates, offsets, rows = [], [0], 0
+        writer = schema = None
+        try:
+            for done, (forecast_date, frame) in enumerate(frames, 1):
+                table = pa.Table.from_pandas(
+                    frame.reset_index(drop=True), schema=schema, preserve_index=False
+                )
+                if writer is None:
+                    schema = table.schema
+                    writer = pa.ipc.new_file(temp_path, schema)
+                batches = table.to_batches(max_chunksize=MAX_BATCH_ROWS)
+                for batch in batches:
+                    writer.write_batch(batch)
+                dates.append(forecast_date)
+                offsets.append(offsets[-1] + len(batches))
+                rows += len(frame)
+                if progress is not None:
+                    progress(done, total, None)
+            if writer is not None:
+                writer.close()
+                os.replace(temp_path, path)
+        except BaseException:
+            if writer is not None:
+                writer.close()
+            _remove_file(temp_path)
+            raise
+        if writer is None:
+            return IndexedForecastDetails(pd.DataFrame())
+        details = cls(path, DateIndex(dates, offsets), rows, owner)
+        details._open()
+        return details
+
+    def __getstate__(self):
+        # Копия (например, в дисковом кэше) ссылается на тот же файл, но не
+        # владеет им и открывает его заново
+        state = self.__dict__.copy()
+        state["_reader"] = None
+        return state
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def empty(self):
+        return self.rows == 0
+
+    @property
+    def available(self):
+        """Можно ли читать строки: файл отображен или еще есть на диске."""
+        return self._reader is not None or os.path.exists(self.path)
+
+    def _open(self):
+        if self._reader is None:
+            import pyarrow as pa
+
+            self._reader = pa.ipc.open_file(pa.memory_map(self.path))
+        return self._reader
+
+    def _table(self, position):
+        import pyarrow as pa
+
+        reader = self._open()
+        start, stop = self.index.bounds(position)
+        return pa.Table.from_batches(
+            [reader.get_batch(number) for number in range(start, stop)],
+            schema=reader.schema,
+        )
+
+    def _slice(self, position):
+        return self._table(position).to_pandas(split_blocks=True)
+
+    def for_date(self, forecast_date, category=None):
+        """Детальные строки на одну дату прогноза (и категорию)."""
+        frame = self._slice(_date_position(self.dates, forecast_date))
+        if category is not None:
+            frame = frame[(frame["Категория"] == category).to_numpy()]
+        return frame
+
+    def count_for_date(self, forecast_date):
+        """Количество детальных строк на дату прогноза по заголовкам пакетов."""
+        reader = self._open()
+        start, stop = self.index.bounds(_date_position(self.dates, forecast_date))
+        return sum(reader.get_batch(number).num_rows for number in range(start, stop))
+
+    def iter_frames(self):
+        """Последовательно выдает (дата прогноза, детальные строки)."""
+        for position, forecast_date in enumerate(self.dates):
+            yield forecast_date, self._slice(position)
+
+    def to_arrow(self):
+        """Все строки как таблица Arrow поверх отображенного файла."""
+        return self._open().read_all()
+
+    def to_frame(self):
+        """Детальный DataFrame целиком (числовые колонки без копирования)."""
+        return self.to_arrow().to_pandas(split_blocks=True)
+
+
+def as_details(details):
+    """
+    Приводит детальные результаты к единому интерфейсу представления.
+
+    Args:
+        details: DataFrame или объект представления детальных результатов.
+
+    Returns:
+        Объект с dates, for_date(), count_for_date(), iter_frames() и
+            to_frame().
+    """
+    if isinstance(details, pd.DataFrame):
+        return IndexedForecastDetails(details)
+    return details
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from constants import BYTES_IN_MB, METHOD_DATE_COLUMNS
+from profiling import profiled
+
+
+def narrow_int_dtype(low, high):
+    """Наименьший из int16/int32/int64, вмещающий значения от low до high."""
+    for dtype in (np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+@profiled()
+def normalize_dtypes(df):
+    """
+    Компактные типы колонок выгрузки.
+
+    Текстовые колонки (БЕ, Завод, Склад, Материал, Партия...) становятся
+    Categorical: при повторении строк по датам прогноза хранятся коды, а не
+    объекты Python. Целые количества приводятся к наименьшему целому типу
+    (суммы по группам pandas считает в int64). Вещественные колонки
+    остаются float64, так как суммы во float32 теряют точность. Колонки
+    дат не изменяются.
+
+    Args:
+        df: Исходные данные.
+
+    Returns:
+        pd.DataFrame: Данные с компактными типами.
+    """
+    date_columns = set(METHOD_DATE_COLUMNS.values())
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        if column in date_columns or isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            columns[column] = series.astype("category")
+        elif pd.api.types.is_integer_dtype(series):
+            columns[column] = pd.to_numeric(series, downcast="integer")
+    return df.assign(**columns)
+
+
+def memory_report(before, after):
+    """
+    Объем памяти колонок до и после нормализации типов.
+
+    Args:
+        before: Исходный DataFrame.
+        after: DataFrame после normalize_dtypes.
+
+    Returns:
+        pd.DataFrame: Колонка, типы и объем (МБ) до и после, строка "Итого".
+    """
+    before_usage = before.memory_usage(deep=True, index=False)
+    after_usage = after.memory_usage(deep=True, index=False)
+    report = pd.DataFrame(
+        {
+            "Колонка": [str(column) for column in before.columns],
+            "Тип до": [str(dtype) for dtype in before.dtypes],
+            "Тип после": [str(after[column].dtype) for column in before.columns],
+            "До, МБ": before_usage.to_numpy() / BYTES_IN_MB,
+            "После, МБ": after_usage[before.columns].to_numpy() / BYTES_IN_MB,
+        }
+    )
+    total = {
+        "Колонка": "Итого",
+        "Тип до": "",
+        "Тип после": "",
+        "До, МБ": report["До, МБ"].sum(),
+        "После, МБ": report["После, МБ"].sum(),
+    }
+    return pd.concat([report, pd.DataFrame([total])], ignore_index=True)
+
+
+def memory_summary(report):
+    """Строка вида "12.3 МБ -> 1.5 МБ (в 8.2 раза меньше)" (КБ для малых данных)."""
+    before, after = report.iloc[-1][["До, МБ", "После, МБ"]]
+    ratio = before / after if after else float("inf")
+    unit = "МБ"
+    if before < 1:
+        before, after, unit = before * 1024, after * 1024, "КБ"
+    return f"{before:.1f} {unit} -> {after:.1f} {unit} (в {ratio:.1f} раза меньше)"
@@ -0,0 +1,203 @@
+import collections
+import concurrent.futures
+import io
+import re
+import zipfile
+
+import pandas as pd
+import xlsxwriter
+
+from constants import COLOR_CODES
+from data_io import write_table
+from details import as_details
+from profiling import profiled
+
+# Количество потоков сериализации файлов по датам при экспорте в ZIP
+EXPORT_WORKERS = 4
+
+EXCEL_MIME_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+ZIP_MIME_TYPE = "application/zip"
+
+# Нулевой день системы дат Excel (с учетом ошибки 1900 года)
+EXCEL_EPOCH = pd.Timestamp("1899-12-30")
+# Строк на листе Excel, включая заголовок
+EXCEL_MAX_ROWS = 1_048_576
+
+
+def sanitize_excel_sheetname(sheet_name):
+    """
+    Sanitize Excel sheet name by removing invalid characters.
+
+    Args:
+        sheet_name: Original sheet name
+
+    Returns:
+        Sanitized sheet name that is valid for Excel
+    """
+    sanitized = re.sub(r"[\[\]:*?/\\]", "_", sheet_name)
+    return sanitized[:31]
+
+
+def _write_sheet(workbook, sheet_name, df, formats):
+    """
+    Построчная запись DataFrame на новый лист.
+
+    В режиме constant_memory строки сбрасываются на диск по мере записи,
+    поэтому лист заполняется строго сверху вниз через write_row. Даты
+    заранее переводятся в числа Excel векторно и получают формат колонки.
+    """
+    # write_row молча пропускает строки за пределом листа
+    if len(df) >= EXCEL_MAX_ROWS:
+        raise ValueError(
+            f"Лист {sheet_name}: {len(df)} строк больше предела Excel "
+            f"({EXCEL_MAX_ROWS - 1})"
+        )
+    worksheet = workbook.add_worksheet(sanitize_excel_sheetname(sheet_name))
+    header = [str(column) for column in df.columns]
+    worksheet.write_row(0, 0, header, formats["header"])
+
+    df = df.copy(deep=False)
+    for position, column in enumerate(header):
+        if pd.api.types.is_datetime64_any_dtype(df.iloc[:, position]):
+            serial = (df.iloc[:, position] - EXCEL_EPOCH) / pd.Timedelta(days=1)
+            df[df.columns[position]] = serial
+            worksheet.set_column(position, position, 12, formats["date"])
+    values = df.astype(object).where(df.notna(), None)
+    for row, record in enumerate(values.itertuples(index=False, name=None), 1):
+        worksheet.write_row(row, 0, record)
+    return worksheet
+
+
+def _write_sheets(workbook, sheet_name, df, formats):
+    """
+    Запись DataFrame на лист sheet_name, а если строк больше, чем вмещает
+    лист Excel, - по частям на листы sheet_name_1, sheet_name_2...
+
+    Returns:
+        list: Пары (лист, записанная часть DataFrame).
+    """
+    rows = EXCEL_MAX_ROWS - 1
+    if len(df) <= rows:
+        return [(_write_sheet(workbook, sheet_name, df, formats), df)]
+    parts = []
+    for number, start in enumerate(range(0, len(df), rows), 1):
+        part = df.iloc[start : start + rows]
+        parts.append(
+            (_write_sheet(workbook, f"{sheet_name}_{number}", part, formats), part)
+        )
+    return parts
+
+
+def _add_category_colors(workbook, worksheet, df):
+    """Цветовая заливка колонки "Категория" по COLOR_CODES."""
+    if "Категория" not in df.columns or df.empty:
+        return
+    column = df.columns.get_loc("Категория")
+    for category, color in COLOR_CODES.items():
+        worksheet.conditional_format(
+            1,
+            column,
+            len(df),
+            column,
+            {
+                "type": "text",
+                "criteria": "containing",
+                "value": category,
+                "format": workbook.add_format({"bg_color": color}),
+            },
+        )
+
+
+@profiled()
+def export_excel(summary_df, details=None, pivot_df=None):
+    """
+    Экспорт результатов в xlsx в режиме constant_memory.
+
+    Детальные строки записываются по одному листу на дату прогноза за один
+    проход iter_frames, без фильтрации полного DataFrame на каждую дату.
+    Строки, не помещающиеся на лист Excel, переносятся на следующие листы
+    с номерами (Детали_<дата>_1, Детали_<дата>_2...).
+
+    Args:
+        summary_df: Сводные результаты.
+        details: Детальные результаты (None - только сводные данные).
+        pivot_df: Сводная таблица по датам и категориям (необязательно).
+
+    Returns:
+        bytes: Содержимое xlsx-файла.
+    """
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(
+        output,
+        {
+            "constant_memory": True,
+            "strings_to_formulas": False,
+            "strings_to_urls": False,
+        },
+    )
+    formats = {
+        "header": workbook.add_format({"bold": True, "border": 1}),
+        "date": workbook.add_format({"num_format": "yyyy-mm-dd"}),
+    }
+
+    for worksheet, part in _write_sheets(
+        workbook, "Сводные_результаты", summary_df, formats
+    ):
+        _add_category_colors(workbook, worksheet, part)
+    if pivot_df is not None:
+        _write_sheets(workbook, "Сводная_таблица", pivot_df, formats)
+
+    if details is not None:
+        for forecast_date, date_df in as_details(details).iter_frames():
+            sheet_name = f"Детали_{forecast_date:%Y-%m-%d}"
+            _write_sheets(workbook, sheet_name, date_df, formats)
+
+    workbook.close()
+    return output.getvalue()
+
+
+def _serialize(df, file_format):
+    if file_format == "csv":
+        # BOM, чтобы Excel корректно открывал кириллицу
+        return df.to_csv(index=False).encode("utf-8-sig")
+    return write_table(df, file_format)
+
+
+def _zip_entry(archive, forecast_date, future, file_format):
+    # Parquet и Feather уже сжаты, повторное сжатие только тратит время
+    compression = zipfile.ZIP_DEFLATED if file_format == "csv" else zipfile.ZIP_STORED
+    archive.writestr(
+        f"детали_{forecast_date:%Y-%m-%d}.{file_format}",
+        future.result(),
+        compress_type=compression,
+    )
+
+
+@profiled()
+def export_zip(details, file_format="csv", workers=EXPORT_WORKERS):
+    """
+    ZIP-архив детальных результатов: по одному файлу на дату прогноза.
+
+    Файлы дат сериализуются параллельно в пуле потоков и записываются в
+    архив в порядке дат. Одновременно в работе не более 2 * workers дат.
+
+    Args:
+        details: Детальные результаты (DataFrame или представление).
+        file_format: "csv", "parquet" или "feather".
+        workers: Количество потоков.
+
+    Returns:
+        bytes: Содержимое zip-архива.
+    """
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w") as archive:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = collections.deque()
+            for forecast_date, date_df in as_details(details).iter_frames():
+                future = executor.submit(_serialize, date_df, file_format)
+                pending.append((forecast_date, future))
+                if len(pending) >= 2 * workers:
+                    _zip_entry(archive, *pending.popleft(), file_format)
+            while pending:
+                _zip_entry(archive, *pending.popleft(), file_format)
+    return output.getvalue()
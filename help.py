@@ -73,7 +73,9 @@ def show_help_page():
     выбранному методу прогнозирования.
 
     **Требования к файлам:**
-    - Формат: Excel (.xlsx, .xls)
+    - Формат: Excel (.xlsx, .xls), CSV, Parquet или Feather/Arrow IPC
+      (.feather, .arrow). Колоночные форматы читаются быстрее Excel и
+      сохраняют типы колонок.
     - Структура: в соответствии с шаблоном для выбранного метода
     - Корректно заполненные обязательные поля
 
@@ -156,12 +158,48 @@ def show_help_page():
     После выполнения прогноза, в разделе результатов доступны следующие
     опции экспорта:
     1. **Excel (все данные)** - полный экспорт всех результатов
-    2. **Excel (текущий вид)** - экспорт только отображаемой даты прогноза
-    3. **CSV (текущий вид)** - экспорт в формате CSV для текущей даты
-       прогноза
+    2. **Excel (только сводные данные)** - экспорт сводных результатов
+    3. **Parquet** / **Feather (Arrow IPC)** - сводные и детальные
+       результаты в колоночном формате с сохранением типов колонок
+    4. **ZIP: CSV по датам** / **ZIP: Parquet по датам** - архив детальных
+       результатов, по одному файлу на каждую дату прогноза
+
+    Для экспорта выберите формат и нажмите кнопку "Сформировать файл для
+    скачивания". Файл формируется только по этой кнопке; после формирования
+    отображаются его размер и время подготовки, а также кнопка скачивания.
+    """
+    )
 
-    Для экспорта выберите нужный формат из выпадающего списка и нажмите
-    кнопку "Экспорт".
+    expander4 = st.expander("Почему расчет выполняется долго?")
+    expander4.markdown(
+        """
+    Под результатами находится раздел **Производительность**: для каждого
+    этапа (чтение файла, нормализация типов, предобработка, прогноз,
+    построение графиков, экспорт) показаны время, количество строк на входе
+    и выходе и прирост памяти процесса. Вложенные этапы выводятся с отступом.
+
+    Для подробного анализа включите в боковой панели флажок
+    "Профилирование cProfile" и повторите действие: в разделе
+    Производительность появится отчет о самых затратных функциях и кнопка
+    скачивания профиля (.prof), который можно открыть в snakeviz или pstats.
+    Профилирование замедляет расчет, поэтому по умолчанию оно выключено.
+
+    На длинных прогнозах с мелким шагом (например, 5 лет с шагом 1 день)
+    графики по умолчанию прореживаются до 400 точек с сохранением пиков и
+    переломов (переключатель "Прореживание графиков (LTTB)" над графиками).
+    Без прореживания большие графики отрисовываются через WebGL.
+    """
+    )
+
+    expander5 = st.expander("Как сравнить несколько сценариев?")
+    expander5.markdown(
+        """
+    Откройте блок **Сравнение сценариев** под результатами и задайте в
+    таблице варианты: дату окончания, шаг, сдвиг шкалы старения в днях и
+    множитель потребления (Метод 1). Строки можно добавлять и удалять.
+    После нажатия "Сравнить сценарии" все варианты рассчитываются за один
+    проход по данным, а график показывает выбранную категорию (по умолчанию
+    СНЗ) для каждого сценария.
     """
     )
 
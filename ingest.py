@@ -0,0 +1,239 @@
+import importlib.util
+
+import pandas as pd
+
+from constants import (
+    CONSUMPTION_COLUMN,
+    METHOD1_REQUIRED_COLUMNS,
+    METHOD2_REQUIRED_COLUMNS,
+    METHOD_DATE_COLUMNS,
+    METHOD_VALUE_COLUMNS,
+)
+from data_io import _file_format
+from profiling import profiled
+
+REQUIRED_COLUMNS = {1: METHOD1_REQUIRED_COLUMNS, 2: METHOD2_REQUIRED_COLUMNS}
+# Необязательные колонки, которые используются расчетом, если есть в файле
+OPTIONAL_COLUMNS = {
+    1: [CONSUMPTION_COLUMN],
+    2: ["СПП элемент", CONSUMPTION_COLUMN],
+}
+
+
+def text_columns(method):
+    """Коды (БЕ, Завод, Материал...), которые читаются строками с ведущими нулями."""
+    numeric = {METHOD_DATE_COLUMNS[method], METHOD_VALUE_COLUMNS[method]}
+    columns = [column for column in REQUIRED_COLUMNS[method] if column not in numeric]
+    if method == 2:
+        columns.append("СПП элемент")
+    return columns
+
+
+def excel_engine():
+    """
+    Движок чтения Excel: python-calamine (в несколько раз быстрее), если
+    установлен, иначе openpyxl.
+    """
+    if importlib.util.find_spec("python_calamine") is not None:
+        return "calamine"
+    return "openpyxl"
+
+
+def _is_excel(file_format):
+    return file_format in ("xlsx", "xls", "xlsm")
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def read_header(source, file_format=None):
+    """
+    Имена колонок файла без чтения строк данных.
+
+    Для Excel читается только первая строка листа, для Parquet и Feather -
+    схема из метаданных файла.
+    """
+    file_format = file_format or _file_format(source)
+    _rewind(source)
+    try:
+        if _is_excel(file_format):
+            header = pd.read_excel(source, nrows=0, engine=excel_engine()).columns
+        elif file_format == "csv":
+            header = pd.read_csv(source, nrows=0).columns
+        elif file_format == "parquet":
+            import pyarrow.parquet as pq
+
+            header = pq.read_schema(source).names
+        elif file_format in ("feather", "arrow"):
+            import pyarrow as pa
+
+            header = pa.ipc.open_file(source).schema.names
+        else:
+            raise ValueError(f"Неподдерживаемый формат файла: {file_format}")
+    finally:
+        _rewind(source)
+    return [str(column) for column in header]
+
+
+def _sheet_rows(source):
+    """
+    Строки первого листа Excel в порядке листа.
+
+    python-calamine разбирает лист целиком, openpyxl в режиме read-only
+    выдает строки по мере чтения файла.
+    """
+    _rewind(source)
+    if excel_engine() == "calamine":
+        import python_calamine
+
+        if hasattr(source, "read"):
+            workbook = python_calamine.CalamineWorkbook.from_filelike(source)
+        else:
+            workbook = python_calamine.CalamineWorkbook.from_path(str(source))
+        yield from workbook.get_sheet_by_index(0).to_python()
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _cell_text(value):
+    if value == "" or value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _excel_column(values, as_text):
+    """Колонка из значений ячеек: коды - строками, остальное - как в pandas."""
+    if as_text:
+        return [_cell_text(value) for value in values]
+    series = pd.Series([None if value == "" else value for value in values])
+    series = series.infer_objects()
+    # Как и pandas.read_excel: целые числа без пропусков - int64
+    if (
+        pd.api.types.is_float_dtype(series)
+        and series.notna().all()
+        and (series % 1 == 0).all()
+    ):
+        series = series.astype("int64")
+    return series
+
+
+def _read_excel(source, method, extra_columns, all_columns):
+    """
+    Чтение Excel за один проход: заголовок проверяется по первой строке,
+    из остальных строк берутся только значения нужных колонок.
+    """
+    rows = _sheet_rows(source)
+    try:
+        header = [str(column) for column in next(rows, ())]
+        columns = _select_columns(header, method, extra_columns, all_columns)
+        text = set(text_columns(method))
+        positions = [header.index(column) for column in columns]
+        # Значения нужных колонок по строкам; короткие строки дополняются None
+        picked = (
+            [row[position] if position < len(row) else None for position in positions]
+            for row in rows
+        )
+        values = list(zip(*picked)) or [()] * len(columns)
+    finally:
+        rows.close()
+    return pd.DataFrame(
+        {
+            column: _excel_column(column_values, column in text)
+            for column, column_values in zip(columns, values)
+        },
+        columns=columns,
+    )
+
+
+def _select_columns(header, method, extra_columns, all_columns=False):
+    missing = [column for column in REQUIRED_COLUMNS[method] if column not in header]
+    if missing:
+        raise ValueError(f"Нет колонок: {', '.join(missing)}")
+    columns = list(REQUIRED_COLUMNS[method])
+    extra_columns = header if all_columns else extra_columns
+    for column in [*OPTIONAL_COLUMNS[method], *extra_columns]:
+        if column in header and column not in columns:
+            columns.append(column)
+    return columns
+
+
+def _read_projected(source, file_format, columns, text):
+    """Чтение колонок columns средствами pandas; text - строками."""
+    dtype = {column: str for column in text}
+    if _is_excel(file_format):
+        return pd.read_excel(
+            source, usecols=columns, dtype=dtype, engine=excel_engine()
+        )
+    if file_format == "csv":
+        return pd.read_csv(source, usecols=columns, dtype=dtype)
+    if file_format == "parquet":
+        return pd.read_parquet(source, columns=columns)
+    return pd.read_feather(source, columns=columns)
+
+
+@profiled()
+def read_input(source, method, extra_columns=(), file_format=None, all_columns=False):
+    """
+    Чтение выгрузки метода прогнозирования.
+
+    Сначала по строке заголовка проверяется наличие обязательных колонок,
+    затем читаются только обязательные, необязательные (OPTIONAL_COLUMNS) и
+    extra_columns. Коды читаются строками, поэтому "0101" не превращается
+    в 101, дата поступления разбирается один раз. Excel (xlsx) разбирается
+    за один проход: заголовок берется из первой строки листа, DataFrame
+    строится только из нужных колонок.
+
+    Args:
+        source: Путь к файлу или файловый объект (например, загруженный файл).
+        method: Метод прогнозирования (1 или 2).
+        extra_columns: Дополнительные колонки, читаемые, если есть в файле.
+        file_format: Формат файла; по умолчанию определяется по расширению.
+        all_columns: Читать все колонки файла (например, для просмотра и
+            экспорта в приложении); обязательные проверяются так же.
+
+    Returns:
+        pd.DataFrame: Колонки в порядке: обязательные, необязательные, extra
+            (при all_columns - остальные колонки в порядке файла).
+
+    Raises:
+        ValueError: Если в заголовке нет обязательных колонок.
+    """
+    file_format = file_format or _file_format(source)
+    # Старый формат xls openpyxl не читает, он читается через pandas (xlrd)
+    if _is_excel(file_format) and (
+        file_format != "xls" or excel_engine() == "calamine"
+    ):
+        df = _read_excel(source, method, extra_columns, all_columns)
+    else:
+        header = read_header(source, file_format)
+        columns = _select_columns(header, method, extra_columns, all_columns)
+        text = [column for column in text_columns(method) if column in columns]
+        df = _read_projected(source, file_format, columns, text)[columns]
+    text = [column for column in text_columns(method) if column in df.columns]
+
+    # Колоночные форматы хранят типы как есть: коды, записанные числами,
+    # приводятся к строкам (целые с пропусками - без ".0")
+    for column in text:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype) or (
+            pd.api.types.is_string_dtype(series)
+        ):
+            continue
+        if pd.api.types.is_float_dtype(series) and (series.dropna() % 1 == 0).all():
+            series = series.astype("Int64")
+        df[column] = series.astype(str).where(series.notna())
+    date_column = METHOD_DATE_COLUMNS[method]
+    # Единое разрешение дат независимо от движка чтения
+    df[date_column] = pd.to_datetime(df[date_column]).dt.as_unit("us")
+    return df
@@ -0,0 +1,209 @@
+import concurrent.futures
+import contextvars
+import os
+import threading
+import time
+
+# Количество одновременно выполняемых фоновых расчетов в процессе
+JOB_WORKERS = int(os.environ.get("STOK_JOB_WORKERS", "2"))
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Расчет прерван вызовом Job.cancel()."""
+
+
+class Job:
+    """
+    Фоновый расчет с прогрессом, промежуточным результатом и отменой.
+
+    Функция расчета получает задачу первым аргументом и сообщает о ходе
+    расчета через report(). После cancel() ближайший вызов report()
+    прерывает расчет исключением JobCancelled. Атрибуты задачи читаются
+    из других потоков без блокировок: каждый из них заменяется целиком.
+
+    Одну задачу могут ожидать несколько подписчиков (сеансов приложения):
+    unsubscribe() отменяет расчет, только когда не остается ни одного.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.status = PENDING
+        self.done = 0
+        self.total = None
+        self.partial = None
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self._cancel = threading.Event()
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    @property
+    def progress(self):
+        """Доля выполненной работы от 0 до 1."""
+        if self.status == DONE:
+            return 1.0
+        if not self.total:
+            return 0.0
+        return min(self.done / self.total, 1.0)
+
+    @property
+    def elapsed(self):
+        """Время выполнения в секундах."""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def report(self, done, total, partial=None):
+        """
+        Ход расчета: готово done частей из total и промежуточный результат.
+
+        Raises:
+            JobCancelled: Если запрошена отмена.
+        """
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.done, self.total = done, total
+        if partial is not None:
+            self.partial = partial
+
+    def subscribe(self, subscriber):
+        """
+        Подписка на результат (например, идентификатор сеанса).
+
+        Returns:
+            bool: False, если расчет уже отменяется.
+        """
+        with self._lock:
+            if self._cancel.is_set():
+                return False
+            self._subscribers.add(subscriber)
+            return True
+
+    def unsubscribe(self, subscriber):
+        """
+        Отказ подписчика от результата.
+
+        Returns:
+            bool: True, если подписчиков не осталось и расчет отменен.
+        """
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            if self._subscribers:
+                return False
+            # Под блокировкой, чтобы новый подписчик не присоединился к
+            # отменяемой задаче
+            self._cancel.set()
+        self.cancel()
+        return True
+
+    def cancel(self):
+        """Запрос отмены; задача, не начавшая выполнение, отменяется сразу."""
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self.status = CANCELLED
+
+    def run(self, func, args, kwargs):
+        if self._cancel.is_set():
+            self.status = CANCELLED
+            return
+        self.started_at = time.perf_counter()
+        self.status = RUNNING
+        try:
+            self.result = func(self, *args, **kwargs)
+            self.status = DONE
+        except JobCancelled:
+            self.status = CANCELLED
+        except Exception as error:
+            self.error = error
+            self.status = FAILED
+        finally:
+            self.finished_at = time.perf_counter()
+
+
+class JobManager:
+    """
+    Пул потоков фоновых расчетов с объединением одинаковых задач.
+
+    Пока задача с ключом выполняется, повторный submit с тем же ключом
+    возвращает ее, а не запускает второй расчет. Завершенные задачи
+    менеджер не хранит: результат забирает тот, кто запустил задачу.
+    Задача выполняется в копии контекста submit (contextvars), поэтому
+    замеры активного профилировщика продолжаются в фоновом потоке.
+    """
+
+    def __init__(self, workers=JOB_WORKERS):
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="stok-job"
+        )
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def get(self, key):
+        """Незавершенная задача с ключом или None."""
+        return self._jobs.get(key)
+
+    def submit(self, key, func, *args, subscriber=None, **kwargs):
+        """
+        Запуск func(job, *args, **kwargs) в фоновом потоке.
+
+        Args:
+            subscriber: Подписчик задачи (см. Job.unsubscribe); общую задачу
+                отменяет только уход последнего подписчика.
+
+        Returns:
+            Job: Новая задача или выполняющаяся задача с тем же ключом.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                if subscriber is None and not job.cancel_requested:
+                    return job
+                if subscriber is not None and job.subscribe(subscriber):
+                    return job
+            job = Job(key)
+            if subscriber is not None:
+                job.subscribe(subscriber)
+            self._jobs[key] = job
+            context = contextvars.copy_context()
+            job.future = self._executor.submit(context.run, job.run, func, args, kwargs)
+        job.future.add_done_callback(lambda _: self._forget(job))
+        return job
+
+    def _forget(self, job):
+        with self._lock:
+            if self._jobs.get(job.key) is job:
+                del self._jobs[job.key]
+
+    def cancel(self, key):
+        """Отмена незавершенной задачи с ключом."""
+        job = self.get(key)
+        if job is not None:
+            job.cancel()
+
+    def shutdown(self, cancel=True):
+        """Остановка пула; при cancel=True незавершенные задачи отменяются."""
+        if cancel:
+            for job in list(self._jobs.values()):
+                job.cancel()
+        self._executor.shutdown(wait=True)
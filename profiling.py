@@ -0,0 +1,194 @@
+import contextlib
+import contextvars
+import cProfile
+import functools
+import io
+import json
+import logging
+import marshal
+import os
+import pstats
+import threading
+import time
+
+import pandas as pd
+
+from constants import BYTES_IN_MB
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+LOGGER = logging.getLogger("stok.profiling")
+
+REPORT_COLUMNS = ["Этап", "Время, с", "Строк на входе", "Строк на выходе", "Память, МБ"]
+
+# Профилировщик текущего запуска; без него замеры этапов не выполняются
+_current = contextvars.ContextVar("profiler", default=None)
+
+
+def current_rss():
+    """Резидентная память процесса в байтах (None, если недоступна)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _rows(value):
+    """Количество строк первого DataFrame (или представления) в значении."""
+    items = value if isinstance(value, (tuple, list)) else [value]
+    for item in items:
+        if isinstance(item, pd.DataFrame) or hasattr(item, "for_date"):
+            return len(item)
+    return None
+
+
+class Profiler:
+    """
+    Замеры этапов: время, строки на входе и выходе, прирост памяти процесса.
+
+    Этапы замеряются только внутри activate(). Для каждого этапа хранится
+    последний замер, поэтому при повторных запусках (перерисовка страницы
+    Streamlit) таблица не растет; вложенные этапы отображаются с отступом
+    под этапом, в котором они выполнялись (вложенность считается отдельно
+    для каждого потока, например фонового расчета). При log=True каждый
+    замер выводится в журнал "stok.profiling" строкой JSON. Замеры
+    добавляются и читаются под блокировкой: фоновый расчет пишет их, пока
+    страница строит таблицу.
+    """
+
+    def __init__(self, log=False, context=None):
+        self.log = log
+        self.context = context or {}
+        self.records = {}
+        self.profile = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def activate(self, cprofile=False):
+        """Включение замеров (и cProfile при cprofile=True) в блоке with."""
+        if cprofile and self.profile is None:
+            self.profile = cProfile.Profile()
+        token = _current.set(self)
+        if cprofile:
+            self.profile.enable()
+        try:
+            yield self
+        finally:
+            if cprofile:
+                self.profile.disable()
+            _current.reset(token)
+
+    @property
+    def depth(self):
+        """Уровень вложенности этапов в текущем потоке."""
+        return getattr(self._local, "depth", 0)
+
+    @depth.setter
+    def depth(self, value):
+        self._local.depth = value
+
+    def add(self, record):
+        with self._lock:
+            self.records.pop(record["stage"], None)
+            self.records[record["stage"]] = record
+        if self.log:
+            LOGGER.info(json.dumps({**self.context, **record}, ensure_ascii=False))
+
+    def snapshot(self):
+        """Копия замеров в порядке начала этапов."""
+        with self._lock:
+            records = list(self.records.values())
+        return sorted(records, key=lambda record: record["started_at"])
+
+    def to_frame(self):
+        """Таблица замеров для отображения."""
+        report = pd.DataFrame(
+            [
+                {
+                    "Этап": "    " * record["level"] + record["stage"],
+                    "Время, с": record["seconds"],
+                    "Строк на входе": record["rows_in"],
+                    "Строк на выходе": record["rows_out"],
+                    "Память, МБ": record["memory_delta_mb"],
+                }
+                for record in self.snapshot()
+            ],
+            columns=REPORT_COLUMNS,
+        )
+        return report.astype({"Строк на входе": "Int64", "Строк на выходе": "Int64"})
+
+    def cprofile_stats(self, limit=30):
+        """Текстовый отчет cProfile: функции с наибольшим общим временем."""
+        if self.profile is None:
+            return ""
+        output = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=output)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return output.getvalue()
+
+    def cprofile_dump(self):
+        """Данные cProfile в формате файла .prof (pstats, snakeviz)."""
+        if self.profile is None:
+            return b""
+        return marshal.dumps(pstats.Stats(self.profile).stats)
+
+
+@contextlib.contextmanager
+def stage(name, rows=None):
+    """
+    Замер этапа активного профилировщика.
+
+    Возвращает словарь замера, в который можно записать "rows_out". Без
+    активного профилировщика замер не выполняется.
+    """
+    profiler = _current.get()
+    if profiler is None:
+        yield {}
+        return
+    record = {
+        "stage": name,
+        "level": profiler.depth,
+        "started_at": time.time(),
+        "rows_in": rows,
+        "rows_out": None,
+    }
+    rss = current_rss()
+    start = time.perf_counter()
+    profiler.depth += 1
+    try:
+        yield record
+    finally:
+        profiler.depth -= 1
+        record["seconds"] = time.perf_counter() - start
+        after = current_rss()
+        record["memory_delta_mb"] = (
+            (after - rss) / BYTES_IN_MB if rss is not None and after else None
+        )
+        profiler.add(record)
+
+
+def profiled(name=None):
+    """Декоратор: замер вызова функции как этапа name (по умолчанию имя функции)."""
+
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with stage(stage_name, _rows(args)) as record:
+                result = func(*args, **kwargs)
+                record["rows_out"] = _rows(result)
+            return result
+
+        return wrapper
+
+    return decorator
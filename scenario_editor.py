@@ -0,0 +1,86 @@
+import streamlit as st
+import pandas as pd
+
+from aging import get_aging_scale, shift_aging_scale
+from scenarios import Scenario
+from visualization import display_scenario_comparison
+
+SCENARIO_TABLE_COLUMNS = [
+    "Сценарий",
+    "Дата окончания",
+    "Шаг, дни",
+    "Сдвиг шкалы, дни",
+    "Множитель потребления",
+]
+
+
+def default_scenarios(method, end_date, step_days):
+    """Starting rows of the scenario editor."""
+    rows = [
+        ("База", end_date, step_days, 0, 1.0),
+        ("Шкала +30 дней", end_date, step_days, 30, 1.0),
+    ]
+    if "Метод 1" in method:
+        rows.append(("Потребление x1.5", end_date, step_days, 0, 1.5))
+    else:
+        rows.append(("Шаг 7 дней", end_date, 7, 0, 1.0))
+    return pd.DataFrame(rows, columns=SCENARIO_TABLE_COLUMNS)
+
+
+def scenarios_from_table(table, method_number):
+    """Scenario objects from the edited table; empty cells mean defaults."""
+    default_scale = get_aging_scale(method_number).scale
+    scenarios = []
+    for row in table.itertuples(index=False):
+        name, end_date, step_days, shift, factor = row
+        if pd.isna(name) or not str(name).strip():
+            continue
+        shift = 0 if pd.isna(shift) else int(shift)
+        scenarios.append(
+            Scenario(
+                str(name).strip(),
+                end_date=None if pd.isna(end_date) else end_date,
+                step_days=None if pd.isna(step_days) else int(step_days),
+                scale=shift_aging_scale(default_scale, shift) if shift else None,
+                consumption_factor=1.0 if pd.isna(factor) else float(factor),
+            )
+        )
+    return scenarios
+
+
+def show_scenario_editor(method, end_date, step_days, run):
+    """
+    What-if editor: horizons, steps, aging-scale shifts, consumption.
+
+    run(table) forecasts the scenarios of the edited table and returns
+    their summary; a ValueError from it is shown as an input error.
+    """
+    with st.expander("Сравнение сценариев", expanded=False):
+        st.caption(
+            "Сценарии считаются за один проход по данным: сдвиг шкалы переносит "
+            "границы категорий на заданное число дней, множитель потребления "
+            "меняет расход в Методе 1."
+        )
+        table = st.data_editor(
+            default_scenarios(method, end_date, step_days),
+            num_rows="dynamic",
+            use_container_width=True,
+            hide_index=True,
+            key="scenario_table",
+            column_config={
+                "Дата окончания": st.column_config.DateColumn(format="DD.MM.YYYY"),
+                "Шаг, дни": st.column_config.NumberColumn(min_value=1, max_value=90),
+                "Сдвиг шкалы, дни": st.column_config.NumberColumn(step=1),
+                "Множитель потребления": st.column_config.NumberColumn(
+                    min_value=0.0, step=0.1
+                ),
+            },
+        )
+        if st.button("Сравнить сценарии", key="run_scenarios"):
+            try:
+                st.session_state.scenario_summary = run(table)
+            except ValueError as error:
+                st.error(f"Ошибка в сценариях: {error}")
+        scenario_summary = st.session_state.scenario_summary
+        if scenario_summary is not None and not scenario_summary.empty:
+            display_scenario_comparison(scenario_summary)
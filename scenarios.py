@@ -0,0 +1,174 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from aging import AgingScale, calculate_aging_days_array, get_aging_scale
+from constants import METHOD_DATE_COLUMNS, METHOD_VALUE_COLUMNS, REMAINING_COLUMN
+from data_processors import _parse_dates, forecast_dates
+from depletion import build_depletion, remaining_totals_by_rate
+from profiling import profiled, stage
+from timeline import build_summary, category_totals
+
+SCENARIO_COLUMN = "Сценарий"
+
+
+class Scenario:
+    """
+    Вариант параметров прогноза для сравнения сценариев.
+
+    Незаданные параметры берутся из аргументов forecast_scenarios и шкалы
+    старения метода.
+    """
+
+    def __init__(
+        self, name, end_date=None, step_days=None, scale=None, consumption_factor=1.0
+    ):
+        """
+        Args:
+            name: Название сценария (значение колонки "Сценарий").
+            end_date: Дата окончания прогноза.
+            step_days: Шаг прогноза в днях.
+            scale (list): Шкала старения в формате AGING_SCALE_METHOD_*.
+            consumption_factor: Множитель дневного потребления; влияет на
+                "Оставшееся количество", если расход учитывается.
+        """
+        if step_days is not None and step_days < 1:
+            raise ValueError(f"Шаг прогноза сценария {name} должен быть не меньше 1")
+        if consumption_factor < 0:
+            raise ValueError(
+                f"Множитель потребления сценария {name} не может быть отрицательным"
+            )
+        self.name = name
+        self.end_date = end_date
+        self.step_days = step_days
+        self.scale = scale
+        self.consumption_factor = float(consumption_factor)
+
+
+def _scale_key(scale):
+    return tuple(
+        (
+            category["name"],
+            category["min_days"],
+            category["max_days"],
+            category["status"],
+        )
+        for category in scale
+    )
+
+
+def _group_scenarios(scenarios, forecast_end_date, step_days, current_date, method):
+    """
+    Сценарии, сгруппированные по шкале старения и шагу прогноза.
+
+    Даты сценариев группы начинаются с текущей даты и идут с одним шагом,
+    поэтому даты более короткого горизонта - начало дат самого длинного.
+    """
+    default_scale = get_aging_scale(method).scale
+    groups = {}
+    for position, scenario in enumerate(scenarios):
+        scale = scenario.scale or default_scale
+        step = scenario.step_days or step_days
+        dates = forecast_dates(
+            scenario.end_date or forecast_end_date, step, current_date
+        )
+        groups.setdefault((_scale_key(scale), step), (scale, []))[1].append(
+            (position, scenario, dates)
+        )
+    return groups
+
+
+@profiled()
+def forecast_scenarios(
+    df,
+    scenarios,
+    forecast_end_date,
+    step_days=30,
+    current_date=None,
+    method=1,
+    depletion=None,
+):
+    """
+    Сводные результаты прогноза для нескольких сценариев за один проход.
+
+    Разбор дат, дни хранения на текущую дату и модель расхода считаются
+    один раз для всех сценариев. Сценарии с одинаковыми шкалой и шагом
+    считаются вместе: переходы между категориями (как в forecast_timeline)
+    определяются для самого длинного горизонта, а категории ячеек матрицы
+    остатка - один раз для всех множителей потребления. Сводка каждого
+    сценария совпадает с forecast_timeline при его параметрах.
+
+    Args:
+        df: DataFrame с данными о запасах.
+        scenarios: Список Scenario.
+        forecast_end_date: Дата окончания прогноза по умолчанию.
+        step_days: Шаг прогноза по умолчанию.
+        current_date: Дата, от которой начинается прогноз (для тестирования).
+        method: Метод прогнозирования (1 или 2).
+        depletion: Модель расхода запаса: None, "linear" или "fifo".
+
+    Returns:
+        pd.DataFrame: Колонка "Сценарий" и колонки сводных результатов, строки
+            сценариев в порядке scenarios (сценарии без дат прогноза
+            пропускаются).
+    """
+    if current_date is None:
+        current_date = datetime.datetime.now()
+    date_column = METHOD_DATE_COLUMNS[method]
+    value_column = METHOD_VALUE_COLUMNS[method]
+    _parse_dates(df, date_column)
+
+    with stage("общие массивы сценариев", len(df)):
+        days = calculate_aging_days_array(df[date_column], current_date)
+        dated_mask = df[date_column].notna().to_numpy()
+        values = df[value_column].to_numpy()
+        model = build_depletion(df, method, depletion)
+
+    summaries = [None] * len(scenarios)
+    groups = _group_scenarios(
+        scenarios, forecast_end_date, step_days, current_date, method
+    )
+    for (_, step), (scale_table, members) in groups.items():
+        scale = get_aging_scale(method)
+        if scale_table is not scale.scale:
+            scale = AgingScale(scale_table)
+        longest = max((dates for _, _, dates in members), key=len)
+        n_dates = len(longest)
+        if n_dates == 0:
+            continue
+        with stage("сценарии с общей шкалой и шагом", len(df)):
+            totals, counts = category_totals(
+                days, values, dated_mask, scale, n_dates, step
+            )
+            if model is not None:
+                factors = sorted(
+                    {scenario.consumption_factor for _, scenario, _ in members}
+                )
+                elapsed_days = (longest - longest[0]).days.to_numpy()
+                remaining = dict(
+                    zip(
+                        factors,
+                        remaining_totals_by_rate(
+                            days, dated_mask, model, scale, elapsed_days, factors
+                        ),
+                    )
+                )
+        for position, scenario, dates in members:
+            size = len(dates)
+            if size == 0:
+                continue
+            columns = {value_column: (totals[:size], df[value_column].dtype)}
+            if model is not None:
+                columns[REMAINING_COLUMN] = (
+                    remaining[scenario.consumption_factor][:size],
+                    np.dtype(np.float64),
+                )
+            summary_df = build_summary(dates, scale.statuses, counts[:size], columns)
+            summary_df.insert(0, SCENARIO_COLUMN, scenario.name)
+            summaries[position] = summary_df
+
+    summaries = [summary_df for summary_df in summaries if summary_df is not None]
+    if not summaries:
+        return pd.DataFrame()
+    return pd.concat(summaries, ignore_index=True)
@@ -0,0 +1,401 @@
+"""
+Пакетный запуск прогноза из командной строки без Streamlit.
+
+Пример:
+    python -m stok forecast --method 2 --input x.parquet --end 2027-12-31 \\
+        --step 30 --out results/
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import time
+
+import pandas as pd
+
+from batch import (
+    forecast_batch,
+    forecast_incremental,
+    merge_summaries,
+    split_partitions,
+)
+from cache import ResultCache
+from data_io import DEFAULT_CHUNK_ROWS, write_file, write_frames
+from data_processors import (
+    forecast_with_demand,
+    forecast_without_demand,
+    preprocess_input,
+)
+from depletion import DEPLETION_MODES
+from dtypes import memory_report, memory_summary, normalize_dtypes
+from export import export_excel
+from ingest import read_input
+from profiling import Profiler
+from streaming import forecast_streaming
+
+OUTPUT_FORMATS = ["parquet", "feather", "csv", "xlsx"]
+
+
+@contextlib.contextmanager
+def stage(timings, name):
+    """Замер времени этапа в секундах: timings[name]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+def write_details(details, path, file_format, summary=None):
+    """
+    Запись детальных результатов по датам без сборки строк всех дат.
+
+    CSV, Parquet и Feather пишутся по одной дате, xlsx - как экспорт
+    приложения: сводка (summary) и по листу на дату прогноза.
+    """
+    if file_format == "xlsx":
+        data = export_excel(summary, details)
+    elif file_format != "csv":
+        data = write_frames((frame for _, frame in details.iter_frames()), file_format)
+    else:
+        header = True
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            for _, frame in details.iter_frames():
+                frame.to_csv(file, index=False, header=header)
+                header = False
+        return
+    with open(path, "wb") as file:
+        file.write(data)
+
+
+def forecast_file(
+    path,
+    method,
+    end_date,
+    step_days,
+    out_dir,
+    current_date=None,
+    depletion=None,
+    output_format="parquet",
+    write_detail=True,
+):
+    """
+    Прогноз по одному входному файлу с записью результатов в out_dir.
+
+    Args:
+        path: Входной файл (Excel, CSV, Parquet, Feather/Arrow IPC).
+        method: Метод прогнозирования (1 или 2).
+        end_date: Дата окончания прогноза.
+        step_days: Шаг прогноза в днях.
+        out_dir: Каталог результатов.
+        current_date: Текущая дата (по умолчанию сегодня).
+        depletion: Режим расхода запаса (None, "linear", "fifo").
+        output_format: Формат файлов результатов.
+        write_detail: Записывать ли детальные результаты.
+
+    Returns:
+        tuple: Время этапов в секундах (чтение, нормализация, предобработка,
+            прогноз, запись) и отчет memory_report о памяти данных.
+
+    Raises:
+        ValueError: Если в заголовке файла нет обязательных колонок метода.
+    """
+    timings = {}
+    with stage(timings, "чтение"):
+        raw_df = read_input(path, method)
+    with stage(timings, "нормализация"):
+        df = normalize_dtypes(raw_df)
+        report = memory_report(raw_df, df)
+    del raw_df
+
+    with stage(timings, "предобработка"):
+        if method == 2:
+            df = preprocess_input(df, 2, current_date)
+
+    forecast = forecast_with_demand if method == 1 else forecast_without_demand
+    with stage(timings, "прогноз"):
+        summary, details = forecast(
+            df, end_date, step_days, current_date, details="lazy", depletion=depletion
+        )
+
+    stem = os.path.splitext(os.path.basename(str(path)))[0]
+    with stage(timings, "запись"):
+        write_file(
+            summary,
+            os.path.join(out_dir, f"{stem}_сводка.{output_format}"),
+            output_format,
+        )
+        if write_detail:
+            write_details(
+                details,
+                os.path.join(out_dir, f"{stem}_детали.{output_format}"),
+                output_format,
+                summary,
+            )
+    return timings, report
+
+
+def stream_file(
+    path,
+    method,
+    end_date,
+    step_days,
+    out_dir,
+    current_date=None,
+    depletion=None,
+    output_format="parquet",
+    write_detail=True,
+    chunk_rows=DEFAULT_CHUNK_ROWS,
+):
+    """
+    Потоковый прогноз по файлу, не помещающемуся в память
+    (streaming.forecast_streaming): файл читается блоками по chunk_rows строк.
+
+    Сводка записывается в формате output_format, детальные строки - в каталог
+    <имя>_детали по одному CSV на дату прогноза.
+
+    Returns:
+        dict: Время этапов в секундах (чтение и прогноз, запись).
+    """
+    stem = os.path.splitext(os.path.basename(str(path)))[0]
+    timings = {}
+    with stage(timings, "чтение и прогноз"):
+        summary = forecast_streaming(
+            path,
+            end_date,
+            step_days,
+            current_date,
+            method,
+            detail_dir=(
+                os.path.join(out_dir, f"{stem}_детали") if write_detail else None
+            ),
+            chunk_rows=chunk_rows,
+            depletion=depletion,
+        )
+    with stage(timings, "запись"):
+        write_file(
+            summary,
+            os.path.join(out_dir, f"{stem}_сводка.{output_format}"),
+            output_format,
+        )
+    return timings
+
+
+def format_timings(timings):
+    """Строка отчета о времени этапов."""
+    stages = ", ".join(f"{name} {seconds:.2f} с" for name, seconds in timings.items())
+    return f"{stages}; всего {sum(timings.values()):.2f} с"
+
+
+def add_forecast_arguments(parser):
+    """Общие параметры прогноза команд forecast и batch."""
+    parser.add_argument("--method", type=int, choices=[1, 2], default=1)
+    parser.add_argument("--input", nargs="+", required=True, help="Входные файлы")
+    parser.add_argument("--end", required=True, help="Дата окончания (ГГГГ-ММ-ДД)")
+    parser.add_argument("--step", type=int, default=30, help="Шаг прогноза, дни")
+    parser.add_argument("--out", required=True, help="Каталог результатов")
+    parser.add_argument("--current-date", help="Текущая дата (ГГГГ-ММ-ДД)")
+    parser.add_argument("--depletion", choices=DEPLETION_MODES)
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="parquet")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m stok", description="Прогноз СНЗ и КСНЗ без Streamlit"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    forecast = commands.add_parser("forecast", help="Рассчитать прогноз по файлам")
+    add_forecast_arguments(forecast)
+    forecast.add_argument(
+        "--summary-only", action="store_true", help="Не записывать детальные данные"
+    )
+    forecast.add_argument(
+        "--profile",
+        action="store_true",
+        help="Выводить замеры этапов в stderr строками JSON",
+    )
+    forecast.add_argument("--cprofile", help="Сохранить профиль cProfile в файл .prof")
+    forecast.add_argument(
+        "--stream",
+        action="store_true",
+        help="Читать файлы блоками строк (выгрузки больше памяти)",
+    )
+    forecast.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=DEFAULT_CHUNK_ROWS,
+        help=f"Строк в блоке при --stream (по умолчанию {DEFAULT_CHUNK_ROWS})",
+    )
+
+    batch = commands.add_parser(
+        "batch", help="Параллельно рассчитать общую сводку по файлам"
+    )
+    add_forecast_arguments(batch)
+    batch.add_argument(
+        "--workers", type=int, help="Количество процессов (по умолчанию - ядра)"
+    )
+    batch.add_argument(
+        "--split",
+        action="store_true",
+        help="Разбить каждый файл на части по БЕ (Метод 2: БЕ/Завод/Склад)",
+    )
+    batch.add_argument(
+        "--store",
+        help="Каталог сводок частей: пересчитываются только измененные части",
+    )
+    return parser
+
+
+def run_forecast_command(args):
+    """Прогноз по всем входным файлам; ошибка в одном файле не прерывает остальные."""
+    end_date = pd.Timestamp(args.end)
+    current_date = pd.Timestamp(args.current_date) if args.current_date else None
+    os.makedirs(args.out, exist_ok=True)
+    if args.profile:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # Замеры этапов дешевы и ведутся всегда, в журнал они выводятся по --profile
+    profiler = Profiler(log=args.profile)
+
+    failed = 0
+    started = time.perf_counter()
+    for path in args.input:
+        profiler.context["file"] = str(path)
+        try:
+            with profiler.activate(cprofile=bool(args.cprofile)):
+                if args.stream:
+                    timings = stream_file(
+                        path,
+                        args.method,
+                        end_date,
+                        args.step,
+                        args.out,
+                        current_date=current_date,
+                        depletion=args.depletion,
+                        output_format=args.format,
+                        write_detail=not args.summary_only,
+                        chunk_rows=args.chunk_rows,
+                    )
+                    memory = ""
+                else:
+                    timings, report = forecast_file(
+                        path,
+                        args.method,
+                        end_date,
+                        args.step,
+                        args.out,
+                        current_date=current_date,
+                        depletion=args.depletion,
+                        output_format=args.format,
+                        write_detail=not args.summary_only,
+                    )
+                    memory = f"; память {memory_summary(report)}"
+        except Exception as error:
+            failed += 1
+            print(f"{path}: ошибка: {error}", file=sys.stderr)
+            continue
+        print(f"{path}: {format_timings(timings)}{memory}")
+
+    total = time.perf_counter() - started
+    print(f"Файлов: {len(args.input)}, с ошибками: {failed}, время {total:.2f} с")
+    if args.cprofile:
+        with open(args.cprofile, "wb") as file:
+            file.write(profiler.cprofile_dump())
+    return 1 if failed else 0
+
+
+def run_batch_command(args):
+    """
+    Общая сводка по всем файлам (или их частям) в пуле процессов.
+
+    Ошибка чтения или расчета файла выводится в stderr и не прерывает
+    остальные файлы: сводка записывается по успешным, код возврата - 1.
+    """
+    end_date = pd.Timestamp(args.end)
+    current_date = pd.Timestamp(args.current_date) if args.current_date else None
+    timings = {}
+    failed = set()
+
+    def report_error(path, error):
+        failed.add(path)
+        print(f"{path}: ошибка: {error}", file=sys.stderr)
+
+    def read_files():
+        for path in args.input:
+            try:
+                yield path, read_input(path, args.method)
+            except Exception as error:
+                report_error(path, error)
+
+    with stage(timings, "чтение"):
+        if args.store:
+            frames = [df for _, df in read_files()]
+        elif args.split:
+            sources = [
+                (path, part)
+                for path, df in read_files()
+                for _, part in split_partitions(df, args.method)
+            ]
+        else:
+            sources = [(path, path) for path in args.input]
+
+    with stage(timings, "прогноз"):
+        if args.store:
+            summary, changed = pd.DataFrame(), []
+            try:
+                if frames:
+                    # Без явной даты прогноз считается от начала дня, чтобы
+                    # повторные запуски в течение дня переиспользовали части
+                    summary, changed = forecast_incremental(
+                        pd.concat(frames, ignore_index=True),
+                        end_date,
+                        args.step,
+                        current_date or pd.Timestamp.today().normalize(),
+                        args.method,
+                        args.depletion,
+                        ResultCache(disk_dir=args.store),
+                        args.workers,
+                    )
+            except Exception as error:
+                report_error(", ".join(map(str, args.input)), error)
+            report = f"Пересчитано частей: {len(changed)}"
+        else:
+            summaries = forecast_batch(
+                [source for _, source in sources],
+                end_date,
+                args.step,
+                current_date,
+                args.method,
+                args.depletion,
+                args.workers,
+                on_error=lambda position, error: report_error(
+                    sources[position][0], error
+                ),
+            )
+            summary = merge_summaries(
+                [summary for summary in summaries if summary is not None]
+            )
+            report = f"Частей: {len(sources)}"
+
+    os.makedirs(args.out, exist_ok=True)
+    with stage(timings, "запись"):
+        write_file(
+            summary, os.path.join(args.out, f"сводка.{args.format}"), args.format
+        )
+    print(f"{report}; с ошибками файлов: {len(failed)}; {format_timings(timings)}")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "forecast":
+        return run_forecast_command(args)
+    if args.command == "batch":
+        return run_batch_command(args)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import datetime
+import os
+
+import pandas as pd
+
+from aging import get_aging_scale
+from constants import METHOD_DATE_COLUMNS
+from data_io import DEFAULT_CHUNK_ROWS, iter_chunks
+from data_processors import forecast_dates, preprocess_input
+from depletion import build_depletion
+from details import LazyForecastDetails
+from ingest import text_columns
+from timeline import build_summary, forecast_aggregates, merge_aggregates
+
+
+def _detail_path(detail_dir, forecast_date):
+    return os.path.join(detail_dir, f"детали_{forecast_date:%Y-%m-%d}.csv")
+
+
+def forecast_streaming(
+    source,
+    forecast_end_date,
+    step_days=30,
+    current_date=None,
+    method=1,
+    detail_dir=None,
+    chunk_rows=DEFAULT_CHUNK_ROWS,
+    depletion=None,
+):
+    """
+    Потоковое прогнозирование для выгрузок, не помещающихся в память.
+
+    Файл читается блоками строк (CSV, Parquet, xlsx). Для каждого блока
+    считаются частичные агрегаты сводной таблицы, которые затем складываются
+    в тот же summary_df, что и у forecast_with_demand/forecast_without_demand.
+    Детальные строки дописываются на диск по одному CSV на дату прогноза.
+
+    Партии с разными датами (Метод 2) объединяются внутри блока, поэтому
+    строки одной партии должны находиться в одном блоке (например, файл
+    отсортирован по ключам партии). Списание по FIFO в потоковом режиме
+    не поддерживается.
+
+    Args:
+        source: Путь к входному файлу.
+        forecast_end_date: Конечная дата прогноза.
+        step_days: Шаг прогноза в днях.
+        current_date: Дата, от которой начинается прогноз (для тестирования).
+        method: Метод прогнозирования (1 или 2).
+        detail_dir: Каталог для детальных результатов (None - не сохранять).
+        chunk_rows: Количество строк в блоке.
+        depletion: Модель расхода запаса: None или "linear".
+
+    Returns:
+        pd.DataFrame: Сводные результаты.
+    """
+    if depletion == "fifo":
+        raise ValueError("Списание по FIFO требует всех партий группы в памяти")
+    if current_date is None:
+        current_date = datetime.datetime.now()
+
+    dates = forecast_dates(forecast_end_date, step_days, current_date)
+    if len(dates) == 0:
+        return pd.DataFrame()
+
+    if detail_dir is not None:
+        os.makedirs(detail_dir, exist_ok=True)
+        for forecast_date in dates:
+            if os.path.exists(_detail_path(detail_dir, forecast_date)):
+                os.remove(_detail_path(detail_dir, forecast_date))
+
+    date_column = METHOD_DATE_COLUMNS[method]
+    text_dtypes = dict.fromkeys(text_columns(method), str)
+    aggregates = None
+    for chunk in iter_chunks(source, chunk_rows, dtype=text_dtypes):
+        chunk = preprocess_input(chunk, method, current_date)
+        if chunk.empty:
+            continue
+        chunk[date_column] = pd.to_datetime(chunk[date_column])
+        model = build_depletion(chunk, method, depletion)
+        aggregates = merge_aggregates(
+            aggregates, forecast_aggregates(chunk, method, dates, step_days, model)
+        )
+
+        if detail_dir is not None:
+            details = LazyForecastDetails(chunk, dates, method, model)
+            for forecast_date, frame in details.iter_frames():
+                path = _detail_path(detail_dir, forecast_date)
+                frame.to_csv(
+                    path, mode="a", header=not os.path.exists(path), index=False
+                )
+
+    if aggregates is None:
+        return pd.DataFrame()
+    return build_summary(dates, get_aging_scale(method).statuses, *aggregates)
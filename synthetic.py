@@ -0,0 +1,221 @@
+"""
+Генератор синтетических выгрузок для нагрузочного тестирования.
+
+Пример:
+    python -m synthetic --method 2 --rows 1000000 --out data/m2.parquet
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from constants import CONSUMPTION_COLUMN, METHOD_DATE_COLUMNS, METHOD_VALUE_COLUMNS
+from data_io import write_file
+
+AGE_DISTRIBUTIONS = ("exponential", "uniform")
+# Максимальное число строк данных на листе Excel (без заголовка)
+EXCEL_MAX_ROWS = 1_048_575
+# Доля партий Метода 2 с заполненным СПП элементом
+SPP_SHARE = 0.2
+
+
+def _codes(prefix, start, count, width=4):
+    """
+    Коды справочника: prefix + номер с ведущими нулями.
+
+    Если номера длиннее width, ширина увеличивается, чтобы коды не
+    обрезались и оставались уникальными.
+    """
+    width = max(width, len(str(start + count - 1)))
+    numbers = np.char.zfill(np.arange(start, start + count).astype(f"U{width}"), width)
+    return pd.Index(np.char.add(prefix, numbers))
+
+
+def _categorical(codes, categories):
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+def _receipt_dates(rng, rows, current_date, distribution, mean_age, max_age):
+    if distribution == "exponential":
+        ages = np.minimum(rng.exponential(mean_age, rows), max_age).astype(np.int64)
+    elif distribution == "uniform":
+        ages = rng.integers(0, max_age + 1, rows)
+    else:
+        raise ValueError(f"Неизвестное распределение возраста: {distribution}")
+    return current_date - pd.to_timedelta(ages, unit="D")
+
+
+def generate_dataset(
+    method=1,
+    rows=100_000,
+    business_units=5,
+    plants=4,
+    warehouses=5,
+    batches_per_material=3,
+    age_distribution="exponential",
+    mean_age_days=365,
+    max_age_days=1825,
+    missing_date_share=0.01,
+    mixed_batch_share=0.05,
+    consumption_share=0.5,
+    mean_coverage_days=365,
+    max_quantity=1000,
+    seed=0,
+    current_date=None,
+):
+    """
+    Синтетическая выгрузка заданного размера (воспроизводима при том же seed).
+
+    Партии распределяются по материалам (в среднем batches_per_material на
+    материал) и складам, материалы в выгрузке идут подряд. Для Метода 2
+    доля строк mixed_batch_share повторяет ключ существующей партии с
+    другой датой поступления. Организационные ключи и коды возвращаются как
+    Categorical, все колонки строятся векторно.
+
+    Args:
+        method: Метод прогнозирования (1 или 2).
+        rows: Количество строк.
+        business_units: Количество БЕ.
+        plants: Количество заводов (Метод 1 - областей планирования) на БЕ.
+        warehouses: Количество складов на завод (Метод 2).
+        batches_per_material: Среднее число партий (строк) на материал.
+        age_distribution: Распределение возраста запаса: "exponential"
+            (среднее mean_age_days) или "uniform" (от 0 до max_age_days).
+        mean_age_days: Средний возраст для экспоненциального распределения.
+        max_age_days: Максимальный возраст запаса в днях.
+        missing_date_share: Доля строк без даты поступления.
+        mixed_batch_share: Доля строк смешанных партий (Метод 2).
+        consumption_share: Доля строк с ненулевым дневным потреблением.
+        mean_coverage_days: Средний срок расхода запаса строки в днях.
+        max_quantity: Максимальное количество в строке.
+        seed: Начальное значение генератора случайных чисел.
+        current_date: Дата выгрузки, от которой отсчитывается возраст
+            (по умолчанию сегодня).
+
+    Returns:
+        pd.DataFrame: Данные с колонками выбранного метода и колонкой
+            "Дневное потребление".
+    """
+    rng = np.random.default_rng(seed)
+    current_date = pd.Timestamp(current_date or pd.Timestamp.today()).normalize()
+
+    mixed_rows = int(rows * mixed_batch_share) if method == 2 else 0
+    batches = rows - mixed_rows
+    materials = max(1, batches // batches_per_material)
+    locations = business_units * plants * (warehouses if method == 2 else 1)
+
+    material_of_batch = np.sort(rng.integers(0, materials, batches))
+    location_of_batch = rng.integers(0, locations, batches)
+    batch_of_row = np.sort(
+        np.concatenate([np.arange(batches), rng.integers(0, batches, mixed_rows)])
+    )
+    location = location_of_batch[batch_of_row]
+
+    plant = location if method == 1 else location // warehouses
+    data = {"БЕ": _categorical(plant // plants, _codes("", 101, business_units))}
+    if method == 1:
+        data["Область планирования"] = _categorical(
+            location, _codes("", 1001, locations)
+        )
+    else:
+        data["Завод"] = _categorical(plant, _codes("", 1001, locations // warehouses))
+        data["Склад"] = _categorical(location, _codes("", 2001, locations))
+    data["Материал"] = _categorical(
+        material_of_batch[batch_of_row], _codes("", 20000001, materials, 8)
+    )
+    if method == 2:
+        data["Партия"] = _categorical(batch_of_row, _codes("A", 1, batches, 6))
+        spp = np.where(
+            rng.random(batches) < SPP_SHARE, rng.integers(1, 1000, batches), 0
+        )
+        data["СПП элемент"] = _categorical(
+            spp[batch_of_row], [""] + list(_codes("SP", 1, 999))
+        )
+
+    dates = _receipt_dates(
+        rng, rows, current_date, age_distribution, mean_age_days, max_age_days
+    )
+    data[METHOD_DATE_COLUMNS[method]] = dates.where(
+        rng.random(rows) >= missing_date_share
+    )
+    quantity = rng.integers(1, max_quantity + 1, rows)
+    data[METHOD_VALUE_COLUMNS[method]] = quantity
+    coverage = rng.exponential(mean_coverage_days, rows) + 1
+    data[CONSUMPTION_COLUMN] = np.where(
+        rng.random(rows) < consumption_share, np.round(quantity / coverage, 3), 0.0
+    )
+    return pd.DataFrame(data)
+
+
+def write_dataset(df, path):
+    """
+    Запись выгрузки в файл формата по расширению (xlsx, csv, parquet, feather).
+
+    Raises:
+        ValueError: Если строк больше, чем помещается на лист Excel.
+    """
+    if str(path).lower().endswith(".xlsx") and len(df) > EXCEL_MAX_ROWS:
+        raise ValueError(
+            f"Лист Excel вмещает не более {EXCEL_MAX_ROWS} строк, "
+            f"используйте Parquet или CSV"
+        )
+    write_file(df, path)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m synthetic", description="Генерация синтетической выгрузки"
+    )
+    parser.add_argument("--method", type=int, choices=[1, 2], default=1)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--out", required=True, help="Файл .xlsx, .csv, .parquet")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--business-units", type=int, default=5)
+    parser.add_argument("--plants", type=int, default=4)
+    parser.add_argument("--warehouses", type=int, default=5)
+    parser.add_argument("--batches-per-material", type=int, default=3)
+    parser.add_argument(
+        "--age-distribution", choices=AGE_DISTRIBUTIONS, default="exponential"
+    )
+    parser.add_argument("--mean-age", type=int, default=365)
+    parser.add_argument("--max-age", type=int, default=1825)
+    parser.add_argument("--missing-dates", type=float, default=0.01)
+    parser.add_argument("--mixed-batches", type=float, default=0.05)
+    parser.add_argument("--consumption", type=float, default=0.5)
+    parser.add_argument("--current-date", help="Дата выгрузки (ГГГГ-ММ-ДД)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    started = time.perf_counter()
+    df = generate_dataset(
+        args.method,
+        args.rows,
+        business_units=args.business_units,
+        plants=args.plants,
+        warehouses=args.warehouses,
+        batches_per_material=args.batches_per_material,
+        age_distribution=args.age_distribution,
+        mean_age_days=args.mean_age,
+        max_age_days=args.max_age,
+        missing_date_share=args.missing_dates,
+        mixed_batch_share=args.mixed_batches,
+        consumption_share=args.consumption,
+        seed=args.seed,
+        current_date=args.current_date,
+    )
+    generated = time.perf_counter()
+    write_dataset(df, args.out)
+    print(
+        f"{args.out}: {len(df)} строк, генерация {generated - started:.2f} с, "
+        f"запись {time.perf_counter() - generated:.2f} с"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import numpy as np
+
+
+def select_rows(df, filters=None, contains=None, sort_by=None, ascending=True):
+    """
+    Фильтрация и сортировка детальных строк одной даты прогноза.
+
+    Args:
+        df: Детальные строки.
+        filters: {колонка: допустимые значения}; пустой список не фильтрует.
+            Значения сравниваются как строки, поэтому числовые коды (БЕ)
+            совпадают с вариантами фильтра, показанными текстом.
+        contains: {колонка: подстрока} без учета регистра.
+        sort_by: Колонка сортировки (None - исходный порядок).
+        ascending: Порядок сортировки.
+
+    Returns:
+        pd.DataFrame: Отобранные строки.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for column, values in (filters or {}).items():
+        if values:
+            text_values = [str(value) for value in values]
+            mask &= df[column].astype(str).isin(text_values).to_numpy()
+    for column, text in (contains or {}).items():
+        if text:
+            matches = df[column].astype(str).str.contains(text, case=False, regex=False)
+            mask &= matches.to_numpy(dtype=bool)
+    result = df if mask.all() else df[mask]
+    if sort_by is not None:
+        result = result.sort_values(sort_by, ascending=ascending, kind="stable")
+    return result
+
+
+def page_count(n_rows, page_size):
+    """Количество страниц (не меньше одной)."""
+    return max(1, -(-n_rows // page_size))
+
+
+def page_rows(df, page, page_size):
+    """
+    Строки одной страницы.
+
+    Args:
+        df: Отобранные строки.
+        page: Номер страницы (с 1), приводится к допустимому диапазону.
+        page_size: Количество строк на странице.
+
+    Returns:
+        tuple: (строки страницы, количество страниц).
+    """
+    pages = page_count(len(df), page_size)
+    page = min(max(page, 1), pages)
+    start = (page - 1) * page_size
+    return df.iloc[start : start + page_size], pages
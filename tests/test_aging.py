@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+from aging import AgingScale, calculate_aging_days_array, get_aging_scale
+from constants import AGING_SCALE_METHOD_2, NO_DATE_DAYS
+from utils import calculate_aging_days, determine_aging_category
+
+
+@pytest.mark.parametrize("method", [1, 2])
+def test_classify_matches_determine_aging_category(method):
+    """Векторная классификация совпадает с построчной на всем диапазоне."""
+    days = np.arange(-10, 12001)
+    scale = get_aging_scale(method)
+
+    expected_status = [determine_aging_category(d, method)["status"] for d in days]
+    expected_name = [determine_aging_category(d, method)["name"] for d in days]
+
+    assert list(scale.classify(days)) == expected_status
+    assert [scale.names[i] for i in scale.classify_entries(days)] == expected_name
+
+
+def test_no_date_priority_over_three_years():
+    """'Без даты' сохраняет приоритет над '> 3 лет' в Методе 2."""
+    scale = AgingScale(AGING_SCALE_METHOD_2)
+    result = scale.classify([NO_DATE_DAYS - 1, NO_DATE_DAYS, NO_DATE_DAYS + 1])
+    assert list(result) == ["СНЗ > 3 лет", "Требует проверки", "СНЗ > 3 лет"]
+
+
+def test_classify_returns_categorical_codes():
+    """Результат хранится как pandas.Categorical."""
+    result = get_aging_scale(1).classify([0, 300, 400])
+    assert isinstance(result, pd.Categorical)
+    assert list(result.categories) == get_aging_scale(1).statuses
+
+
+def test_calculate_aging_days_array_matches_scalar():
+    """Векторный расчет дней совпадает с calculate_aging_days."""
+    forecast_date = datetime(2023, 10, 27, 15, 30)
+    dates = pd.Series(
+        [
+            datetime(2023, 10, 27),
+            datetime(2023, 1, 1, 18, 0),
+            forecast_date + timedelta(days=3),
+            pd.NaT,
+        ]
+    )
+    expected = [calculate_aging_days(d, forecast_date) for d in dates]
+    assert list(calculate_aging_days_array(dates, forecast_date)) == expected
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+from batch import (
+    forecast_batch,
+    forecast_incremental,
+    merge_summaries,
+    split_partitions,
+)
+from cache import ResultCache
+from data_processors import forecast_timeline, preprocess_input
+
+pytest.importorskip("pyarrow")
+
+TODAY = datetime(2023, 10, 27)
+
+
+@pytest.fixture
+def method2_data():
+    """Несколько БЕ, партии с разными датами и материалы без даты."""
+    rng = np.random.default_rng(3)
+    rows = 400
+    return pd.DataFrame(
+        {
+            "БЕ": rng.choice(["0101", "0102", "0103"], rows),
+            "Завод": rng.choice(["1001", "1002"], rows),
+            "Склад": rng.choice(["S1", "S2"], rows),
+            "Материал": rng.choice([f"M{i}" for i in range(40)], rows),
+            "Партия": rng.choice(["P1", "P2"], rows),
+            "СПП элемент": [""] * rows,
+            "Дата поступления на склад": pd.Series(
+                pd.Timestamp(TODAY)
+                - pd.to_timedelta(rng.integers(0, 1500, rows), unit="D")
+            ).where(rng.random(rows) > 0.1),
+            "Фактический запас": rng.integers(1, 100, rows),
+        }
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_partitioned_batch_matches_single_run(method2_data, workers):
+    """Сводка по частям БЕ в пуле процессов совпадает с расчетом целиком."""
+    end_date = TODAY + timedelta(days=600)
+    expected = forecast_timeline(
+        preprocess_input(method2_data.copy(), 2, TODAY), end_date, 20, TODAY, 2
+    )
+
+    parts = split_partitions(method2_data, 2)
+    keys = [key for key, _ in parts]
+    assert keys == sorted(keys) and keys[0] == ("0101", "1001", "S1")
+    assert len(keys) == 12
+    summaries = forecast_batch(
+        [part for _, part in parts], end_date, 20, TODAY, 2, workers=workers
+    )
+    assert len(summaries) == len(parts)
+    pd.testing.assert_frame_equal(merge_summaries(summaries), expected)
+
+
+def test_batch_reads_files_in_order(tmp_path, method2_data):
+    """Файлы читаются исполнителями, результаты идут в порядке входа."""
+    paths = []
+    for key, part in split_partitions(method2_data, 2):
+        path = tmp_path / f"{'_'.join(key)}.parquet"
+        part.to_parquet(path, index=False)
+        paths.append(path)
+    end_date = TODAY + timedelta(days=90)
+
+    summaries = forecast_batch(paths[::-1], end_date, 30, TODAY, 2, workers=2)
+    expected = forecast_timeline(
+        preprocess_input(pd.read_parquet(paths[-1]), 2, TODAY), end_date, 30, TODAY, 2
+    )
+    pd.testing.assert_frame_equal(summaries[0], expected)
+
+
+def test_merge_summaries_empty():
+    """Пустой список частей дает пустую сводку."""
+    assert merge_summaries([pd.DataFrame()]).empty
+
+
+def test_incremental_recomputes_changed_partition(tmp_path, method2_data):
+    """После исправления одного склада пересчитывается только его часть."""
+    end_date = TODAY + timedelta(days=300)
+    store = ResultCache(disk_dir=tmp_path)
+    summary, changed = forecast_incremental(
+        method2_data, end_date, 30, TODAY, 2, store=store, workers=1
+    )
+    assert len(changed) == 12
+
+    corrected = method2_data.copy()
+    warehouse = (
+        (corrected["БЕ"] == "0102")
+        & (corrected["Завод"] == "1001")
+        & (corrected["Склад"] == "S2")
+    )
+    corrected.loc[warehouse, "Фактический запас"] += 5
+
+    # Новый экземпляр хранилища читает сохраненные части с диска
+    summary, changed = forecast_incremental(
+        corrected, end_date, 30, TODAY, 2, store=ResultCache(disk_dir=tmp_path)
+    )
+    assert changed == [("0102", "1001", "S2")]
+    expected = forecast_timeline(
+        preprocess_input(corrected.copy(), 2, TODAY), end_date, 30, TODAY, 2
+    )
+    pd.testing.assert_frame_equal(summary, expected)
@@ -0,0 +1,95 @@
+import json
+
+import pandas as pd
+import pytest
+
+import benchmark_cases
+from benchmark import compare_results, main
+from benchmark_cases import run_benchmarks
+
+
+def test_run_writes_json(tmp_path, capsys):
+    """Замеры сохраняются в JSON с описанием окружения."""
+    path = tmp_path / "results.json"
+    code = main(
+        [
+            "run",
+            "--rows",
+            "200",
+            "--horizon",
+            "90",
+            "--step",
+            "30",
+            "--cases",
+            "handle_mixed_batches",
+            "forecast_with_demand",
+            "--current-date",
+            "2023-10-27",
+            "--out",
+            str(path),
+        ]
+    )
+
+    assert code == 0
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    assert {"commit", "pandas", "results"} <= payload.keys()
+    cases = [result["case"] for result in payload["results"]]
+    assert cases == ["handle_mixed_batches", "forecast_with_demand"]
+    assert all(result["seconds"] > 0 for result in payload["results"])
+    assert "forecast_with_demand" in capsys.readouterr().out
+
+
+def test_compare_flags_regressions():
+    """Замедление сверх порога и шума отмечается как регрессия."""
+    result = {
+        "case": "forecast_with_demand",
+        "method": 1,
+        "rows": 1000,
+        "horizon_days": 365,
+        "step_days": 30,
+        "peak_mb": 10.0,
+    }
+    baseline = {
+        "results": [
+            {**result, "seconds": 1.0},
+            {**result, "case": "forecast_timeline", "seconds": 0.010},
+        ]
+    }
+    candidate = {
+        "results": [
+            {**result, "seconds": 2.0},
+            {**result, "case": "forecast_timeline", "seconds": 0.020},
+        ]
+    }
+
+    report = compare_results(baseline, candidate)
+    assert report["Регрессия"].tolist() == [True, False]
+    assert report["Время, раз"].tolist() == [2.0, 2.0]
+
+
+def test_export_cases_use_app_export_entry_point(monkeypatch):
+    """Экспорт замеряется через prepare_export_files, как в приложении."""
+    pytest.importorskip("pyarrow")
+    calls = []
+    prepare = benchmark_cases.prepare_export_files
+
+    def tracking_prepare(export_type, summary_df, detailed_df, pivot_df):
+        calls.append((export_type, type(detailed_df).__name__, len(pivot_df)))
+        return prepare(export_type, summary_df, detailed_df, pivot_df)
+
+    monkeypatch.setattr(benchmark_cases, "prepare_export_files", tracking_prepare)
+    results = run_benchmarks(
+        rows=[200],
+        cases=["export_excel", "export_parquet"],
+        current_date=pd.Timestamp("2023-10-27"),
+    )
+    assert [result["case"] for result in results] == [
+        "export_excel",
+        "export_parquet",
+    ]
+    assert {export_type for export_type, _, _ in calls} == {
+        "Excel (все данные)",
+        "Parquet",
+    }
+    assert all(details == "LazyForecastDetails" for _, details, _ in calls)
+    assert all(rows > 0 for _, _, rows in calls)
@@ -0,0 +1,172 @@
+import concurrent.futures
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from cache import ResultCache, content_hash, estimate_size, make_key
+
+
+def _frame(rows):
+    return pd.DataFrame({"Фактический запас": range(rows)})
+
+
+def test_make_key_is_stable():
+    """Одинаковые параметры дают одинаковый ключ, разные - разный."""
+    file_hash = content_hash(b"data")
+    assert make_key("forecast", file_hash, 1, 30) == make_key(
+        "forecast", file_hash, 1, 30
+    )
+    assert make_key("forecast", file_hash, 1, 30) != make_key(
+        "forecast", file_hash, 2, 30
+    )
+
+
+def test_lru_eviction_by_size():
+    """При превышении лимита вытесняется давно не использованная запись."""
+    size = estimate_size(_frame(100))
+    cache = ResultCache(max_bytes=2 * size)
+    cache.put("a", _frame(100))
+    cache.put("b", _frame(100))
+    cache.get("a")
+    cache.put("c", _frame(100))
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert cache.total_bytes <= cache.max_bytes
+
+
+def test_get_or_compute_calls_once():
+    """Повторный запрос с тем же ключом не пересчитывает значение."""
+    cache = ResultCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return _frame(3)
+
+    first = cache.get_or_compute("key", compute)
+    second = cache.get_or_compute("key", compute)
+    assert first is second
+    assert len(calls) == 1
+
+
+def test_disk_cache_survives_new_instance(tmp_path):
+    """Записи на диске доступны новому экземпляру кэша."""
+    ResultCache(disk_dir=tmp_path).put("key", (_frame(5), _frame(2)))
+
+    cache = ResultCache(disk_dir=tmp_path)
+    assert "key" in cache
+    summary, details = cache.get("key")
+    pd.testing.assert_frame_equal(summary, _frame(5))
+    assert len(details) == 2
+
+
+def test_hit_miss_counters():
+    """Попадания и промахи считаются для get и get_or_compute."""
+    cache = ResultCache()
+    assert cache.get("a") is None
+    cache.get_or_compute("a", lambda: _frame(3))
+    cache.get_or_compute("a", lambda: _frame(3))
+    cache.get("a")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+    assert stats["entries"] == 1 and stats["hit_rate"] == 0.5
+
+
+def test_concurrent_get_or_compute_computes_once():
+    """Одновременные запросы одного ключа из разных потоков считаются один раз."""
+    cache = ResultCache()
+    calls = []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return _frame(10)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        first = executor.submit(cache.get_or_compute, "key", compute)
+        started.wait(5)
+        others = [
+            executor.submit(cache.get_or_compute, "key", compute) for _ in range(7)
+        ]
+        results = [first.result()] + [future.result() for future in others]
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_value_over_budget_is_shared_with_waiters():
+    """Значение больше лимита не кэшируется, но ожидающие потоки его получают."""
+    cache = ResultCache(max_bytes=1)
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return _frame(100)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(cache.get_or_compute, "key", compute)
+        started.wait(5)
+        second = executor.submit(cache.get_or_compute, "key", compute)
+        # Второй поток промахнулся и ждет, пока первый держит расчет
+        deadline = time.monotonic() + 5
+        while cache.stats()["misses"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        release.set()
+        value, shared = first.result(), second.result()
+    assert shared is value and len(value) == 100
+    assert len(calls) == 1
+    assert len(cache) == 0 and cache.stats()["evictions"] == 0
+
+
+@pytest.mark.parametrize("value", [_frame(50), (_frame(50), _frame(3))])
+def test_arrow_disk_format_is_memory_mapped(tmp_path, value):
+    """В формате arrow DataFrame читаются с диска отображением файла в память."""
+    pytest.importorskip("pyarrow")
+    ResultCache(disk_dir=tmp_path, disk_format="arrow").put("key", value)
+
+    cache = ResultCache(disk_dir=tmp_path, disk_format="arrow")
+    assert "key" in cache
+    restored = cache.get("key")
+    frames = [restored] if isinstance(value, pd.DataFrame) else list(restored)
+    expected = [value] if isinstance(value, pd.DataFrame) else list(value)
+    assert len(frames) == len(expected)
+    for frame, original in zip(frames, expected):
+        pd.testing.assert_frame_equal(frame, original)
+    # Колонка ссылается на буфер Arrow отображенного файла, а не на копию
+    # в памяти NumPy
+    values = frames[0]["Фактический запас"].to_numpy()
+    while isinstance(values.base, np.ndarray):
+        values = values.base
+    assert values.base is not None and not isinstance(values.base, np.ndarray)
+
+
+def test_arrow_disk_format_pickles_other_values(tmp_path):
+    cache = ResultCache(disk_dir=tmp_path, disk_format="arrow")
+    cache.put("key", {"a": 1})
+    assert ResultCache(disk_dir=tmp_path, disk_format="arrow").get("key") == {"a": 1}
+    with pytest.raises(ValueError):
+        ResultCache(disk_format="json")
+
+
+def test_disk_dir_is_private(tmp_path):
+    """Каталог кэша (pickle - граница доверия) доступен только владельцу."""
+    ResultCache(disk_dir=tmp_path / "cache")
+    assert (tmp_path / "cache").stat().st_mode & 0o077 == 0
+
+
+def test_discard_removes_memory_and_disk_entry(tmp_path):
+    cache = ResultCache(disk_dir=str(tmp_path))
+    cache.put("k", pd.DataFrame({"a": [1]}))
+    cache.discard("k")
+    assert "k" not in cache and len(cache) == 0 and cache.total_bytes == 0
+    assert list(tmp_path.iterdir()) == []
+    cache.discard("нет такого ключа")
@@ -0,0 +1,83 @@
+import io
+
+import pandas as pd
+import pytest
+from data_io import iter_chunks, read_table, write_frames, write_table
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def typed_frame():
+    """Фикстура с датами, категориями и кодами с ведущими нулями."""
+    return pd.DataFrame(
+        {
+            "БЕ": ["0101", "0102", "0101"],
+            "Дата прогноза": pd.to_datetime(["2024-01-01", "2024-01-01", "2024-02-01"]),
+            "Категория": pd.Categorical(["Ликвидный", "СНЗ", "Ликвидный"]),
+            "Фактический запас": [10, 20, 30],
+        }
+    )
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "feather"])
+def test_write_read_roundtrip_preserves_dtypes(typed_frame, file_format):
+    """Колоночные форматы сохраняют datetime64 и Categorical."""
+    data = write_table(typed_frame, file_format)
+    result = read_table(io.BytesIO(data), file_format)
+
+    pd.testing.assert_frame_equal(result, typed_frame)
+    assert isinstance(result["Категория"].dtype, pd.CategoricalDtype)
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "feather"])
+def test_write_arrow_table(typed_frame, file_format):
+    """Таблица pyarrow записывается без преобразования в DataFrame."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(typed_frame, preserve_index=False)
+    result = read_table(io.BytesIO(write_table(table, file_format)), file_format)
+    pd.testing.assert_frame_equal(result, typed_frame)
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "feather"])
+def test_write_frames_streams_parts(typed_frame, file_format):
+    """Части записываются по одной и читаются как одна таблица."""
+    parts = [typed_frame.iloc[:2], typed_frame.iloc[2:]]
+    result = read_table(io.BytesIO(write_frames(iter(parts), file_format)), file_format)
+    pd.testing.assert_frame_equal(result, typed_frame)
+
+    empty = write_frames(iter([]), file_format)
+    assert read_table(io.BytesIO(empty), file_format).empty
+
+
+def test_read_table_detects_format_by_name(tmp_path, typed_frame):
+    """Формат определяется по расширению пути или имени загруженного файла."""
+    path = tmp_path / "data.arrow"
+    path.write_bytes(write_table(typed_frame, "feather"))
+    pd.testing.assert_frame_equal(read_table(path), typed_frame)
+
+    upload = io.BytesIO(write_table(typed_frame, "parquet"))
+    upload.name = "выгрузка.parquet"
+    pd.testing.assert_frame_equal(read_table(upload), typed_frame)
+
+
+def test_iter_chunks_arrow(tmp_path, typed_frame):
+    """Файл Arrow IPC читается блоками через memory map."""
+    path = tmp_path / "data.feather"
+    path.write_bytes(write_table(typed_frame, "feather"))
+    chunks = list(iter_chunks(path, chunk_rows=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks, ignore_index=True), typed_frame, check_categorical=False
+    )
+
+
+def test_unsupported_format():
+    """Неизвестный формат приводит к ошибке."""
+    with pytest.raises(ValueError):
+        read_table("data.txt")
+    with pytest.raises(ValueError):
+        write_table(pd.DataFrame(), "txt")
+    with pytest.raises(ValueError):
+        write_frames(iter([]), "txt")
@@ -1,11 +1,16 @@
+import numpy as np
 import pandas as pd
 import pytest
 from datetime import datetime, timedelta
 from data_processors import (
+    forecast_timeline,
     forecast_with_demand,
+    forecast_without_demand,
     handle_materials_without_date,
     handle_mixed_batches,
 )
+from synthetic import generate_dataset
+from utils import calculate_aging_days, determine_aging_category
 
 # Фиксированная дата для предсказуемости тестов
 TODAY = datetime(2023, 10, 27)
@@ -52,6 +57,76 @@ def test_handle_mixed_batches_logic(mixed_batch_data):
     assert m2_df.iloc[0]["Фактический запас"] == 70
 
 
+def _reference_handle_mixed_batches(df, current_date):
+    """Исходная построчная реализация handle_mixed_batches (эталон)."""
+    processed_rows = []
+    group_cols = ["БЕ", "Завод", "Склад", "Материал", "Партия", "СПП элемент"]
+    for _, group in df.groupby(group_cols):
+        if len(group) > 1:
+            group["temp_category"] = group["Дата поступления на склад"].apply(
+                lambda x: determine_aging_category(
+                    calculate_aging_days(x, current_date), method=2
+                )["status"]
+            )
+            if group["temp_category"].nunique() > 1:
+                for category, cat_group in group.groupby("temp_category"):
+                    new_row = cat_group.iloc[0].copy()
+                    new_row["Фактический запас"] = cat_group["Фактический запас"].sum()
+                    processed_rows.append(new_row)
+            else:
+                new_row = group.iloc[0].copy()
+                new_row["Фактический запас"] = group["Фактический запас"].sum()
+                processed_rows.append(new_row)
+        else:
+            processed_rows.append(group.iloc[0])
+
+    if not processed_rows:
+        return pd.DataFrame(columns=df.columns)
+
+    result_df = pd.DataFrame(processed_rows).reset_index(drop=True)
+    if "temp_category" in result_df.columns:
+        result_df = result_df.drop(columns=["temp_category"])
+    return result_df
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_handle_mixed_batches_matches_reference(seed):
+    """Векторная реализация совпадает с исходной на случайных данных."""
+    rng = np.random.default_rng(seed)
+    n_rows = 400
+    data = pd.DataFrame(
+        {
+            "БЕ": rng.choice(["0101", "0102"], n_rows),
+            "Завод": rng.choice(["1111", "2222"], n_rows),
+            "Склад": rng.choice(["S1", "S2", "S3"], n_rows),
+            "Материал": rng.choice(["M1", "M2", "M3", "M4"], n_rows),
+            "Партия": rng.choice(["P1", "P2", "P3"], n_rows),
+            "СПП элемент": rng.choice(["", "SP001", None], n_rows, p=[0.6, 0.3, 0.1]),
+            "Дата поступления на склад": pd.Series(
+                pd.Timestamp(TODAY)
+                - pd.to_timedelta(rng.integers(0, 1500, n_rows), unit="D")
+            ).where(rng.random(n_rows) > 0.1),
+            "Фактический запас": rng.integers(0, 100, n_rows),
+        }
+    )
+    data = handle_materials_without_date(data)
+
+    expected = _reference_handle_mixed_batches(data.copy(), TODAY)
+    result = handle_mixed_batches(data.copy(), current_date=TODAY)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_handle_mixed_batches_empty():
+    """Пустые данные возвращаются с теми же колонками."""
+    data = pd.DataFrame(columns=["БЕ", "Завод", "Склад", "Материал", "Партия"])
+    data["СПП элемент"] = []
+    data["Дата поступления на склад"] = pd.to_datetime([])
+    data["Фактический запас"] = []
+    result = handle_mixed_batches(data, current_date=TODAY)
+    assert result.empty
+    assert list(result.columns) == list(data.columns)
+
+
 def test_handle_materials_without_date():
     """Проверяет корректную обработку материалов без даты."""
     data = pd.DataFrame(
@@ -117,3 +192,72 @@ def test_forecast_with_demand_category_progression(forecast_data):
     assert liq_sum.iloc[0]["Количество обеспечения"] == 100
     assert ksnz_sum.iloc[0]["Количество обеспечения"] == 50
     assert snz_sum.iloc[0]["Количество обеспечения"] == 20
+
+
+@pytest.mark.parametrize("step_days", [1, 5, 30])
+def test_forecast_timeline_matches_with_demand(forecast_data, step_days):
+    """Сводка по датам переходов совпадает со сводкой forecast_with_demand."""
+    end_date = TODAY + timedelta(days=400)
+    expected, _ = forecast_with_demand(
+        forecast_data.copy(), end_date, step_days=step_days, current_date=TODAY
+    )
+    result = forecast_timeline(
+        forecast_data.copy(), end_date, step_days=step_days, current_date=TODAY
+    )
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_forecast_timeline_matches_without_demand(mixed_batch_data):
+    """Сводка Метода 2 совпадает, включая материалы без даты."""
+    data = mixed_batch_data.copy()
+    data.loc[1, "Дата поступления на склад"] = pd.NaT
+    end_date = TODAY + timedelta(days=1200)
+    expected, _ = forecast_without_demand(
+        data.copy(), end_date, step_days=7, current_date=TODAY
+    )
+    result = forecast_timeline(
+        data.copy(), end_date, step_days=7, current_date=TODAY, method=2
+    )
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize("depletion", [None, "fifo"])
+def test_lazy_forecast_progress_by_partition(depletion):
+    """Сводка по частям с progress совпадает с расчетом по всем строкам."""
+    data = generate_dataset(1, 300, business_units=3, seed=5, current_date=TODAY)
+    end_date = TODAY + timedelta(days=500)
+    expected, _ = forecast_with_demand(
+        data.copy(), end_date, 10, TODAY, details="lazy", depletion=depletion
+    )
+    calls = []
+    summary, details = forecast_with_demand(
+        data.copy(),
+        end_date,
+        10,
+        TODAY,
+        details="lazy",
+        depletion=depletion,
+        progress=lambda done, total, partial: calls.append((done, total, partial)),
+    )
+    pd.testing.assert_frame_equal(summary, expected)
+    assert [(done, total) for done, total, _ in calls] == [(1, 3), (2, 3), (3, 3)]
+    assert (
+        calls[0][2]["Количество обеспечения"].sum()
+        < expected["Количество обеспечения"].sum()
+    )
+    pd.testing.assert_frame_equal(calls[-1][2], expected)
+    assert len(details) == len(data) * len(details.dates)
+
+
+def test_forecast_progress_per_date_and_interrupt(forecast_data):
+    """В режиме frame progress вызывается по датам, исключение прерывает расчет."""
+
+    def progress(done, total, partial):
+        assert partial is None and total == 7
+        if done == 2:
+            raise InterruptedError
+
+    with pytest.raises(InterruptedError):
+        forecast_with_demand(
+            forecast_data, TODAY + timedelta(days=30), 5, TODAY, progress=progress
+        )
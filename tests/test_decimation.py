@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+from decimation import decimate_frame, lttb_indices
+
+
+def test_lttb_keeps_endpoints_and_spike():
+    """Крайние точки и выброс сохраняются, номера возрастают."""
+    y = np.zeros(1000)
+    y[321] = 50.0
+    indices = lttb_indices(np.arange(1000), y, 50)
+
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert 321 in indices
+    assert (np.diff(indices) > 0).all()
+
+
+def test_lttb_short_series_is_unchanged():
+    assert lttb_indices(np.arange(10), np.arange(10), 20).tolist() == list(range(10))
+
+
+def test_decimate_frame_uses_datetime_axis():
+    """Ряды с датами прореживаются на общих строках."""
+    df = pd.DataFrame(
+        {
+            "Дата прогноза": pd.date_range("2025-01-01", periods=2000),
+            "A": np.sin(np.arange(2000) / 30),
+            "B": np.arange(2000.0),
+        }
+    )
+    result = decimate_frame(df, "Дата прогноза", ["A", "B"], 200)
+
+    assert len(result) <= 200
+    assert result["Дата прогноза"].is_monotonic_increasing
+    assert decimate_frame(df, "Дата прогноза", ["A"], 5000) is df
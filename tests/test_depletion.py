@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+import depletion
+from data_processors import (
+    forecast_timeline,
+    forecast_with_demand,
+    forecast_without_demand,
+)
+from depletion import remaining_quantity
+
+TODAY = datetime(2023, 10, 27)
+
+
+@pytest.fixture
+def consumption_data():
+    """Фикстура Метода 1 с дневным потреблением."""
+    return pd.DataFrame(
+        {
+            "БЕ": ["0101", "0101", "0102"],
+            "Область планирования": ["1001", "1001", "1002"],
+            "Материал": ["M1", "M2", "M3"],
+            "Количество обеспечения": [100, 50, 20],
+            "Дата поступления": [
+                TODAY - timedelta(days=10),
+                TODAY - timedelta(days=270),
+                TODAY - timedelta(days=361),
+            ],
+            "Дневное потребление": [1.0, 0.5, np.nan],
+        }
+    )
+
+
+def test_remaining_quantity_floors_at_zero():
+    """Остаток уменьшается на расход и не становится отрицательным."""
+    result = remaining_quantity([100, 10], [100, 10], [2.0, 1.0], [0, 5, 20])
+    assert result.tolist() == [[100, 90, 60], [10, 5, 0]]
+    assert remaining_quantity([100, 10], [100, 10], [2.0, 1.0], 5).tolist() == [90, 5]
+
+
+def test_forecast_with_demand_remaining_quantity(consumption_data):
+    """Остаток заполняется в детальных и сводных результатах."""
+    summary_df, details_df = forecast_with_demand(
+        consumption_data, TODAY + timedelta(days=60), step_days=30, current_date=TODAY
+    )
+    last = details_df[details_df["Дата прогноза"] == TODAY + timedelta(days=60)]
+    assert last["Оставшееся количество"].tolist() == [40, 20, 20]
+
+    first_total = summary_df[summary_df["Дата прогноза"] == TODAY][
+        "Оставшееся количество"
+    ].sum()
+    last_total = summary_df[summary_df["Дата прогноза"] == TODAY + timedelta(days=60)][
+        "Оставшееся количество"
+    ].sum()
+    assert first_total == 170
+    assert last_total == 80
+
+
+@pytest.mark.parametrize("chunk_cells", [1, 7, 4_000_000])
+def test_timeline_remaining_matches_snapshots(
+    consumption_data, monkeypatch, chunk_cells
+):
+    """Блочный расчет остатка совпадает с расчетом по срезам."""
+    monkeypatch.setattr(depletion, "CHUNK_CELLS", chunk_cells)
+    end_date = TODAY + timedelta(days=200)
+    expected, _ = forecast_with_demand(
+        consumption_data.copy(), end_date, step_days=7, current_date=TODAY
+    )
+    result = forecast_timeline(
+        consumption_data.copy(), end_date, step_days=7, current_date=TODAY
+    )
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.fixture
+def fifo_data():
+    """Две партии одного материала и отдельный материал в другом складе."""
+    return pd.DataFrame(
+        {
+            "БЕ": ["0101", "0101", "0101"],
+            "Завод": ["1111", "1111", "1111"],
+            "Склад": ["S1", "S1", "S2"],
+            "Материал": ["M1", "M1", "M1"],
+            "Партия": ["P2", "P1", "P3"],
+            "СПП элемент": ["", "", ""],
+            "Дата поступления на склад": [
+                TODAY - timedelta(days=10),
+                TODAY - timedelta(days=300),
+                TODAY - timedelta(days=5),
+            ],
+            "Фактический запас": [20, 10, 8],
+            "Дневное потребление": [0.5, 0.5, 1.0],
+        }
+    )
+
+
+def test_fifo_consumes_oldest_batch_first(fifo_data):
+    """Расход группы списывается сначала с самой старой партии."""
+    _, details_df = forecast_without_demand(
+        fifo_data, TODAY + timedelta(days=40), 5, TODAY, depletion="fifo"
+    )
+    remaining = {
+        ((date - TODAY).days, batch): value
+        for date, batch, value in details_df[
+            ["Дата прогноза", "Партия", "Оставшееся количество"]
+        ].itertuples(index=False)
+    }
+    assert remaining[(5, "P1")] == 5 and remaining[(5, "P2")] == 20
+    assert remaining[(15, "P1")] == 0 and remaining[(15, "P2")] == 15
+    # Склад S2 - отдельная группа со своим расходом
+    assert remaining[(5, "P3")] == 3 and remaining[(10, "P3")] == 0
+
+
+def test_fifo_requires_consumption_column(fifo_data):
+    """FIFO без колонки потребления невозможен."""
+    with pytest.raises(ValueError):
+        forecast_without_demand(
+            fifo_data.drop(columns=["Дневное потребление"]),
+            TODAY,
+            current_date=TODAY,
+            depletion="fifo",
+        )
+
+
+def test_fifo_timeline_matches_snapshots():
+    """Сводка FIFO по блокам совпадает с расчетом по срезам."""
+    rng = np.random.default_rng(7)
+    n_rows = 300
+    data = pd.DataFrame(
+        {
+            "БЕ": rng.choice(["0101", "0102"], n_rows),
+            "Область планирования": rng.choice(["1001", "1002"], n_rows),
+            "Материал": rng.choice(["M1", "M2", "M3"], n_rows),
+            "Количество обеспечения": rng.integers(1, 100, n_rows),
+            "Дата поступления": pd.Series(
+                pd.Timestamp(TODAY)
+                - pd.to_timedelta(rng.integers(0, 1500, n_rows), unit="D")
+            ).where(rng.random(n_rows) > 0.1),
+            "Дневное потребление": rng.random(n_rows),
+        }
+    )
+    end_date = TODAY + timedelta(days=500)
+    expected, _ = forecast_with_demand(
+        data.copy(), end_date, 20, TODAY, depletion="fifo"
+    )
+    result = forecast_timeline(data.copy(), end_date, 20, TODAY, depletion="fifo")
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,269 @@
+import gc
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+from data_processors import forecast_with_demand, forecast_without_demand
+from details import (
+    IndexedForecastDetails,
+    LazyForecastDetails,
+    MappedForecastDetails,
+    as_details,
+    prune_details,
+)
+
+TODAY = datetime(2023, 10, 27, 9, 30)
+
+
+@pytest.fixture
+def stock_data():
+    """Фикстура с данными Метода 2, включая материал без даты."""
+    return pd.DataFrame(
+        {
+            "БЕ": ["0101", "0101", "0102"],
+            "Завод": ["1111", "1111", "2222"],
+            "Склад": ["S1", "S1", "S2"],
+            "Материал": ["M1", "M2", "M3"],
+            "Партия": ["P1", "P2", "P3"],
+            "Дата поступления на склад": [
+                TODAY - timedelta(days=300),
+                TODAY - timedelta(days=40),
+                pd.NaT,
+            ],
+            "Фактический запас": [10, 20, 30],
+        }
+    )
+
+
+def test_lazy_details_match_eager_frame(stock_data):
+    """Ленивые детальные строки совпадают с материализованным DataFrame."""
+    end_date = TODAY + timedelta(days=120)
+    summary, detailed_df = forecast_without_demand(
+        stock_data.copy(), end_date, step_days=30, current_date=TODAY
+    )
+    lazy_summary, lazy = forecast_without_demand(
+        stock_data.copy(), end_date, step_days=30, current_date=TODAY, details="lazy"
+    )
+
+    assert isinstance(lazy, LazyForecastDetails)
+    assert len(lazy) == len(detailed_df)
+    pd.testing.assert_frame_equal(lazy_summary, summary)
+    pd.testing.assert_frame_equal(lazy.to_frame(), detailed_df)
+
+    eager = as_details(detailed_df)
+    for forecast_date in lazy.dates:
+        pd.testing.assert_frame_equal(
+            lazy.for_date(forecast_date).reset_index(drop=True),
+            eager.for_date(forecast_date).reset_index(drop=True),
+        )
+
+
+def test_for_date_accepts_calendar_day(stock_data):
+    """Дату можно выбрать строкой 'YYYY-MM-DD' из выпадающего списка."""
+    _, lazy = forecast_without_demand(
+        stock_data, TODAY + timedelta(days=60), current_date=TODAY, details="lazy"
+    )
+    frame = lazy.for_date((TODAY + timedelta(days=30)).strftime("%Y-%m-%d"))
+    assert (frame["Дата прогноза"] == TODAY + timedelta(days=30)).all()
+    assert frame["Дни хранения"].tolist() == [330, 70, 10000]
+
+    with pytest.raises(KeyError):
+        lazy.for_date("2000-01-01")
+
+
+def test_as_details_wraps_dataframe():
+    """DataFrame оборачивается, а представление возвращается как есть."""
+    data = pd.DataFrame(
+        {
+            "БЕ": ["0101"],
+            "Область планирования": ["1001"],
+            "Материал": ["M1"],
+            "Количество обеспечения": [5],
+            "Дата поступления": [TODAY],
+        }
+    )
+    _, detailed_df = forecast_with_demand(data, TODAY, current_date=TODAY)
+    wrapped = as_details(detailed_df)
+    assert isinstance(wrapped, IndexedForecastDetails)
+    assert as_details(wrapped) is wrapped
+
+
+def test_unknown_details_mode(stock_data):
+    """Неизвестный режим детальных результатов приводит к ошибке."""
+    with pytest.raises(ValueError):
+        forecast_without_demand(stock_data, TODAY, current_date=TODAY, details="x")
+
+
+def test_count_for_date_ignores_category(stock_data, tmp_path):
+    """Количество строк даты одинаково для всех представлений деталей."""
+    pytest.importorskip("pyarrow")
+    end_date = TODAY + timedelta(days=60)
+    _, lazy = forecast_without_demand(
+        stock_data.copy(), end_date, 30, TODAY, details="lazy"
+    )
+    _, indexed = forecast_without_demand(
+        stock_data.copy(), end_date, 30, TODAY, details="indexed"
+    )
+    _, mapped = forecast_without_demand(
+        stock_data.copy(),
+        end_date,
+        30,
+        TODAY,
+        details="mmap",
+        detail_path=str(tmp_path / "детали.arrow"),
+    )
+    for details in (lazy, indexed, mapped):
+        counts = [details.count_for_date(date) for date in details.dates]
+        assert counts == [len(stock_data)] * len(details.dates)
+        assert len(details.for_date(details.dates[0], "Ликвидный")) < counts[0]
+
+
+def test_indexed_details_slice_dates(stock_data):
+    """Режим indexed дает срезы дат без копирования и фильтр по категории."""
+    end_date = TODAY + timedelta(days=90)
+    _, detailed_df = forecast_without_demand(stock_data.copy(), end_date, 30, TODAY)
+    _, indexed = forecast_without_demand(
+        stock_data.copy(), end_date, 30, TODAY, details="indexed"
+    )
+    assert isinstance(indexed, IndexedForecastDetails)
+    assert indexed.index.offsets.tolist() == [0, 3, 6, 9, 12]
+
+    for position, (forecast_date, frame) in enumerate(indexed.iter_frames()):
+        expected = detailed_df[detailed_df["Дата прогноза"] == forecast_date]
+        pd.testing.assert_frame_equal(frame, expected)
+        assert np.shares_memory(
+            frame["Фактический запас"].to_numpy(),
+            indexed.to_frame()["Фактический запас"].to_numpy(),
+        )
+
+    category = detailed_df["Категория"].iloc[-1]
+    last = indexed.for_date(end_date, category)
+    assert (last["Категория"] == category).all()
+    assert (
+        len(last)
+        == (
+            detailed_df[detailed_df["Дата прогноза"] == end_date]["Категория"]
+            == category
+        ).sum()
+    )
+
+
+def test_unsorted_frame_is_indexed(stock_data):
+    """Неупорядоченный по дате DataFrame упорядочивается один раз."""
+    _, detailed_df = forecast_without_demand(
+        stock_data, TODAY + timedelta(days=60), 30, TODAY
+    )
+    shuffled = detailed_df.sample(frac=1, random_state=1)
+    indexed = as_details(shuffled)
+    assert list(indexed.dates) == sorted(detailed_df["Дата прогноза"].unique())
+    for forecast_date, frame in indexed.iter_frames():
+        assert (frame["Дата прогноза"] == forecast_date).all()
+        assert len(frame) == 3
+
+
+def test_lazy_details_category(stock_data):
+    """Ленивое представление формирует только строки выбранной категории."""
+    _, lazy = forecast_without_demand(
+        stock_data, TODAY + timedelta(days=60), 30, TODAY, details="lazy"
+    )
+    frame = lazy.for_date(TODAY)
+    category = frame["Категория"].iloc[0]
+    pd.testing.assert_frame_equal(
+        lazy.for_date(TODAY, category), frame[frame["Категория"] == category]
+    )
+
+
+def test_mapped_details_match_lazy(stock_data, tmp_path):
+    """Детали в файле Arrow совпадают с ленивыми и читаются по датам."""
+    pytest.importorskip("pyarrow")
+    end_date = TODAY + timedelta(days=120)
+    _, lazy = forecast_without_demand(
+        stock_data.copy(), end_date, step_days=30, current_date=TODAY, details="lazy"
+    )
+    path = tmp_path / "детали.arrow"
+    _, mapped = forecast_without_demand(
+        stock_data.copy(),
+        end_date,
+        step_days=30,
+        current_date=TODAY,
+        details="mmap",
+        detail_path=str(path),
+    )
+
+    assert isinstance(mapped, MappedForecastDetails) and path.exists()
+    assert len(mapped) == len(lazy) and list(mapped.dates) == list(lazy.dates)
+    pd.testing.assert_frame_equal(mapped.to_frame(), lazy.to_frame())
+    forecast_date = lazy.dates[2]
+    pd.testing.assert_frame_equal(
+        mapped.for_date(forecast_date, "Ликвидный").reset_index(drop=True),
+        lazy.for_date(forecast_date, "Ликвидный").reset_index(drop=True),
+    )
+    assert mapped.to_arrow().num_rows == len(lazy)
+
+    # Копия (например, из дискового кэша) читает тот же файл
+    restored = pickle.loads(pickle.dumps(mapped))
+    pd.testing.assert_frame_equal(
+        restored.for_date(forecast_date), mapped.for_date(forecast_date)
+    )
+
+
+def test_mapped_details_temp_file_removed_with_object(
+    stock_data, monkeypatch, tmp_path
+):
+    """Временный файл деталей удаляется вместе с объектом."""
+    pytest.importorskip("pyarrow")
+    monkeypatch.setattr("details.DEFAULT_DETAILS_DIR", str(tmp_path))
+    lazy = LazyForecastDetails(
+        stock_data, pd.date_range(TODAY, periods=3, freq="30D"), 2
+    )
+    mapped = MappedForecastDetails.write(lazy.iter_frames())
+    assert [path.suffix for path in tmp_path.iterdir()] == [".arrow"]
+    del mapped
+    gc.collect()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_mapped_details_interrupted_write(stock_data, tmp_path):
+    """Исключение из progress прерывает запись и не оставляет файлов."""
+    pytest.importorskip("pyarrow")
+    lazy = LazyForecastDetails(
+        stock_data, pd.date_range(TODAY, periods=3, freq="30D"), 2
+    )
+
+    def progress(done, total, partial):
+        if done == 2:
+            raise InterruptedError
+
+    with pytest.raises(InterruptedError):
+        MappedForecastDetails.write(
+            lazy.iter_frames(), str(tmp_path / "d.arrow"), progress, 3
+        )
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_prune_details_limits_directory(stock_data, tmp_path):
+    """Старые файлы деталей удаляются сверх лимита, записанные объекты читаются."""
+    pytest.importorskip("pyarrow")
+    lazy = LazyForecastDetails(
+        stock_data, pd.date_range(TODAY, periods=3, freq="30D"), 2
+    )
+    paths = [str(tmp_path / f"{name}.arrow") for name in ("old", "mid", "new")]
+    written = []
+    for age, path in zip((300, 200, 100), paths):
+        written.append(MappedForecastDetails.write(lazy.iter_frames(), path))
+        os.utime(path, (TODAY.timestamp() - age,) * 2)
+    stale = tmp_path / "new.arrow.abc.tmp"
+    stale.write_bytes(b"")
+    os.utime(stale, (0, 0))
+    size = os.path.getsize(paths[0])
+
+    removed = prune_details(str(tmp_path), max_bytes=size, keep=[paths[0]])
+    assert sorted(removed) == sorted([paths[1], paths[2], str(stale)])
+    assert [path.name for path in tmp_path.iterdir()] == ["old.arrow"]
+    # Удаленный файл остается отображенным в память записавшего объекта
+    assert written[2].available
+    pd.testing.assert_frame_equal(written[2].to_frame(), written[0].to_frame())
+    assert not pickle.loads(pickle.dumps(written[2])).available
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+from data_processors import forecast_without_demand, preprocess_input
+from dtypes import memory_report, memory_summary, narrow_int_dtype, normalize_dtypes
+
+TODAY = datetime(2023, 10, 27)
+
+
+@pytest.fixture
+def stock_data():
+    """Фикстура с данными Метода 2 и повторяющимися организационными ключами."""
+    return pd.DataFrame(
+        {
+            "БЕ": ["0101", "0101", "0102", "0102"],
+            "Завод": ["1111", "1111", "2222", "2222"],
+            "Склад": ["S1", "S1", "S2", "S2"],
+            "Материал": ["M1", "M2", "M3", "M3"],
+            "Партия": ["P1", "P2", "P3", "P4"],
+            "СПП элемент": ["A", None, "B", "B"],
+            "Дата поступления на склад": [
+                TODAY - timedelta(days=300),
+                TODAY - timedelta(days=40),
+                TODAY - timedelta(days=800),
+                pd.NaT,
+            ],
+            "Фактический запас": [10, 20, 30, 40],
+            "Стоимость": [1.5, 2.5, 3.5, 4.5],
+        }
+    )
+
+
+def test_normalize_dtypes(stock_data):
+    """Текст - в category, целые - в узкий тип, даты и float без изменений."""
+    normalized = normalize_dtypes(stock_data)
+
+    assert isinstance(normalized["БЕ"].dtype, pd.CategoricalDtype)
+    assert isinstance(normalized["Партия"].dtype, pd.CategoricalDtype)
+    assert normalized["Фактический запас"].dtype == np.int8
+    assert normalized["Стоимость"].dtype == np.float64
+    assert normalized["Дата поступления на склад"].dtype == (
+        stock_data["Дата поступления на склад"].dtype
+    )
+    pd.testing.assert_frame_equal(
+        normalized.astype(stock_data.dtypes), stock_data, check_categorical=False
+    )
+
+
+def test_memory_report_totals(stock_data):
+    """Отчет содержит строку "Итого" с суммой по колонкам."""
+    report = memory_report(stock_data, normalize_dtypes(stock_data))
+
+    assert report["Колонка"].iloc[-1] == "Итого"
+    assert len(report) == len(stock_data.columns) + 1
+    total = report.iloc[-1]
+    assert total["До, МБ"] == pytest.approx(report["До, МБ"].iloc[:-1].sum())
+    assert total["После, МБ"] < total["До, МБ"]
+    assert "раза меньше" in memory_summary(report)
+
+
+def test_forecast_on_normalized_input_matches(stock_data):
+    """Сводка и детали не зависят от нормализации типов входных данных."""
+    end_date = TODAY + timedelta(days=120)
+    results = [
+        forecast_without_demand(
+            preprocess_input(df, 2, TODAY), end_date, current_date=TODAY
+        )
+        for df in (stock_data, normalize_dtypes(stock_data))
+    ]
+    (summary, details), (normalized_summary, normalized_details) = results
+
+    pd.testing.assert_frame_equal(normalized_summary, summary)
+    assert normalized_details["Дни хранения"].dtype == np.int16
+    pd.testing.assert_frame_equal(
+        normalized_details.astype(details.dtypes),
+        details,
+        check_categorical=False,
+    )
+
+
+def test_narrow_int_dtype():
+    assert narrow_int_dtype(0, 10000) == np.int16
+    assert narrow_int_dtype(-1, 40000) == np.int32
+    assert narrow_int_dtype(0, 2**40) == np.int64
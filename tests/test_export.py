@@ -0,0 +1,109 @@
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+import xlsxwriter
+from datetime import datetime, timedelta
+from data_processors import forecast_without_demand
+import export
+from export import export_excel, export_zip
+
+TODAY = datetime(2023, 10, 27)
+
+
+@pytest.fixture
+def forecast():
+    """Прогноз Метода 2 на несколько дат."""
+    data = pd.DataFrame(
+        {
+            "БЕ": ["0101", "0102", "0103"],
+            "Завод": ["1001", "1001", "1002"],
+            "Склад": ["S1", "S1", "S2"],
+            "Материал": ["=M1", "M2", "M3"],
+            "Партия": ["P1", "P2", "P3"],
+            "СПП элемент": ["", "", ""],
+            "Дата поступления на склад": [
+                TODAY - timedelta(days=10),
+                TODAY - timedelta(days=400),
+                None,
+            ],
+            "Фактический запас": [10, 20, 30],
+        }
+    )
+    return forecast_without_demand(
+        data, TODAY + timedelta(days=60), 30, TODAY, details="lazy"
+    )
+
+
+def test_export_excel_sheets(forecast):
+    """Сводка и по одному листу деталей на дату прогноза."""
+    summary_df, details = forecast
+    data = export_excel(summary_df, details)
+    sheets = pd.read_excel(io.BytesIO(data), sheet_name=None)
+
+    assert list(sheets) == [
+        "Сводные_результаты",
+        "Детали_2023-10-27",
+        "Детали_2023-11-26",
+        "Детали_2023-12-26",
+    ]
+    assert len(sheets["Сводные_результаты"]) == len(summary_df)
+    first_day = sheets["Детали_2023-10-27"]
+    assert len(first_day) == 3
+    # Строки, похожие на формулы, записываются как текст
+    assert first_day["Материал"].tolist() == ["=M1", "M2", "M3"]
+    arrival = first_day["Дата поступления на склад"]
+    assert arrival.tolist()[:2] == [
+        pd.Timestamp(TODAY - timedelta(days=10)),
+        pd.Timestamp(TODAY - timedelta(days=400)),
+    ]
+    assert pd.isna(arrival.iloc[2])
+
+    summary_only = pd.read_excel(io.BytesIO(export_excel(summary_df)), None)
+    assert list(summary_only) == ["Сводные_результаты"]
+
+
+def test_export_excel_splits_sheet_over_row_limit(forecast, monkeypatch):
+    """Строки сверх предела листа переносятся на листы с номерами, без потерь."""
+    summary_df, details = forecast
+    monkeypatch.setattr(export, "EXCEL_MAX_ROWS", 3)
+    sheets = pd.read_excel(io.BytesIO(export_excel(summary_df, details)), None)
+
+    first_day = [name for name in sheets if name.startswith("Детали_2023-10-27")]
+    assert first_day == ["Детали_2023-10-27_1", "Детали_2023-10-27_2"]
+    assert [len(sheets[name]) for name in first_day] == [2, 1]
+    assert sheets["Детали_2023-10-27_2"]["Материал"].tolist() == ["M3"]
+    summary_rows = sum(
+        len(sheet) for name, sheet in sheets.items() if name.startswith("Сводные")
+    )
+    assert summary_rows == len(summary_df)
+
+
+def test_write_sheet_refuses_rows_past_limit(monkeypatch):
+    """Лист, не вмещающий строки, - ошибка, а не молча обрезанные данные."""
+    monkeypatch.setattr(export, "EXCEL_MAX_ROWS", 3)
+    workbook = xlsxwriter.Workbook(io.BytesIO(), {"constant_memory": True})
+    formats = {"header": None, "date": None}
+    with pytest.raises(ValueError, match="предела Excel"):
+        export._write_sheet(workbook, "Лист", pd.DataFrame({"a": range(3)}), formats)
+    workbook.close()
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+def test_export_zip_one_file_per_date(forecast, file_format):
+    """Файлы дат идут в архиве в порядке дат и совпадают с деталями."""
+    if file_format == "parquet":
+        pytest.importorskip("pyarrow")
+    _, details = forecast
+    archive = zipfile.ZipFile(io.BytesIO(export_zip(details, file_format, workers=2)))
+
+    names = archive.namelist()
+    assert names == [f"детали_{date:%Y-%m-%d}.{file_format}" for date in details.dates]
+    with archive.open(names[-1]) as file:
+        if file_format == "csv":
+            last = pd.read_csv(file, encoding="utf-8-sig")
+        else:
+            last = pd.read_parquet(io.BytesIO(file.read()))
+    expected = details.for_date(details.dates[-1])
+    assert last["Фактический запас"].tolist() == expected["Фактический запас"].tolist()
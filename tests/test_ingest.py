@@ -0,0 +1,148 @@
+import io
+
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+
+import ingest
+from ingest import read_header, read_input
+
+TODAY = datetime(2023, 10, 27)
+
+
+@pytest.fixture
+def method2_frame():
+    """Выгрузка Метода 2 с ведущими нулями в кодах и лишними колонками."""
+    return pd.DataFrame(
+        {
+            "БЕ": ["0101", "0102", "0101"],
+            "Завод": ["0011", "0011", "0022"],
+            "Склад": ["S1", "S1", "S2"],
+            "Материал": ["000123", "000124", "000125"],
+            "Партия": ["0001", "0002", "0003"],
+            "СПП элемент": ["", "SP1", ""],
+            "Дата поступления на склад": [
+                TODAY - timedelta(days=10),
+                TODAY - timedelta(days=400),
+                None,
+            ],
+            "Фактический запас": [10, 20, 30],
+            "Наименование": ["Болт", "Гайка", "Шайба"],
+            "Комментарий": ["", "", "проверить"],
+        }
+    )
+
+
+def _engines():
+    engines = ["openpyxl"]
+    try:
+        import python_calamine  # noqa: F401
+
+        engines.append("calamine")
+    except ImportError:
+        pass
+    return engines
+
+
+@pytest.mark.parametrize("engine", _engines())
+def test_xlsx_projection_and_text_codes(tmp_path, method2_frame, engine, monkeypatch):
+    """Читаются только нужные колонки, коды остаются строками с нулями."""
+    monkeypatch.setattr(ingest, "excel_engine", lambda: engine)
+    path = tmp_path / "выгрузка.xlsx"
+    method2_frame.to_excel(path, index=False)
+
+    df = read_input(path, 2, extra_columns=["Наименование"])
+    assert list(df.columns) == [
+        "БЕ",
+        "Завод",
+        "Склад",
+        "Материал",
+        "Партия",
+        "Дата поступления на склад",
+        "Фактический запас",
+        "СПП элемент",
+        "Наименование",
+    ]
+    assert df["БЕ"].tolist() == ["0101", "0102", "0101"]
+    assert df["Материал"].tolist()[0] == "000123"
+    assert pd.api.types.is_datetime64_any_dtype(df["Дата поступления на склад"])
+    assert df["Дата поступления на склад"].isna().tolist() == [False, False, True]
+    assert df["Фактический запас"].tolist() == [10, 20, 30]
+
+
+@pytest.mark.parametrize("engine", _engines())
+def test_missing_columns_checked_from_header(
+    tmp_path, method2_frame, monkeypatch, engine
+):
+    """Без обязательных колонок строки данных не разбираются."""
+    path = tmp_path / "выгрузка.xlsx"
+    method2_frame.drop(columns=["Склад", "Партия"]).to_excel(path, index=False)
+    calls = []
+    monkeypatch.setattr(ingest, "excel_engine", lambda: engine)
+    monkeypatch.setattr(ingest, "_excel_column", lambda *args: calls.append(args))
+    with pytest.raises(ValueError, match="Нет колонок: Склад, Партия"):
+        read_input(path, 2)
+    assert calls == []
+
+
+@pytest.mark.parametrize("engine", _engines())
+def test_all_columns_keeps_file_columns(tmp_path, method2_frame, monkeypatch, engine):
+    """all_columns: колонки вне расчета (Наименование...) сохраняются."""
+    path = tmp_path / "выгрузка.xlsx"
+    method2_frame.assign(Склад=[1, 2, 3]).to_excel(path, index=False)
+    monkeypatch.setattr(ingest, "excel_engine", lambda: engine)
+    df = read_input(path, 2, all_columns=True)
+    assert df.columns[-2:].tolist() == ["Наименование", "Комментарий"]
+    assert df["Наименование"].tolist() == ["Болт", "Гайка", "Шайба"]
+    assert df["Склад"].tolist() == ["1", "2", "3"]
+    assert df["Материал"].tolist() == ["000123", "000124", "000125"]
+    assert "Наименование" not in read_input(path, 2).columns
+
+
+def test_calamine_single_pass(tmp_path, method2_frame):
+    """calamine: коды-числа в ячейках становятся строками, пустые - пропуском."""
+    pytest.importorskip("python_calamine")
+    path = tmp_path / "выгрузка.xlsx"
+    method2_frame.assign(Склад=[1, 2, 3]).to_excel(path, index=False)
+    df = read_input(path, 2)
+    assert df["Склад"].tolist() == ["1", "2", "3"]
+    assert pd.isna(df["СПП элемент"][0]) and df["СПП элемент"][1] == "SP1"
+
+    method2_frame.drop(columns=["Партия"]).to_excel(path, index=False)
+    with pytest.raises(ValueError, match="Нет колонок: Партия"):
+        read_input(path, 2)
+
+
+def test_csv_keeps_leading_zeros(tmp_path, method2_frame):
+    path = tmp_path / "выгрузка.csv"
+    method2_frame.to_csv(path, index=False)
+    df = read_input(path, 2)
+    assert df["Завод"].tolist() == ["0011", "0011", "0022"]
+    assert "Комментарий" not in df.columns
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "feather"])
+def test_columnar_numeric_codes_become_text(tmp_path, method2_frame, file_format):
+    """Коды, сохраненные числами, приводятся к строкам без ".0"."""
+    pytest.importorskip("pyarrow")
+    frame = method2_frame.assign(Склад=[1.0, None, 2.0])
+    path = tmp_path / f"выгрузка.{file_format}"
+    if file_format == "parquet":
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_feather(path)
+
+    assert "Комментарий" in read_header(path)
+    df = read_input(path, 2)
+    assert df["Склад"].tolist()[::2] == ["1", "2"] and pd.isna(df["Склад"][1])
+    assert "Комментарий" not in df.columns
+
+
+def test_header_from_uploaded_file_rewinds(method2_frame):
+    """Файловый объект после чтения заголовка читается с начала."""
+    buffer = io.BytesIO()
+    method2_frame.to_csv(buffer, index=False)
+    buffer.seek(0)
+    buffer.name = "выгрузка.csv"
+    df = read_input(buffer, 2)
+    assert len(df) == 3
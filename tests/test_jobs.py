@@ -0,0 +1,146 @@
+import concurrent.futures
+import threading
+
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+from data_processors import forecast_with_demand
+from jobs import CANCELLED, DONE, FAILED, JobManager
+from profiling import Profiler
+from utils import generate_sample_data_method1
+
+TODAY = datetime(2023, 10, 27)
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(workers=2)
+    yield manager
+    manager.shutdown()
+
+
+def _forecast(job, df):
+    return forecast_with_demand(
+        df, TODAY + timedelta(days=365), 30, TODAY, details="lazy", progress=job.report
+    )
+
+
+def test_job_reports_progress_and_result(manager):
+    """Задача выполняется в фоне, прогресс и промежуточная сводка доступны."""
+    df = generate_sample_data_method1()
+    job = manager.submit("k", _forecast, df)
+    job.future.result(timeout=30)
+
+    assert job.status == DONE and job.finished
+    assert job.progress == 1.0 and job.done == job.total == df["БЕ"].nunique()
+    summary, details = job.result
+    expected, _ = forecast_with_demand(df, TODAY + timedelta(days=365), 30, TODAY)
+    pd.testing.assert_frame_equal(summary, expected)
+    pd.testing.assert_frame_equal(job.partial, expected)
+    assert manager.get("k") is None and len(manager) == 0
+
+
+def test_same_key_reuses_running_job_and_cancel(manager):
+    """Повторный запуск с тем же ключом не начинает второй расчет; отмена."""
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work(job):
+        calls.append(job)
+        started.set()
+        release.wait(5)
+        for step in range(1, 4):
+            job.report(step, 3)
+        return step
+
+    job = manager.submit("k", work)
+    started.wait(5)
+    assert manager.submit("k", work) is job
+    job.cancel()
+    release.set()
+    job.future.result(timeout=5)
+    assert job.status == CANCELLED and job.result is None and len(calls) == 1
+
+    again = manager.submit("k", work)
+    assert again is not job
+    again.future.result(timeout=5)
+    assert again.status == DONE and again.result == 3
+
+
+def test_failed_job_keeps_error(manager):
+    def work(job):
+        raise ValueError("нет колонок")
+
+    job = manager.submit("k", work)
+    job.future.result(timeout=5)
+    assert job.status == FAILED and str(job.error) == "нет колонок"
+
+
+def test_job_runs_in_submit_context(manager):
+    """Замеры этапов фонового расчета попадают в активный профилировщик."""
+    profiler = Profiler()
+    with profiler.activate():
+        job = manager.submit("k", _forecast, generate_sample_data_method1())
+    job.future.result(timeout=30)
+    assert profiler.records["сводка по частям"]["level"] == 1
+    assert profiler.records["forecast_with_demand"]["level"] == 0
+
+
+def test_shared_job_cancelled_only_without_subscribers(manager):
+    """Уход одного сеанса не отменяет общую задачу других сеансов."""
+    started, release = threading.Event(), threading.Event()
+
+    def work(job):
+        started.set()
+        release.wait(5)
+        job.report(1, 1)
+        return "готово"
+
+    first = manager.submit("k", work, subscriber="сеанс 1")
+    started.wait(5)
+    assert manager.submit("k", work, subscriber="сеанс 2") is first
+    assert first.unsubscribe("сеанс 1") is False
+    assert not first.cancel_requested
+    release.set()
+    first.future.result(timeout=5)
+    assert first.status == DONE and first.result == "готово"
+
+    release.clear()
+    job = manager.submit("k", work, subscriber="сеанс 1")
+    assert job.unsubscribe("сеанс 1") is True
+    release.set()
+    concurrent.futures.wait([job.future], timeout=5)
+    assert job.status == CANCELLED
+    assert manager.submit("k", work, subscriber="сеанс 2") is not job
+
+
+def test_profiler_records_read_while_written():
+    """Таблица замеров строится, пока другой поток добавляет этапы."""
+    profiler = Profiler()
+    stop = threading.Event()
+
+    def write():
+        step = 0
+        while not stop.is_set():
+            step += 1
+            profiler.add(
+                {
+                    "stage": f"этап {step % 50}",
+                    "level": 0,
+                    "started_at": step,
+                    "rows_in": None,
+                    "rows_out": None,
+                    "seconds": 0.0,
+                    "memory_delta_mb": None,
+                }
+            )
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        for _ in range(200):
+            profiler.to_frame()
+    finally:
+        stop.set()
+        writer.join()
+    assert len(profiler.to_frame()) == 50
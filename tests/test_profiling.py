@@ -0,0 +1,88 @@
+import json
+import logging
+import pstats
+
+import pandas as pd
+from datetime import datetime, timedelta
+from data_processors import forecast_with_demand
+from profiling import Profiler, profiled, stage
+from utils import generate_sample_data_method1
+
+TODAY = datetime(2023, 10, 27)
+
+
+@profiled()
+def _double(df):
+    return pd.concat([df, df], ignore_index=True)
+
+
+def test_stages_are_skipped_without_profiler():
+    """Без активного профилировщика функции вызываются без замеров."""
+    profiler = Profiler()
+    assert len(_double(pd.DataFrame({"a": [1]}))) == 2
+    with stage("этап") as record:
+        pass
+    assert record == {}
+    assert profiler.records == {}
+
+
+def test_nested_stages_and_rows():
+    """Вложенные этапы получают уровень, строки берутся из DataFrame."""
+    profiler = Profiler()
+    with profiler.activate():
+        with stage("внешний", rows=5):
+            _double(pd.DataFrame({"a": range(3)}))
+        _double(pd.DataFrame({"a": range(4)}))
+
+    assert list(profiler.records) == ["внешний", "_double"]
+    record = profiler.records["_double"]
+    assert (record["rows_in"], record["rows_out"]) == (4, 8)
+    assert record["level"] == 0
+    assert record["seconds"] >= 0
+
+    report = profiler.to_frame()
+    assert report["Этап"].tolist() == ["внешний", "_double"]
+    assert report["Строк на выходе"].tolist()[1] == 8
+
+
+def test_forecast_stages_are_recorded():
+    """Срезы по датам, pd.concat и groupby замеряются внутри прогноза."""
+    profiler = Profiler()
+    with profiler.activate():
+        forecast_with_demand(
+            generate_sample_data_method1(), TODAY + timedelta(days=90), 30, TODAY
+        )
+
+    records = profiler.records
+    assert {"forecast_with_demand", "срезы по датам", "pd.concat", "groupby"} <= (
+        records.keys()
+    )
+    assert records["forecast_with_demand"]["level"] == 0
+    assert records["pd.concat"]["level"] == 1
+    assert records["pd.concat"]["rows_out"] == 7 * 4
+
+
+def test_json_log(caplog):
+    """При log=True каждый замер выводится строкой JSON с контекстом."""
+    profiler = Profiler(log=True, context={"file": "x.csv"})
+    with caplog.at_level(logging.INFO, logger="stok.profiling"):
+        with profiler.activate():
+            _double(pd.DataFrame({"a": [1, 2]}))
+
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["file"] == "x.csv"
+    assert record["stage"] == "_double"
+    assert record["rows_out"] == 4
+
+
+def test_cprofile_dump_is_loadable(tmp_path):
+    """Профиль cProfile сохраняется в формате, который читает pstats."""
+    profiler = Profiler()
+    with profiler.activate(cprofile=True):
+        _double(pd.DataFrame({"a": range(10)}))
+
+    path = tmp_path / "profile.prof"
+    path.write_bytes(profiler.cprofile_dump())
+    functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+    assert "_double" in functions
+    assert "_double" in profiler.cprofile_stats()
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+from aging import shift_aging_scale
+from constants import AGING_SCALE_METHOD_1, AGING_SCALE_METHOD_2
+from scenario_editor import (
+    SCENARIO_TABLE_COLUMNS,
+    default_scenarios,
+    scenarios_from_table,
+)
+
+END = datetime(2024, 10, 27)
+
+
+def test_scenarios_from_table_skips_empty_names_and_defaults_nan_cells():
+    """Строки без названия пропускаются, пустые ячейки - значения по умолчанию."""
+    table = pd.DataFrame(
+        [
+            ("  База  ", np.nan, np.nan, np.nan, np.nan),
+            ("", END, 7, 30, 2.0),
+            (None, END, 7, 30, 2.0),
+            ("   ", END, 7, 30, 2.0),
+            ("Шкала +30", END, 7.0, 30.0, 1.5),
+        ],
+        columns=SCENARIO_TABLE_COLUMNS,
+    )
+    base, shifted = scenarios_from_table(table, 1)
+
+    assert base.name == "База"
+    assert base.end_date is None and base.step_days is None
+    assert base.scale is None and base.consumption_factor == 1.0
+
+    assert shifted.name == "Шкала +30"
+    assert shifted.end_date == END and shifted.step_days == 7
+    assert shifted.scale == shift_aging_scale(AGING_SCALE_METHOD_1, 30)
+    assert shifted.consumption_factor == 1.5
+
+
+def test_scenarios_from_table_shifts_method_scale():
+    """Сдвиг шкалы применяется к шкале метода, нулевой сдвиг - без своей шкалы."""
+    table = default_scenarios("Метод 2", END, 30)
+    scenarios = scenarios_from_table(table, 2)
+    assert [scenario.name for scenario in scenarios] == table["Сценарий"].tolist()
+    assert scenarios[0].scale is None
+    assert scenarios[1].scale == shift_aging_scale(AGING_SCALE_METHOD_2, 30)
+    assert scenarios[2].step_days == 7
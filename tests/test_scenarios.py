@@ -0,0 +1,92 @@
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+
+import timeline
+from aging import AgingScale, shift_aging_scale
+from constants import AGING_SCALE_METHOD_1, AGING_SCALE_METHOD_2
+from data_processors import forecast_timeline
+from scenarios import SCENARIO_COLUMN, Scenario, forecast_scenarios
+from synthetic import generate_dataset
+
+TODAY = datetime(2023, 10, 27)
+END = TODAY + timedelta(days=365)
+
+
+def _scenario(result, name):
+    return (
+        result[result[SCENARIO_COLUMN] == name]
+        .drop(columns=SCENARIO_COLUMN)
+        .reset_index(drop=True)
+    )
+
+
+@pytest.mark.parametrize("depletion", [None, "fifo"])
+def test_scenarios_match_separate_runs(depletion):
+    """Сводка сценария совпадает с отдельным forecast_timeline."""
+    data = generate_dataset(1, 400, business_units=3, seed=2, current_date=TODAY)
+    scenarios = [
+        Scenario("База"),
+        Scenario("Полгода", end_date=TODAY + timedelta(days=180)),
+        Scenario("Шаг 7", step_days=7),
+        Scenario("Потребление x2", consumption_factor=2.0),
+    ]
+    result = forecast_scenarios(
+        data.copy(), scenarios, END, 30, TODAY, method=1, depletion=depletion
+    )
+    assert result[SCENARIO_COLUMN].unique().tolist() == [s.name for s in scenarios]
+
+    doubled = data.assign(**{"Дневное потребление": data["Дневное потребление"] * 2})
+    expected = {
+        "База": forecast_timeline(data.copy(), END, 30, TODAY, 1, depletion),
+        "Полгода": forecast_timeline(
+            data.copy(), TODAY + timedelta(days=180), 30, TODAY, 1, depletion
+        ),
+        "Шаг 7": forecast_timeline(data.copy(), END, 7, TODAY, 1, depletion),
+        "Потребление x2": forecast_timeline(doubled, END, 30, TODAY, 1, depletion),
+    }
+    for name, summary_df in expected.items():
+        pd.testing.assert_frame_equal(_scenario(result, name), summary_df)
+
+
+def test_scenario_with_shifted_scale(monkeypatch):
+    """Сценарий со своей шкалой считается как прогноз по этой шкале."""
+    data = generate_dataset(2, 300, seed=4, current_date=TODAY)
+    shifted = shift_aging_scale(AGING_SCALE_METHOD_2, 60)
+    result = forecast_scenarios(
+        data.copy(),
+        [Scenario("База"), Scenario("Шкала +60", scale=shifted)],
+        END,
+        30,
+        TODAY,
+        method=2,
+    )
+
+    base = forecast_timeline(data.copy(), END, 30, TODAY, 2)
+    pd.testing.assert_frame_equal(_scenario(result, "База"), base)
+    monkeypatch.setattr(timeline, "get_aging_scale", lambda _: AgingScale(shifted))
+    expected = forecast_timeline(data.copy(), END, 30, TODAY, 2)
+    pd.testing.assert_frame_equal(_scenario(result, "Шкала +60"), expected)
+    assert not expected.equals(base)
+
+
+def test_scenario_without_dates_is_skipped():
+    data = generate_dataset(1, 50, seed=1, current_date=TODAY)
+    result = forecast_scenarios(
+        data,
+        [Scenario("Прошлое", end_date=TODAY - timedelta(days=1)), Scenario("База")],
+        END,
+        current_date=TODAY,
+    )
+    assert result[SCENARIO_COLUMN].unique().tolist() == ["База"]
+
+
+def test_shift_aging_scale_keeps_open_ends():
+    shifted = shift_aging_scale(AGING_SCALE_METHOD_1, 30)
+    assert shifted[0] == {**AGING_SCALE_METHOD_1[0], "max_days": 60}
+    assert shifted[4]["min_days"] == 305 and shifted[4]["max_days"] == 395
+    assert shifted[-1]["max_days"] == 9999
+    no_date = shift_aging_scale(AGING_SCALE_METHOD_2, -10)[-2]
+    assert no_date["min_days"] == no_date["max_days"] == 10000
+    with pytest.raises(ValueError, match="пустой"):
+        shift_aging_scale(AGING_SCALE_METHOD_1, -40)
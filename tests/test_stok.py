@@ -0,0 +1,249 @@
+import json
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+import export
+import stok
+from data_io import read_table
+from data_processors import forecast_with_demand
+from details import LazyForecastDetails
+from stok import main
+from utils import generate_sample_data_method1
+
+TODAY = datetime(2023, 10, 27)
+
+
+def test_cli_does_not_import_streamlit():
+    """CLI не загружает Streamlit и Plotly."""
+    code = (
+        "import sys, stok; print('streamlit' in sys.modules, 'plotly' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    assert result.stdout.strip() == "False False"
+
+
+def test_forecast_command_writes_results(tmp_path, capsys):
+    """Прогноз по нескольким файлам с отчетом о времени этапов."""
+    pytest.importorskip("pyarrow")
+    data = generate_sample_data_method1()
+    data.to_parquet(tmp_path / "a.parquet", index=False)
+    data.to_csv(tmp_path / "b.csv", index=False)
+    end_date = TODAY + timedelta(days=120)
+
+    code = main(
+        [
+            "forecast",
+            "--input",
+            str(tmp_path / "a.parquet"),
+            str(tmp_path / "b.csv"),
+            "--end",
+            end_date.strftime("%Y-%m-%d"),
+            "--current-date",
+            TODAY.strftime("%Y-%m-%d"),
+            "--out",
+            str(tmp_path / "out"),
+        ]
+    )
+    assert code == 0
+
+    expected, _ = forecast_with_demand(data.copy(), end_date, 30, TODAY)
+    summary = pd.read_parquet(tmp_path / "out" / "a_сводка.parquet")
+    pd.testing.assert_frame_equal(summary, expected)
+    assert (tmp_path / "out" / "b_детали.parquet").exists()
+    assert "прогноз" in capsys.readouterr().out
+
+
+def test_forecast_command_reports_failed_file(tmp_path, capsys):
+    """Ошибка в одном файле дает ненулевой код возврата."""
+    code = main(
+        [
+            "forecast",
+            "--method",
+            "2",
+            "--input",
+            str(tmp_path / "нет.csv"),
+            "--end",
+            "2027-12-31",
+            "--out",
+            str(tmp_path / "out"),
+        ]
+    )
+    assert code == 1
+    assert "ошибка" in capsys.readouterr().err
+
+
+def test_forecast_command_profile_log(tmp_path, caplog):
+    """--profile выводит замеры этапов JSON, --cprofile сохраняет профиль."""
+    generate_sample_data_method1().to_csv(tmp_path / "a.csv", index=False)
+    with caplog.at_level("INFO", logger="stok.profiling"):
+        code = main(
+            [
+                "forecast",
+                "--input",
+                str(tmp_path / "a.csv"),
+                "--end",
+                "2027-12-31",
+                "--out",
+                str(tmp_path / "out"),
+                "--profile",
+                "--cprofile",
+                str(tmp_path / "a.prof"),
+            ]
+        )
+    assert code == 0
+
+    stages = [json.loads(record.getMessage())["stage"] for record in caplog.records]
+    assert {"read_input", "normalize_dtypes", "forecast_with_demand"} <= set(stages)
+    assert (tmp_path / "a.prof").stat().st_size > 0
+
+
+@pytest.mark.parametrize("mode", [[], ["--split"], ["--workers", "1"]])
+def test_batch_command_reports_failed_file(tmp_path, capsys, mode):
+    """Ошибка одного файла не прерывает пакет: сводка по остальным, код 1."""
+    pytest.importorskip("pyarrow")
+    data = generate_sample_data_method1()
+    data.to_parquet(tmp_path / "a.parquet", index=False)
+    end_date = TODAY + timedelta(days=120)
+    code = main(
+        [
+            "batch",
+            "--input",
+            str(tmp_path / "a.parquet"),
+            str(tmp_path / "нет.parquet"),
+            "--end",
+            end_date.strftime("%Y-%m-%d"),
+            "--current-date",
+            TODAY.strftime("%Y-%m-%d"),
+            "--workers",
+            "2",
+            *mode,
+            "--out",
+            str(tmp_path / "out"),
+        ]
+    )
+    assert code == 1
+    assert "нет.parquet: ошибка" in capsys.readouterr().err
+
+    expected, _ = forecast_with_demand(data.copy(), end_date, 30, TODAY)
+    summary = pd.read_parquet(tmp_path / "out" / "сводка.parquet")
+    pd.testing.assert_frame_equal(summary, expected)
+
+
+@pytest.mark.parametrize("output_format", ["xlsx", "parquet", "feather"])
+def test_forecast_command_writes_details_by_date(tmp_path, monkeypatch, output_format):
+    """Детали пишутся по датам: строк × дат больше, чем вмещает лист Excel."""
+    pytest.importorskip("pyarrow")
+    data = generate_sample_data_method1()
+    data.to_csv(tmp_path / "a.csv", index=False)
+    end_date = TODAY + timedelta(days=120)
+    expected, details = forecast_with_demand(
+        data.copy(), end_date, 30, TODAY, details="lazy"
+    )
+    # Предел листа меньше строк всех дат, но больше строк одной даты
+    monkeypatch.setattr(export, "EXCEL_MAX_ROWS", len(data) + 1)
+    monkeypatch.setattr(LazyForecastDetails, "to_frame", None)
+    code = main(
+        [
+            "forecast",
+            "--input",
+            str(tmp_path / "a.csv"),
+            "--end",
+            end_date.strftime("%Y-%m-%d"),
+            "--current-date",
+            TODAY.strftime("%Y-%m-%d"),
+            "--format",
+            output_format,
+            "--out",
+            str(tmp_path / "out"),
+        ]
+    )
+    assert code == 0
+    assert len(details) > len(data) + 1
+
+    path = tmp_path / "out" / f"a_детали.{output_format}"
+    if output_format == "xlsx":
+        sheets = pd.read_excel(path, sheet_name=None)
+        detail_sheets = [name for name in sheets if name.startswith("Детали_")]
+        assert detail_sheets == [f"Детали_{date:%Y-%m-%d}" for date in details.dates]
+        assert all(len(sheets[name]) == len(data) for name in detail_sheets)
+    else:
+        result = read_table(path, output_format)
+        assert len(result) == len(details)
+        assert result["Дата прогноза"].unique().tolist() == list(details.dates)
+
+
+@pytest.mark.parametrize("mode", [[], ["--split"]])
+def test_batch_command_reads_like_forecast(tmp_path, capsys, monkeypatch, mode):
+    """batch читает файлы как forecast: коды с нулями, проверка заголовка."""
+    data = generate_sample_data_method1()
+    data.to_csv(tmp_path / "a.csv", index=False)
+    data.drop(columns=["БЕ"]).to_csv(tmp_path / "b.csv", index=False)
+    keys = []
+    split = stok.split_partitions
+
+    def tracking_split(df, method):
+        parts = split(df, method)
+        keys.extend(key for key, _ in parts)
+        return parts
+
+    monkeypatch.setattr(stok, "split_partitions", tracking_split)
+    code = main(
+        [
+            "batch",
+            "--input",
+            str(tmp_path / "a.csv"),
+            str(tmp_path / "b.csv"),
+            "--end",
+            "2027-12-31",
+            "--workers",
+            "1",
+            *mode,
+            "--out",
+            str(tmp_path / "out"),
+        ]
+    )
+    assert code == 1
+    assert "b.csv: ошибка: Нет колонок: БЕ" in capsys.readouterr().err
+    if mode:
+        assert keys == [("0101",), ("0102",), ("0103",)]
+
+
+def test_forecast_command_stream(tmp_path):
+    """--stream читает файл блоками; сводка совпадает с расчетом в памяти."""
+    pytest.importorskip("pyarrow")
+    data = generate_sample_data_method1()
+    data.to_csv(tmp_path / "a.csv", index=False)
+    end_date = TODAY + timedelta(days=120)
+    code = main(
+        [
+            "forecast",
+            "--input",
+            str(tmp_path / "a.csv"),
+            "--end",
+            end_date.strftime("%Y-%m-%d"),
+            "--current-date",
+            TODAY.strftime("%Y-%m-%d"),
+            "--stream",
+            "--chunk-rows",
+            "4",
+            "--out",
+            str(tmp_path / "out"),
+        ]
+    )
+    assert code == 0
+
+    expected, details = forecast_with_demand(data.copy(), end_date, 30, TODAY)
+    summary = pd.read_parquet(tmp_path / "out" / "a_сводка.parquet")
+    pd.testing.assert_frame_equal(summary, expected)
+    detail_files = sorted(os.listdir(tmp_path / "out" / "a_детали"))
+    assert len(detail_files) == details["Дата прогноза"].nunique()
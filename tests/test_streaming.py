@@ -0,0 +1,103 @@
+import os
+
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+from data_io import iter_chunks
+from data_processors import forecast_with_demand, forecast_without_demand
+from data_processors import preprocess_input
+from streaming import forecast_streaming
+
+TODAY = datetime(2023, 10, 27)
+
+
+@pytest.fixture
+def method2_data():
+    """Фикстура Метода 2 с партиями, материалами без даты и кодами с нулями."""
+    rows = 25
+    return pd.DataFrame(
+        {
+            "БЕ": ["0101"] * rows,
+            "Завод": ["1001"] * rows,
+            "Склад": [f"00{i % 3}" for i in range(rows)],
+            "Материал": [f"M{i}" for i in range(rows)],
+            "Партия": [f"P{i}" for i in range(rows)],
+            "СПП элемент": [""] * rows,
+            "Дата поступления на склад": [
+                None if i % 7 == 0 else TODAY - timedelta(days=45 * i)
+                for i in range(rows)
+            ],
+            "Фактический запас": [10 + i for i in range(rows)],
+        }
+    )
+
+
+@pytest.mark.parametrize("extension", ["csv", "xlsx", "parquet"])
+def test_iter_chunks_reads_blocks(tmp_path, method2_data, extension):
+    """Файл читается блоками заданного размера без потери кодов с нулями."""
+    if extension == "parquet":
+        pytest.importorskip("pyarrow")
+    path = tmp_path / f"data.{extension}"
+    if extension == "csv":
+        method2_data.to_csv(path, index=False)
+    elif extension == "xlsx":
+        method2_data.to_excel(path, index=False)
+    else:
+        method2_data.to_parquet(path, index=False)
+
+    chunks = list(iter_chunks(path, chunk_rows=10, dtype={"Склад": str}))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert chunks[0]["Склад"].tolist()[:3] == ["000", "001", "002"]
+
+
+def test_forecast_streaming_matches_in_memory(tmp_path, method2_data):
+    """Потоковая сводка и детальные строки совпадают с расчетом в памяти."""
+    path = tmp_path / "data.csv"
+    method2_data.to_csv(path, index=False)
+    end_date = TODAY + timedelta(days=400)
+
+    expected_summary, expected_details = forecast_without_demand(
+        preprocess_input(method2_data.copy(), 2, TODAY), end_date, 30, TODAY
+    )
+    detail_dir = tmp_path / "details"
+    summary = forecast_streaming(
+        path, end_date, 30, TODAY, method=2, detail_dir=detail_dir, chunk_rows=7
+    )
+    pd.testing.assert_frame_equal(summary, expected_summary)
+
+    files = sorted(os.listdir(detail_dir))
+    assert len(files) == expected_details["Дата прогноза"].nunique()
+    first_day = pd.read_csv(detail_dir / files[0])
+    assert len(first_day) == len(method2_data)
+    assert (
+        first_day["Фактический запас"].sum() == method2_data["Фактический запас"].sum()
+    )
+
+
+def test_forecast_streaming_method1_xlsx(tmp_path):
+    """Метод 1 из xlsx с расходом запаса."""
+    data = pd.DataFrame(
+        {
+            "БЕ": ["0101", "0102", "0103"],
+            "Область планирования": ["1001", "1002", "1003"],
+            "Материал": ["M1", "M2", "M3"],
+            "Количество обеспечения": [100, 50, 20],
+            "Дата поступления": [TODAY - timedelta(days=d) for d in (10, 270, 361)],
+            "Дневное потребление": [1.0, 0.5, 0.0],
+        }
+    )
+    path = tmp_path / "data.xlsx"
+    data.to_excel(path, index=False)
+    end_date = TODAY + timedelta(days=90)
+
+    expected, _ = forecast_with_demand(data.copy(), end_date, 15, TODAY)
+    summary = forecast_streaming(path, end_date, 15, TODAY, chunk_rows=2)
+    pd.testing.assert_frame_equal(summary, expected, check_dtype=False)
+
+
+def test_forecast_streaming_rejects_fifo(tmp_path, method2_data):
+    """FIFO требует всех партий группы и не поддерживается в потоке."""
+    path = tmp_path / "data.csv"
+    method2_data.to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        forecast_streaming(path, TODAY, method=2, depletion="fifo")
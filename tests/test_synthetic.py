@@ -0,0 +1,102 @@
+import pandas as pd
+import pytest
+from constants import METHOD1_REQUIRED_COLUMNS, METHOD2_REQUIRED_COLUMNS
+from data_io import read_table
+from data_processors import forecast_with_demand, handle_mixed_batches
+from synthetic import EXCEL_MAX_ROWS, _codes, generate_dataset, main, write_dataset
+from utils import validate_columns
+
+TODAY = pd.Timestamp("2023-10-27")
+
+
+def test_codes_widen_past_width():
+    """Номера длиннее width не обрезаются, коды остаются уникальными."""
+    codes = _codes("P", 999_998, 3, width=6)
+    assert codes.tolist() == ["P0999998", "P0999999", "P1000000"]
+    assert _codes("S", 1, 10_000, width=4).is_unique
+    assert _codes("S", 1, 2, width=4).tolist() == ["S0001", "S0002"]
+
+
+def test_generate_dataset_is_reproducible():
+    """Одинаковый seed дает одинаковые данные, другой seed - другие."""
+    first = generate_dataset(2, 2000, seed=3, current_date=TODAY)
+    pd.testing.assert_frame_equal(
+        first, generate_dataset(2, 2000, seed=3, current_date=TODAY)
+    )
+    assert not first.equals(generate_dataset(2, 2000, seed=4, current_date=TODAY))
+
+
+@pytest.mark.parametrize(
+    "method, required", [(1, METHOD1_REQUIRED_COLUMNS), (2, METHOD2_REQUIRED_COLUMNS)]
+)
+def test_generate_dataset_columns(method, required):
+    """Колонки метода, справочники и доля строк без даты."""
+    df = generate_dataset(
+        method,
+        20_000,
+        business_units=3,
+        plants=2,
+        warehouses=4,
+        missing_date_share=0.1,
+        current_date=TODAY,
+    )
+
+    assert len(df) == 20_000
+    assert validate_columns(df, required)[0]
+    assert df["БЕ"].nunique() == 3
+    assert df.filter(like="Дата").iloc[:, 0].isna().mean() == pytest.approx(
+        0.1, abs=0.02
+    )
+    assert df.filter(like="Дата").iloc[:, 0].max() <= TODAY
+    if method == 2:
+        assert df["Склад"].nunique() == 3 * 2 * 4
+
+
+def test_mixed_batches_share():
+    """Доля строк смешанных партий объединяется handle_mixed_batches."""
+    df = generate_dataset(
+        2, 10_000, mixed_batch_share=0.1, missing_date_share=0, current_date=TODAY
+    )
+    merged = handle_mixed_batches(df, TODAY)
+
+    assert len(df) - len(merged) <= 1000
+    assert len(merged) < len(df)
+    assert merged["Фактический запас"].sum() == df["Фактический запас"].sum()
+
+
+def test_generated_data_feeds_forecast():
+    """Данные Метода 1 рассчитываются с учетом дневного потребления."""
+    df = generate_dataset(1, 1000, consumption_share=1.0, current_date=TODAY)
+    summary, _ = forecast_with_demand(df, TODAY + pd.Timedelta(days=90), 30, TODAY)
+
+    assert "Оставшееся количество" in summary.columns
+    first_date = summary["Дата прогноза"].min()
+    assert summary.loc[
+        summary["Дата прогноза"] == first_date, "Количество обеспечения"
+    ].sum() == (df["Количество обеспечения"].sum())
+
+
+@pytest.mark.parametrize("extension", ["csv", "parquet", "xlsx"])
+def test_write_dataset_roundtrip(tmp_path, extension):
+    if extension == "parquet":
+        pytest.importorskip("pyarrow")
+    df = generate_dataset(2, 200, current_date=TODAY)
+    path = tmp_path / f"data.{extension}"
+    write_dataset(df, path)
+
+    loaded = read_table(path)
+    assert len(loaded) == len(df)
+    assert list(loaded.columns) == list(df.columns)
+
+
+def test_write_dataset_rejects_oversized_excel(tmp_path):
+    df = pd.DataFrame({"Материал": range(EXCEL_MAX_ROWS + 1)})
+    with pytest.raises(ValueError):
+        write_dataset(df, tmp_path / "data.xlsx")
+
+
+def test_cli_writes_file(tmp_path, capsys):
+    path = tmp_path / "m2.csv"
+    assert main(["--method", "2", "--rows", "500", "--out", str(path)]) == 0
+    assert len(read_table(path)) == 500
+    assert "500 строк" in capsys.readouterr().out
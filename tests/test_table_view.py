@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+from data_processors import forecast_without_demand
+from table_view import page_rows, select_rows
+
+TODAY = datetime(2023, 10, 27, 9, 30)
+
+
+@pytest.fixture
+def stock_data():
+    """Фикстура с данными Метода 2, включая материал без даты."""
+    return pd.DataFrame(
+        {
+            "БЕ": ["0101", "0101", "0102"],
+            "Завод": ["1111", "1111", "2222"],
+            "Склад": ["S1", "S1", "S2"],
+            "Материал": ["M1", "M2", "M3"],
+            "Партия": ["P1", "P2", "P3"],
+            "Дата поступления на склад": [
+                TODAY - timedelta(days=300),
+                TODAY - timedelta(days=40),
+                pd.NaT,
+            ],
+            "Фактический запас": [10, 20, 30],
+        }
+    )
+
+
+def test_select_rows_filters_and_sorts(stock_data):
+    """Фильтры по значениям и подстроке, затем сортировка."""
+    _, lazy = forecast_without_demand(
+        stock_data, TODAY, current_date=TODAY, details="lazy"
+    )
+    frame = lazy.for_date(TODAY)
+
+    selected = select_rows(
+        frame,
+        filters={"БЕ": ["0101"], "Категория": []},
+        contains={"Материал": "m"},
+        sort_by="Фактический запас",
+        ascending=False,
+    )
+    assert selected["Материал"].tolist() == ["M2", "M1"]
+    category = frame["Категория"].iloc[2]
+    by_category = select_rows(frame, filters={"Категория": [category]})
+    assert (by_category["Категория"] == category).all()
+    assert "M3" in by_category["Материал"].tolist()
+    assert len(select_rows(frame)) == len(frame)
+
+
+def test_select_rows_numeric_codes_match_text_options(stock_data):
+    """БЕ числами выбираются по вариантам фильтра, показанным строками."""
+    frame = stock_data.assign(БЕ=[101, 101, 102])
+    options = sorted(frame["БЕ"].dropna().astype(str).unique())
+    selected = select_rows(frame, filters={"БЕ": options[:1]})
+    assert selected["Материал"].tolist() == ["M1", "M2"]
+
+
+def test_page_rows_clamps_page():
+    """Номер страницы приводится к допустимому диапазону."""
+    frame = pd.DataFrame({"x": range(25)})
+    page, pages = page_rows(frame, 3, 10)
+    assert pages == 3 and page["x"].tolist() == list(range(20, 25))
+    assert page_rows(frame, 9, 10)[0]["x"].tolist() == list(range(20, 25))
+    assert page_rows(frame.iloc[:0], 1, 10)[1] == 1
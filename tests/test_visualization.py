@@ -1,11 +1,21 @@
+import io
+
+import numpy as np
 import pytest
 import pandas as pd
 import plotly.graph_objects as go
+from data_io import read_table, write_table
+from data_processors import forecast_with_demand
+from export import sanitize_excel_sheetname
+from utils import generate_sample_data_method1
 from visualization import (
-    sanitize_excel_sheetname,
+    CHART_MAX_POINTS,
+    _write_details,
+    cached_chart,
     get_value_column,
     create_line_chart,
     create_area_chart,
+    create_scenario_chart,
 )
 
 
@@ -81,3 +91,79 @@ def test_create_area_chart(chart_data):
     assert "КСНЗ" in trace_names
     assert "СНЗ" in trace_names
     assert fig.data[0].fill == "tonexty"  # Check if it's an area chart
+
+
+@pytest.fixture
+def long_chart_data():
+    """Daily pivot over five years with a step change and a spike."""
+    dates = pd.date_range("2025-01-01", periods=1826)
+    liquid = np.where(np.arange(1826) < 900, 1000.0, 200.0)
+    liquid[500] = 5000.0
+    return pd.DataFrame(
+        {"Дата прогноза": dates, "Ликвидный": liquid, "СНЗ": np.arange(1826.0)}
+    )
+
+
+def test_long_chart_uses_webgl_without_markers(long_chart_data):
+    fig = create_line_chart(long_chart_data, "Метод 1", "Количество")
+    assert isinstance(fig.data[0], go.Scattergl)
+    assert fig.data[0].mode == "lines"
+    assert len(fig.data[0].x) == len(long_chart_data)
+
+
+def test_decimated_chart_keeps_shared_axis_and_peaks(long_chart_data):
+    fig = create_area_chart(
+        long_chart_data, "Метод 1", "Количество", max_points=CHART_MAX_POINTS
+    )
+    assert isinstance(fig.data[0], go.Scatter)
+    assert len(fig.data[0].x) <= CHART_MAX_POINTS
+    assert list(fig.data[0].x) == list(fig.data[1].x)
+    assert max(fig.data[0].y) == 5000.0
+
+
+def test_cached_chart_reuses_figure(chart_data):
+    first = cached_chart(create_line_chart, chart_data, "Метод 1", "Количество")
+    again = cached_chart(create_line_chart, chart_data.copy(), "Метод 1", "Количество")
+    changed = chart_data.assign(СНЗ=[6, 7])
+    other = cached_chart(create_line_chart, changed, "Метод 1", "Количество")
+
+    assert again is first
+    assert other is not first
+
+
+def test_scenario_chart_fills_missing_dates_with_zero():
+    """A scenario without stock in the category on some date shows 0 there."""
+    dates = pd.to_datetime(["2025-01-01", "2025-01-31"])
+    scenario_df = pd.DataFrame(
+        {
+            "Сценарий": ["База", "База", "База", "Шкала +30 дней"],
+            "Дата прогноза": [dates[0], dates[1], dates[1], dates[1]],
+            "Категория": ["Ликвидный", "Ликвидный", "СНЗ", "Ликвидный"],
+            "Количество обеспечения": [10, 4, 6, 10],
+        }
+    )
+    fig = create_scenario_chart(scenario_df, "СНЗ", "Количество обеспечения")
+    assert [trace.name for trace in fig.data] == ["База", "Шкала +30 дней"]
+    assert list(fig.data[0].y) == [0, 6]
+    assert list(fig.data[1].y) == [0]
+
+
+@pytest.mark.parametrize("details_mode", ["lazy", "indexed"])
+@pytest.mark.parametrize("file_format", ["parquet", "feather"])
+def test_detail_export_written_by_date(details_mode, file_format):
+    """Detail export is written date by date, same as writing the full frame."""
+
+    pytest.importorskip("pyarrow")
+    today = pd.Timestamp("2023-10-27")
+    _, details = forecast_with_demand(
+        generate_sample_data_method1(),
+        today + pd.Timedelta(days=120),
+        30,
+        today,
+        details=details_mode,
+    )
+    result = read_table(io.BytesIO(_write_details(details, file_format)), file_format)
+    full = write_table(details.to_frame(), file_format)
+    pd.testing.assert_frame_equal(
+        result, read_table(io.BytesIO(full), file_format), check_categorical=False
+    )
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+from aging import calculate_aging_days_array, get_aging_scale
+from constants import METHOD_DATE_COLUMNS, METHOD_VALUE_COLUMNS, REMAINING_COLUMN
+from depletion import remaining_totals
+
+
+def category_totals(days, values, dated_mask, scale, n_dates, step_days):
+    """
+    Суммы и количества строк по категориям на каждую дату прогноза.
+
+    Вместо пересчета возраста на каждую дату для каждой строки один раз
+    вычисляются шаги, на которых строка пересекает границы шкалы старения.
+    Итоги по датам получаются накопленной суммой этих событий перехода.
+
+    Args:
+        days: Дни хранения на первую дату прогноза (int64).
+        values: Количество по строкам.
+        dated_mask: Маска строк с датой поступления (строки без даты не стареют).
+        scale: Скомпилированная шкала старения (AgingScale).
+        n_dates: Количество дат прогноза.
+        step_days: Шаг прогноза в днях.
+
+    Returns:
+        tuple: (totals, counts) - массивы формы (n_dates, число статусов).
+    """
+    n_statuses = len(scale.statuses)
+    size = n_dates * n_statuses
+    values = np.nan_to_num(np.asarray(values, dtype=np.float64))
+    status_codes = scale.interval_status_codes
+
+    initial = status_codes[scale.interval_index(days)]
+    delta_values = np.bincount(initial, weights=values, minlength=size)
+    delta_counts = np.bincount(initial, minlength=size)
+
+    dated_days = days[dated_mask]
+    dated_values = values[dated_mask]
+    for position, boundary in enumerate(scale.boundaries):
+        old_status = status_codes[position]
+        new_status = status_codes[position + 1]
+        if old_status == new_status:
+            continue
+        # Номер шага, на котором возраст строки впервые достигает границы
+        steps = -((dated_days - boundary) // step_days)
+        crossing = (steps >= 1) & (steps < n_dates)
+        if not crossing.any():
+            continue
+        offsets = steps[crossing] * n_statuses
+        weights = dated_values[crossing]
+        delta_values += np.bincount(
+            offsets + new_status, weights=weights, minlength=size
+        )
+        delta_values -= np.bincount(
+            offsets + old_status, weights=weights, minlength=size
+        )
+        delta_counts += np.bincount(offsets + new_status, minlength=size)
+        delta_counts -= np.bincount(offsets + old_status, minlength=size)
+
+    totals = np.cumsum(delta_values.reshape(n_dates, n_statuses), axis=0)
+    counts = np.cumsum(delta_counts.reshape(n_dates, n_statuses), axis=0)
+    return totals, counts
+
+
+def forecast_aggregates(df, method, dates, step_days, model=None):
+    """
+    Агрегаты сводных результатов для набора строк.
+
+    Агрегаты разных наборов строк складываются через merge_aggregates,
+    что позволяет считать сводку по частям (блоки, партиции).
+
+    Args:
+        df: DataFrame с данными о запасах (даты уже в datetime64).
+        method: Метод прогнозирования (1 или 2).
+        dates: Даты прогноза (DatetimeIndex).
+        step_days: Шаг прогноза в днях.
+        model: Модель расхода запаса (DepletionModel) или None.
+
+    Returns:
+        tuple: (counts, columns) в формате аргументов build_summary.
+    """
+    date_column = METHOD_DATE_COLUMNS[method]
+    value_column = METHOD_VALUE_COLUMNS[method]
+    scale = get_aging_scale(method)
+    days = calculate_aging_days_array(df[date_column], dates[0])
+    dated_mask = df[date_column].notna().to_numpy()
+    values = df[value_column].to_numpy()
+    totals, counts = category_totals(
+        days, values, dated_mask, scale, len(dates), step_days
+    )
+    columns = {value_column: (totals, df[value_column].dtype)}
+    if model is not None:
+        elapsed_days = (dates - dates[0]).days.to_numpy()
+        columns[REMAINING_COLUMN] = (
+            remaining_totals(days, dated_mask, model, scale, elapsed_days),
+            np.dtype(np.float64),
+        )
+    return counts, columns
+
+
+def merge_aggregates(left, right):
+    """
+    Сложение агрегатов forecast_aggregates двух наборов строк.
+
+    Args:
+        left: Агрегаты (counts, columns) или None.
+        right: Агрегаты (counts, columns).
+
+    Returns:
+        tuple: Суммарные агрегаты.
+    """
+    if left is None:
+        return right
+    counts = left[0] + right[0]
+    columns = {}
+    for column, (totals, value_dtype) in left[1].items():
+        other_totals, other_dtype = right[1][column]
+        columns[column] = (
+            totals + other_totals,
+            np.result_type(value_dtype, other_dtype),
+        )
+    return counts, columns
+
+
+def build_summary(dates, statuses, counts, columns):
+    """
+    Формирует сводный DataFrame в формате forecast_with_demand/_without_demand.
+
+    Args:
+        dates: Даты прогноза (DatetimeIndex).
+        statuses: Названия статусов в порядке столбцов counts.
+        counts: Количество строк по датам и статусам.
+        columns: Словарь {колонка: (суммы по датам и статусам, тип исходных
+            значений)} в порядке колонок сводной таблицы.
+
+    Returns:
+        pd.DataFrame: Сводные результаты ("Дата прогноза", "Категория", значения).
+    """
+    date_index, status_index = np.nonzero(counts > 0)
+    summary_df = pd.DataFrame(
+        {
+            "Дата прогноза": dates.take(date_index),
+            "Категория": np.asarray(statuses, dtype=object)[status_index],
+        }
+    )
+    summary_df["Категория"] = summary_df["Категория"].astype(str)
+    for column, (totals, value_dtype) in columns.items():
+        values = totals[date_index, status_index]
+        if np.issubdtype(value_dtype, np.integer) or np.issubdtype(
+            value_dtype, np.bool_
+        ):
+            values = np.rint(values).astype(np.int64)
+        summary_df[column] = values
+    return summary_df.sort_values(["Дата прогноза", "Категория"], ignore_index=True)
@@ -1,6 +1,6 @@
 import pandas as pd
 import datetime
-from constants import AGING_SCALE_METHOD_1, AGING_SCALE_METHOD_2
+from constants import AGING_SCALE_METHOD_1, AGING_SCALE_METHOD_2, NO_DATE_DAYS
 
 
 def validate_columns(df, required_columns):
@@ -36,7 +36,7 @@ def calculate_aging_days(date, forecast_date=None):
         forecast_date = datetime.datetime.now()
 
     if pd.isna(date):
-        return 10000  # Специальное значение для материалов без даты
+        return NO_DATE_DAYS  # Специальное значение для материалов без даты
 
     return (forecast_date - pd.to_datetime(date)).days
 
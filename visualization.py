@@ -1,25 +1,43 @@
 import streamlit as st
-import pandas as pd
+import collections
 import datetime
 import plotly.graph_objects as go
-import io
-import re
+import time
 
+from cache import frame_fingerprint, make_key
 from constants import COLOR_CODES
-
-
-def sanitize_excel_sheetname(sheet_name):
-    """
-    Sanitize Excel sheet name by removing invalid characters.
-
-    Args:
-        sheet_name: Original sheet name
-
-    Returns:
-        Sanitized sheet name that is valid for Excel
-    """
-    sanitized = re.sub(r"[\[\]:*?/\\]", "_", sheet_name)
-    return sanitized[:31]
+from decimation import decimate_frame
+from data_io import COLUMNAR_FORMATS, write_frames, write_table
+from details import MappedForecastDetails, as_details
+from export import (
+    EXCEL_MIME_TYPE,
+    ZIP_MIME_TYPE,
+    export_excel,
+    export_zip,
+)
+from profiling import profiled
+from scenarios import SCENARIO_COLUMN
+from table_view import page_count, page_rows, select_rows
+
+PAGE_SIZES = [50, 100, 500, 1000]
+
+# Chart rendering: points per chart after LTTB decimation, total points
+# above which traces switch to WebGL, points per trace above which markers
+# are hidden, and how many built figures are kept per session.
+CHART_MAX_POINTS = 400
+WEBGL_POINT_THRESHOLD = 1000
+MARKER_MAX_POINTS = 100
+FIGURE_CACHE_SIZE = 8
+CATEGORIES_ORDER = ["Ликвидный", "КСНЗ", "СНЗ", "СНЗ > 3 лет", "Требует проверки"]
+
+EXPORT_TYPES = [
+    "Excel (все данные)",
+    "Excel (только сводные данные)",
+    "Parquet",
+    "Feather (Arrow IPC)",
+    "ZIP: CSV по датам",
+    "ZIP: Parquet по датам",
+]
 
 
 def display_results(summary_df, detailed_df, method_name):
@@ -48,24 +66,31 @@ def display_results(summary_df, detailed_df, method_name):
             st.error("Не найдена колонка со значениями для графика.")
             return
 
-        pivot_df = (
-            summary_df.pivot_table(
-                index="Дата прогноза",
-                columns="Категория",
-                values=value_column,
-                aggfunc="sum",
-            )
-            .fillna(0)
-            .reset_index()
-        )
-
+        pivot_df = summary_pivot(summary_df, value_column)
         st.session_state.pivot_df = pivot_df
 
-        fig = create_line_chart(pivot_df, method_name, value_column)
+        max_points = None
+        if len(pivot_df) > CHART_MAX_POINTS:
+            decimate = st.toggle(
+                "Прореживание графиков (LTTB)",
+                value=True,
+                key="chart_decimation",
+                help=f"Показывать до {CHART_MAX_POINTS} точек с сохранением пиков",
+            )
+            max_points = CHART_MAX_POINTS if decimate else None
+
+        fig = cached_chart(
+            create_line_chart, pivot_df, method_name, value_column, max_points
+        )
         st.plotly_chart(fig, use_container_width=True)
 
-        fig_area = create_area_chart(pivot_df, method_name, value_column)
+        fig_area = cached_chart(
+            create_area_chart, pivot_df, method_name, value_column, max_points
+        )
         st.plotly_chart(fig_area, use_container_width=True)
+        if max_points:
+            shown = len(fig.data[0].x) if fig.data else 0
+            st.caption(f"Показано дат: {shown} из {len(pivot_df)}")
 
     with tab2:
         st.markdown("### Сводная таблица результатов")
@@ -79,6 +104,20 @@ def display_results(summary_df, detailed_df, method_name):
     add_export_button(summary_df, detailed_df)
 
 
+def summary_pivot(summary_df, value_column):
+    """Category volumes by forecast date (chart data and Excel pivot sheet)."""
+    return (
+        summary_df.pivot_table(
+            index="Дата прогноза",
+            columns="Категория",
+            values=value_column,
+            aggfunc="sum",
+        )
+        .fillna(0)
+        .reset_index()
+    )
+
+
 def get_value_column(df):
     """Determine the correct value column from the DataFrame."""
     if "Оставшееся количество" in df.columns:
@@ -91,23 +130,64 @@ def get_value_column(df):
     return numeric_columns[0] if len(numeric_columns) > 0 else None
 
 
-def create_line_chart(pivot_df, method_name, value_column):
+def cached_chart(builder, pivot_df, method_name, value_column, max_points=None):
+    """
+    Reuse a built figure while pivot_df and the chart options are unchanged.
+
+    Figures are kept per session in a small LRU keyed by the content of
+    pivot_df, so reruns (widget changes, downloads) skip rebuilding them.
+    """
+    cache = st.session_state.setdefault("figure_cache", collections.OrderedDict())
+    key = make_key(
+        builder.__name__,
+        frame_fingerprint(pivot_df),
+        method_name,
+        value_column,
+        max_points,
+    )
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+    cache[key] = builder(pivot_df, method_name, value_column, max_points)
+    while len(cache) > FIGURE_CACHE_SIZE:
+        cache.popitem(last=False)
+    return cache[key]
+
+
+def chart_traces(pivot_df, max_points=None):
+    """
+    Data and trace type for the category charts.
+
+    Returns the (optionally LTTB-decimated) pivot rows, the categories to
+    plot and go.Scattergl instead of go.Scatter above WEBGL_POINT_THRESHOLD
+    points in total.
+    """
+    categories = [c for c in CATEGORIES_ORDER if c in pivot_df.columns]
+    if max_points:
+        pivot_df = decimate_frame(pivot_df, "Дата прогноза", categories, max_points)
+    points = len(pivot_df) * len(categories)
+    trace_type = go.Scattergl if points > WEBGL_POINT_THRESHOLD else go.Scatter
+    return pivot_df, categories, trace_type
+
+
+@profiled()
+def create_line_chart(pivot_df, method_name, value_column, max_points=None):
     """Create a line chart for stock dynamics."""
     fig = go.Figure()
-    categories_order = ["Ликвидный", "КСНЗ", "СНЗ", "СНЗ > 3 лет", "Требует проверки"]
-
-    for category in categories_order:
-        if category in pivot_df.columns:
-            fig.add_trace(
-                go.Scatter(
-                    x=pivot_df["Дата прогноза"],
-                    y=pivot_df[category],
-                    mode="lines+markers",
-                    name=category,
-                    line=dict(color=COLOR_CODES.get(category, "#808080"), width=3),
-                    marker=dict(size=8),
-                )
+    pivot_df, categories, trace_type = chart_traces(pivot_df, max_points)
+    markers = len(pivot_df) <= MARKER_MAX_POINTS
+
+    for category in categories:
+        fig.add_trace(
+            trace_type(
+                x=pivot_df["Дата прогноза"],
+                y=pivot_df[category],
+                mode="lines+markers" if markers else "lines",
+                name=category,
+                line=dict(color=COLOR_CODES.get(category, "#808080"), width=3),
+                marker=dict(size=8),
             )
+        )
 
     fig.update_layout(
         title=f"Прогноз объемов по категориям ({method_name})",
@@ -121,32 +201,32 @@ def create_line_chart(pivot_df, method_name, value_column):
     return fig
 
 
-def create_area_chart(pivot_df, method_name, value_column):
+@profiled()
+def create_area_chart(pivot_df, method_name, value_column, max_points=None):
     """Create an area chart for stock structure."""
     fig_area = go.Figure()
-    categories_order = ["Ликвидный", "КСНЗ", "СНЗ", "СНЗ > 3 лет", "Требует проверки"]
-
-    for category in categories_order:
-        if category in pivot_df.columns:
-            base_color = COLOR_CODES.get(category, "#808080")
-            r, g, b = (
-                int(base_color[1:3], 16),
-                int(base_color[3:5], 16),
-                int(base_color[5:7], 16),
-            )
-            rgba_color = f"rgba({r},{g},{b},0.5)"
-
-            fig_area.add_trace(
-                go.Scatter(
-                    x=pivot_df["Дата прогноза"],
-                    y=pivot_df[category],
-                    mode="none",
-                    name=category,
-                    fill="tonexty",
-                    fillcolor=rgba_color,
-                    line=dict(width=0),
-                )
+    pivot_df, categories, trace_type = chart_traces(pivot_df, max_points)
+
+    for category in categories:
+        base_color = COLOR_CODES.get(category, "#808080")
+        r, g, b = (
+            int(base_color[1:3], 16),
+            int(base_color[3:5], 16),
+            int(base_color[5:7], 16),
+        )
+        rgba_color = f"rgba({r},{g},{b},0.5)"
+
+        fig_area.add_trace(
+            trace_type(
+                x=pivot_df["Дата прогноза"],
+                y=pivot_df[category],
+                mode="none",
+                name=category,
+                fill="tonexty",
+                fillcolor=rgba_color,
+                line=dict(width=0),
             )
+        )
 
     fig_area.update_layout(
         title=f"Структура запасов по категориям ({method_name})",
@@ -160,6 +240,89 @@ def create_area_chart(pivot_df, method_name, value_column):
     return fig_area
 
 
+def display_scenario_comparison(scenario_df):
+    """
+    Compare scenarios: one line per scenario for the selected category.
+
+    Args:
+        scenario_df: Result of scenarios.forecast_scenarios
+    """
+    value_column = get_value_column(scenario_df)
+    present = set(scenario_df["Категория"])
+    categories = [c for c in CATEGORIES_ORDER if c in present] + sorted(
+        present.difference(CATEGORIES_ORDER)
+    )
+    default = categories.index("СНЗ") if "СНЗ" in categories else 0
+    category = st.selectbox(
+        "Категория для сравнения:",
+        categories,
+        index=default,
+        key="scenario_category",
+    )
+    st.plotly_chart(
+        create_scenario_chart(scenario_df, category, value_column),
+        use_container_width=True,
+    )
+    with st.expander("Таблица сценариев", expanded=False):
+        st.dataframe(
+            scenario_df.pivot_table(
+                index="Дата прогноза",
+                columns=SCENARIO_COLUMN,
+                values=value_column,
+                aggfunc="sum",
+                sort=False,
+            ).fillna(0),
+            use_container_width=True,
+        )
+
+
+@profiled()
+def create_scenario_chart(scenario_df, category, value_column):
+    """Create a line chart comparing scenarios for one category."""
+    fig = go.Figure()
+    rows = scenario_df[scenario_df["Категория"] == category]
+    names = scenario_df[SCENARIO_COLUMN].unique()
+    trace_type = go.Scattergl if len(rows) > WEBGL_POINT_THRESHOLD else go.Scatter
+
+    for name in names:
+        # Dates where a scenario has no stock in the category are shown as 0
+        dates = scenario_df.loc[
+            scenario_df[SCENARIO_COLUMN] == name, "Дата прогноза"
+        ].unique()
+        series = (
+            rows[rows[SCENARIO_COLUMN] == name]
+            .set_index("Дата прогноза")[value_column]
+            .reindex(dates, fill_value=0)
+        )
+        fig.add_trace(
+            trace_type(
+                x=series.index,
+                y=series.to_numpy(),
+                mode="lines+markers" if len(series) <= MARKER_MAX_POINTS else "lines",
+                name=str(name),
+                line=dict(width=3),
+            )
+        )
+
+    fig.update_layout(
+        title=f"Сравнение сценариев: {category}",
+        xaxis_title="Дата прогноза",
+        yaxis_title=f"Объем запасов ({value_column})",
+        legend_title="Сценарий",
+        hovermode="x unified",
+        height=500,
+        template="plotly_white",
+    )
+    return fig
+
+
+def color_rows(row):
+    """Row style by the stock category color."""
+    color = COLOR_CODES.get(row["Категория"], "#808080")
+    text_color = "black" if row["Категория"] in ["Ликвидный", "КСНЗ"] else "white"
+    return [f"background-color: {color}; color: {text_color}"] * len(row)
+
+
 def display_summary_table(summary_df):
     """Display the summary results in a styled table."""
     formatted_summary = summary_df.copy()
@@ -168,96 +331,156 @@ def display_summary_table(summary_df):
     )
     formatted_summary = formatted_summary.reset_index(drop=True)
 
-    def color_rows(row):
-        color = COLOR_CODES.get(row["Категория"], "#808080")
-        text_color = "black" if row["Категория"] in ["Ликвидный", "КСНЗ"] else "white"
-        return [f"background-color: {color}; color: {text_color}"] * len(row)
-
     st.dataframe(
         formatted_summary.style.apply(color_rows, axis=1), use_container_width=True
     )
 
 
 def display_detailed_table(detailed_df):
-    """Display the detailed results in a filterable, styled table."""
-    all_dates = detailed_df["Дата прогноза"].dt.strftime("%Y-%m-%d").unique()
+    """Display one forecast date as a filterable, sortable, paginated table."""
+    details = as_details(detailed_df)
+    all_dates = list(details.dates.strftime("%Y-%m-%d"))
     selected_index = 0
     if st.session_state.selected_forecast_date in all_dates:
-        selected_index = list(all_dates).index(st.session_state.selected_forecast_date)
+        selected_index = all_dates.index(st.session_state.selected_forecast_date)
 
-    selected_date = st.selectbox(
+    # Выбор по позиции в индексе дат, без сравнения строк по всем деталям
+    position = st.selectbox(
         "Выберите дату прогноза:",
-        all_dates,
+        range(len(all_dates)),
         index=selected_index,
+        format_func=all_dates.__getitem__,
         key="forecast_date_selector",
     )
-    st.session_state.selected_forecast_date = selected_date
+    st.session_state.selected_forecast_date = all_dates[position]
+
+    col1, col2, col3 = st.columns(3)
+    categories = col3.multiselect("Категория", list(COLOR_CODES))
+    # Одна категория берется из среза даты, без фильтрации всех строк
+    category = categories[0] if len(categories) == 1 else None
+    date_df = details.for_date(details.dates[position], category)
+    units = col1.multiselect("БЕ", sorted(date_df["БЕ"].dropna().astype(str).unique()))
+    material = col2.text_input("Материал содержит")
+
+    display_cols = [c for c in date_df.columns if c != "Дата прогноза"]
+    col4, col5, col6 = st.columns(3)
+    sort_by = col4.selectbox("Сортировка", [None] + display_cols, format_func=str)
+    ascending = col5.toggle("По возрастанию", value=True)
+    page_size = col6.selectbox("Строк на странице", PAGE_SIZES, index=1)
+
+    filtered_df = select_rows(
+        date_df[display_cols],
+        filters={"БЕ": units, "Категория": categories},
+        contains={"Материал": material},
+        sort_by=sort_by,
+        ascending=ascending,
+    )
+    pages = page_count(len(filtered_df), page_size)
+    page = st.number_input("Страница", min_value=1, max_value=pages, value=1)
+    page_df, pages = page_rows(filtered_df, page, page_size)
+    # Всего строк на дату, а не после фильтра категории в for_date
+    total = details.count_for_date(details.dates[position])
+    st.caption(f"Строк: {len(filtered_df)} из {total}, страница {page} из {pages}")
 
-    filtered_df = detailed_df[
-        detailed_df["Дата прогноза"].dt.strftime("%Y-%m-%d") == selected_date
-    ].copy()
+    # Форматирование и раскраска только видимой страницы
+    page_df = page_df.reset_index(drop=True)
+    for column in ("Дата поступления", "Дата поступления на склад"):
+        if column in page_df.columns:
+            page_df[column] = page_df[column].dt.strftime("%Y-%m-%d")
 
-    if "Дата поступления" in filtered_df.columns:
-        filtered_df["Дата поступления"] = filtered_df["Дата поступления"].dt.strftime(
-            "%Y-%m-%d"
-        )
-    if "Дата поступления на склад" in filtered_df.columns:
-        filtered_df["Дата поступления на склад"] = filtered_df[
-            "Дата поступления на склад"
-        ].dt.strftime("%Y-%m-%d")
+    st.dataframe(page_df.style.apply(color_rows, axis=1), use_container_width=True)
 
-    display_cols = [c for c in filtered_df.columns if c != "Дата прогноза"]
-    display_df = filtered_df[display_cols].reset_index(drop=True)
 
-    def color_rows_detailed(row):
-        color = COLOR_CODES.get(row["Категория"], "#808080")
-        text_color = "black" if row["Категория"] in ["Ликвидный", "КСНЗ"] else "white"
-        return [f"background-color: {color}; color: {text_color}"] * len(row)
+@profiled()
+def prepare_export_files(export_type, summary_df, detailed_df, pivot_df=None):
+    """
+    Build (label, data, file name, mime) download files for an export type.
 
-    st.dataframe(
-        display_df.style.apply(color_rows_detailed, axis=1), use_container_width=True
-    )
+    pivot_df (the chart data) is added to Excel exports as a pivot sheet.
+    """
+    stamp = datetime.datetime.now().strftime("%Y%m%d")
+    if export_type.startswith("Excel"):
+        details = detailed_df if export_type == "Excel (все данные)" else None
+        data = export_excel(summary_df, details, pivot_df)
+        return [
+            (
+                "Скачать результаты в Excel",
+                data,
+                f"прогноз_{stamp}.xlsx",
+                EXCEL_MIME_TYPE,
+            )
+        ]
+    if export_type.startswith("ZIP"):
+        file_format = "csv" if "CSV" in export_type else "parquet"
+        data = export_zip(detailed_df, file_format)
+        return [("Скачать архив", data, f"прогноз_детали_{stamp}.zip", ZIP_MIME_TYPE)]
+
+    file_format = export_type.split()[0].lower()
+    mime = COLUMNAR_FORMATS[file_format]
+    return [
+        (
+            "Скачать сводные результаты",
+            write_table(summary_df, file_format),
+            f"прогноз_сводка_{stamp}.{file_format}",
+            mime,
+        ),
+        (
+            "Скачать детальные результаты",
+            _write_details(as_details(detailed_df), file_format),
+            f"прогноз_детали_{stamp}.{file_format}",
+            mime,
+        ),
+    ]
+
+
+def _write_details(details, file_format):
+    """
+    Serialize all detail rows without building the rows x dates frame.
 
+    Memory-mapped details are exported straight from Arrow, other details
+    are written date by date.
+    """
+    if isinstance(details, MappedForecastDetails):
+        return write_table(details.to_arrow(), file_format)
+    return write_frames((frame for _, frame in details.iter_frames()), file_format)
 
-def add_export_button(summary_df, detailed_df):
-    """Add an export button to download results."""
-    export_type = st.radio(
-        "Формат экспорта:",
-        ["Excel (все данные)", "Excel (только сводные данные)"],
-        horizontal=True,
-    )
 
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        summary_df.to_excel(writer, sheet_name="Сводные_результаты", index=False)
-        if "pivot_df" in st.session_state:
-            st.session_state.pivot_df.to_excel(writer, sheet_name="Сводная_таблица")
-
-        if export_type == "Excel (все данные)":
-            for date in detailed_df["Дата прогноза"].unique():
-                date_str = pd.to_datetime(date).strftime("%Y-%m-%d")
-                sheet_name = sanitize_excel_sheetname(f"Детали_{date_str}")
-                date_df = detailed_df[detailed_df["Дата прогноза"] == date]
-                date_df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-        workbook = writer.book
-        worksheet = writer.sheets["Сводные_результаты"]
-        for category, color in COLOR_CODES.items():
-            cat_format = workbook.add_format({"bg_color": color})
-            worksheet.conditional_format(
-                "B2:B1000",
-                {
-                    "type": "text",
-                    "criteria": "containing",
-                    "value": category,
-                    "format": cat_format,
-                },
+def add_export_button(summary_df, detailed_df):
+    """Build export files only on request and offer them for download."""
+    export_type = st.radio("Формат экспорта:", EXPORT_TYPES, horizontal=True)
+
+    # Файлы привязаны к результатам прогноза и формату, поэтому при обычных
+    # перезапусках скрипта экспорт не пересобирается
+    export_key = (export_type, frame_fingerprint(summary_df))
+    if st.button("Сформировать файл для скачивания", use_container_width=True):
+        started = time.perf_counter()
+        with st.spinner("Формирование файла..."):
+            files = prepare_export_files(
+                export_type,
+                summary_df,
+                detailed_df,
+                st.session_state.get("pivot_df"),
             )
+        st.session_state.export_result = (
+            export_key,
+            files,
+            time.perf_counter() - started,
+        )
 
-    st.download_button(
-        label="Скачать результаты в Excel",
-        data=output.getvalue(),
-        file_name=f"прогноз_{datetime.datetime.now().strftime('%Y%m%d')}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        use_container_width=True,
-    )
+    export_result = st.session_state.get("export_result")
+    if export_result is None or export_result[0] != export_key:
+        return
+    _, files, seconds = export_result
+    size_kb = sum(len(data) for _, data, _, _ in files) / 1024
+    size = f"{size_kb / 1024:.1f} МБ" if size_kb >= 1024 else f"{size_kb:.0f} КБ"
+    st.caption(f"Размер: {size}, время формирования: {seconds:.1f} с")
+    for column, (label, data, file_name, mime) in zip(st.columns(len(files)), files):
+        with column:
+            st.download_button(
+                label=label,
+                data=data,
+                file_name=file_name,
+                mime=mime,
+                on_click="ignore",
+                use_container_width=True,
+            )